@@ -0,0 +1,171 @@
+"""
+Admission control for the expensive work a request can trigger: crawls
+(Chromium pages plus the LLM extraction fallback and cuisine
+classification of what they store) and recipe variations (a gpt-4 call).
+Background crawls (refreshes, the frontier) take slots too, each job under
+a session of its own, so they cannot crowd out user searches.
+
+- At most `max_concurrent` crawls run at once across the process; the rest
+  wait in a FIFO queue of at most `max_queue` entries, for at most
+  `queue_timeout` seconds.
+- A session may hold at most `per_session` crawls, running or waiting, so a
+  client firing novel queries cannot fill the queue by itself.
+- A request that cannot be admitted gets `AdmissionRejected` straight away
+  (or when its wait times out) with a Retry-After hint; the route then
+  serves what is already stored or answers 429.
+
+Cache hits, local search and the pantry and session endpoints never wait
+here. Cuisine classification is not gated separately: it only runs for
+recipes being stored, inside the slot of the crawl or variation that
+produced them.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from api.settings import get_settings
+from .metrics import Counter, Gauge, Histogram, registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"crawl not admitted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, per_session: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.per_session = per_session
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self._sessions: Dict[str, int] = defaultdict(int)
+        self._waiters: Deque[Tuple[asyncio.Future, str]] = deque()
+        # Recent crawl durations, for the Retry-After estimate
+        self._average_duration = 10.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for future, _ in self._waiters if not future.done())
+
+    def retry_after(self) -> float:
+        """Seconds until the current queue should have drained"""
+        slots = max(1, self.max_concurrent)
+        return max(1.0, round(self._average_duration * (1 + self.queued / slots)))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        admission_rejections.inc(reason)
+        return AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self, session_id: str) -> None:
+        if self._sessions.get(session_id, 0) >= self.per_session:
+            raise self._reject("session_limit")
+        if self.running < self.max_concurrent and not self.queued:
+            self.running += 1
+            self._sessions[session_id] += 1
+            admission_wait.observe(0.0)
+            return
+        if self.queued >= self.max_queue:
+            raise self._reject("queue_full")
+
+        self._sessions[session_id] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((future, session_id))
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return self._admitted(queued_at)  # a slot arrived just as we gave up
+            future.cancel()
+            self._leave(session_id)
+            raise self._reject("timeout")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(session_id)
+            else:
+                future.cancel()
+                self._leave(session_id)
+            raise
+        self._admitted(queued_at)
+
+    def _admitted(self, queued_at: float) -> None:
+        admission_wait.observe(time.perf_counter() - queued_at)
+
+    def _leave(self, session_id: str) -> None:
+        self._sessions[session_id] -= 1
+        if self._sessions[session_id] <= 0:
+            del self._sessions[session_id]
+
+    def release(self, session_id: str) -> None:
+        self.running -= 1
+        self._leave(session_id)
+        while self._waiters and self.running < self.max_concurrent:
+            future, _ = self._waiters.popleft()
+            if future.done():
+                continue
+            self.running += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, session_id: Optional[str]) -> AsyncIterator[None]:
+        """Hold a crawl slot for the duration of the block"""
+        session_id = session_id or "anonymous"
+        await self.acquire(session_id)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._average_duration = 0.8 * self._average_duration + 0.2 * elapsed
+            self.release(session_id)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "sessions": len(self._sessions),
+            "retry_after": self.retry_after(),
+        }
+
+
+admission_wait = registry.register(Histogram(
+    "pantrychef_admission_wait_seconds",
+    "Time admitted crawls waited for a slot",
+))
+admission_rejections = registry.register(Counter(
+    "pantrychef_admission_rejections_total",
+    "Crawls refused by admission control, by reason (session_limit, queue_full, timeout)",
+    ["reason"],
+))
+admission_outcomes = registry.register(Counter(
+    "pantrychef_admission_overload_total",
+    "Refused crawl requests by how they were answered (degraded, rejected)",
+    ["outcome"],
+))
+
+crawl_admission = AdmissionController(
+    settings.ADMISSION_MAX_CRAWLS,
+    settings.ADMISSION_PER_SESSION,
+    settings.ADMISSION_MAX_QUEUE,
+    settings.ADMISSION_QUEUE_TIMEOUT,
+)
+
+registry.register(Gauge(
+    "pantrychef_admission_running",
+    "Crawls currently holding an admission slot",
+    lambda: crawl_admission.running,
+))
+registry.register(Gauge(
+    "pantrychef_admission_queue_depth",
+    "Crawls waiting for an admission slot",
+    lambda: crawl_admission.queued,
+))
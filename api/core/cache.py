@@ -1,48 +1,216 @@
+import asyncio
 import hashlib
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 import json
+import logging
 import os
-from typing import List, Dict, Optional
+from typing import Awaitable, Callable, List, Dict, NamedTuple, Optional, Tuple
+
+from postgrest.types import CountMethod, ReturnMethod
 
 from .database import get_supabase
+from .metrics import cache_hit, cache_miss, timed
+from .quantization import pack_int8
+from .semantic_cache import semantic_index
+from .text import canonical_query
+from .write_behind import write_behind
 from api.models.schemas import RecipeDB
+from api.settings import get_settings
 
+settings = get_settings()
 supabase = get_supabase()
+logger = logging.getLogger(__name__)
+
+# (age, stale) of the recipe_cache entry served to the current request, for the Age header
+_served: ContextVar[Optional[Tuple[float, bool]]] = ContextVar("served_cache_entry", default=None)
+
+# query_hash -> background refresh of a stale entry, so each key refreshes once at a time
+_revalidating: Dict[str, asyncio.Task] = {}
 
 def generate_query_hash(query: str) -> str:
-    """Generate consistent MD5 hash for query strings"""
-    return hashlib.md5(query.lower().encode()).hexdigest()
+    """
+    MD5 of the canonical query, so word order, case and punctuation don't
+    matter. Pantry fingerprints are hashed as they are: canonicalizing would
+    merge different pantries ("chicken breast,rice" and "breast,chicken rice").
+    """
+    key = query if is_pantry_cache_key(query) else canonical_query(query)
+    return hashlib.md5(key.encode()).hexdigest()
+
+def pantry_cache_key(pantry_items: List[str]) -> str:
+    """Order-independent cache key for a set of normalized pantry names"""
+    return ",".join(sorted(set(pantry_items)))
+
+def is_pantry_cache_key(key: str) -> bool:
+    """Whether a recipe_cache.query holds a pantry fingerprint rather than a search"""
+    return "," in key and key == pantry_cache_key(key.split(","))
+
+def _local_timestamp(value) -> datetime:
+    """Naive local datetime from a stored timestamp, which PostgREST returns with an offset"""
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo is not None else parsed
+
+
+class CacheEntry(NamedTuple):
+    results: List[RecipeDB]
+    cached_at: datetime
+    expires_at: datetime
+
+    @property
+    def age(self) -> float:
+        return max(0.0, (datetime.now() - self.cached_at).total_seconds())
+
+    @property
+    def stale(self) -> bool:
+        return self.expires_at <= datetime.now()
+
+
+def _cache_entry(row: Dict) -> CacheEntry:
+    expires_at = _local_timestamp(row["expires_at"])
+    # Rows written before cached_at existed: derive it from the TTL
+    cached_at = _local_timestamp(row["cached_at"]) if row.get("cached_at") \
+        else expires_at - timedelta(hours=settings.RECIPE_CACHE_TTL_HOURS)
+    with timed("serialize"):
+        results = [RecipeDB(**recipe) for recipe in row["results"]]
+    return CacheEntry(results, cached_at, expires_at)
+
+
+def _cached_results(query_hash: str) -> Optional[CacheEntry]:
+    """Live entry for the hash, or one expired less than the stale grace window ago"""
+    oldest = datetime.now() - timedelta(hours=settings.RECIPE_CACHE_STALE_GRACE_HOURS)
+
+    # Results still waiting in the write-behind queue count as cached
+    pending = write_behind.pending_upsert("recipe_cache", "query_hash", (query_hash,))
+    if pending and _local_timestamp(pending["expires_at"]) > oldest:
+        return _cache_entry(pending)
 
-async def get_cached_recipes(query: str) -> Optional[List[RecipeDB]]:
-    """Check cache for existing results"""
-    query_hash = generate_query_hash(query)
-    
     res = supabase.table("recipe_cache") \
-        .select("results") \
+        .select("results, expires_at, cached_at") \
         .eq("query_hash", query_hash) \
-        .gt("expires_at", datetime.now()) \
+        .gt("expires_at", oldest) \
         .execute()
-    
-    return [RecipeDB(**recipe) for item in res.data for recipe in item["results"]] if res.data else None
+
+    if not res.data:
+        return None
+    return _cache_entry(res.data[0])
+
+
+def peek_cached_recipes(query: str) -> Optional[CacheEntry]:
+    """The exact-stage entry for a query, fresh or stale, without counting a hit or revalidating"""
+    return _cached_results(generate_query_hash(query))
+
+
+def served_cache_age() -> Optional[Tuple[float, bool]]:
+    """(age in seconds, stale) of the last cache entry served to this request, if any"""
+    return _served.get()
+
+
+def _revalidate(query_hash: str, refresh: Callable[[], Awaitable]) -> None:
+    """Start one background refresh per stale key; later hits reuse the running one"""
+    if query_hash in _revalidating:
+        return
+    task = asyncio.create_task(refresh())
+    _revalidating[query_hash] = task
+
+    def finished(task: asyncio.Task) -> None:
+        _revalidating.pop(query_hash, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh of a stale cache entry failed: {task.exception()!r}")
+
+    task.add_done_callback(finished)
+
+
+async def get_cached_recipes(
+    query: str, revalidate: Optional[Callable[[str], Awaitable]] = None
+) -> Optional[List[RecipeDB]]:
+    """
+    Exact lookup on the canonical query, then a semantic one on its embedding.
+
+    An exact entry past its expiry but within RECIPE_CACHE_STALE_GRACE_HOURS
+    is still served; when `revalidate` is given it is called once in the
+    background with the query to refresh the entry.
+    """
+    query_hash = generate_query_hash(query)
+    entry = _cached_results(query_hash)
+    if entry is not None:
+        cache_hit("recipe_cache")
+        cache_hit("recipe_cache:exact")
+        if entry.stale:
+            cache_hit("recipe_cache:stale")
+            if revalidate is not None:
+                _revalidate(query_hash, lambda: revalidate(query))
+        _served.set((entry.age, entry.stale))
+        return entry.results
+    cache_miss("recipe_cache:exact")
+
+    if settings.SEMANTIC_QUERY_CACHE:
+        # rec_engine imports this module, so its embedding helper is imported here
+        from .rec_engine import get_embedding
+
+        embedding = await get_embedding(" ".join(query.lower().split()))
+        if embedding:
+            semantic_index.remember(canonical_query(query), embedding)
+            match = semantic_index.lookup(embedding)
+            # The semantic index only holds live entries, so these are never stale
+            entry = _cached_results(match[0]) if match else None
+            if entry is not None:
+                logger.info(f"Semantic cache hit for {query!r} (similarity {match[1]:.3f})")
+                cache_hit("recipe_cache")
+                cache_hit("recipe_cache:semantic")
+                _served.set((entry.age, entry.stale))
+                return entry.results
+        cache_miss("recipe_cache:semantic")
+
+    cache_miss("recipe_cache")
+    return None
 
 
 async def cache_recipes(query: str, recipes: List[RecipeDB]) -> None:
+    """Queue the results for the cache; the write happens off the request path"""
     query_hash = generate_query_hash(query)
-    results = [recipe.model_dump(mode='json') for recipe in recipes]
+    with timed("serialize"):
+        results = [recipe.model_dump(mode='json') for recipe in recipes]
+    cached_at = datetime.now()
+    expires_at = cached_at + timedelta(hours=settings.RECIPE_CACHE_TTL_HOURS)
     
     data_to_insert = {
             "query_hash": query_hash,
             "query": query.lower(),
             "results": results, 
-            "expires_at": (datetime.now() + timedelta(days=1)).isoformat()  
+            "cached_at": cached_at.isoformat(),
+            "expires_at": expires_at.isoformat()
         }
+
+    # Only queries looked up semantically have an embedding at hand; others are
+    # still found by the exact stage
+    embedding = semantic_index.recent_embedding(canonical_query(query)) if settings.SEMANTIC_QUERY_CACHE else None
+    if embedding:
+        data_to_insert["query_embedding"] = pack_int8(embedding)
+        semantic_index.add(query_hash, embedding, expires_at)
         
-    supabase.table("recipe_cache").upsert(data_to_insert, on_conflict="query_hash").execute()
+    write_behind.enqueue_upsert("recipe_cache", data_to_insert, on_conflict="query_hash")
 
 
-async def clean_expired_cache():
-    """Remove expired cache entries"""
+async def invalidate_cached_recipes(queries: List[str]) -> None:
+    """Drop cache entries for the given queries in a single statement"""
+    hashes = list({generate_query_hash(query) for query in queries})
+    if not hashes:
+        return
+
+    semantic_index.discard(hashes)
+    # Otherwise the next flush would write a queued entry straight back
+    await write_behind.discard_upserts("recipe_cache", "query_hash", [(query_hash,) for query_hash in hashes])
     supabase.table("recipe_cache") \
         .delete() \
-        .lt("expires_at", datetime.now()) \
-        .execute()
\ No newline at end of file
+        .in_("query_hash", hashes) \
+        .execute()
+
+
+async def clean_expired_cache() -> int:
+    """Remove entries past the stale grace window, returning how many were deleted"""
+    oldest = datetime.now() - timedelta(hours=settings.RECIPE_CACHE_STALE_GRACE_HOURS)
+    result = supabase.table("recipe_cache") \
+        .delete(count=CountMethod.exact, returning=ReturnMethod.minimal) \
+        .lt("expires_at", oldest) \
+        .execute()
+    return result.count or 0
@@ -0,0 +1,161 @@
+"""
+Process-wide resources built once, on first use or in the app lifespan.
+
+Modules bind `supabase = lazy("supabase")` (or `llm = lazy("openai")`) at
+import time; nothing is constructed until an attribute is first read, so
+importing the app is cheap and every module shares one client. Benchmarks
+and tests swap implementations with `container.override(...)`.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from api.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Container:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resources: Dict[str, Any] = {}
+        self._overrides: Dict[str, Any] = {}
+        self._playwright = None
+        self._playwright_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._browsers: Dict[str, Tuple[Any, asyncio.AbstractEventLoop]] = {}
+        self._browser_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def settings(self):
+        return get_settings()
+
+    @property
+    def supabase(self):
+        return self._get("supabase", self._build_supabase)
+
+    @property
+    def openai(self):
+        return self._get("openai", self._build_openai)
+
+    def _get(self, name: str, build):
+        if name in self._overrides:
+            return self._overrides[name]
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = self._resources[name] = build()
+        return resource
+
+    def _build_supabase(self):
+        from supabase import create_client
+
+        from api.core.metrics import instrument_httpx_client
+
+        client = create_client(self.settings.SUPABASE_URL, self.settings.SUPABASE_KEY)
+        instrument_httpx_client(client.postgrest.session)
+        return client
+
+    def _build_openai(self):
+        from openai import OpenAI
+
+        # Retries (with rate-limit awareness) happen in the gateway, not the SDK
+        return OpenAI(api_key=self.settings.OPENAI_API_KEY or None, max_retries=0)
+
+    def override(self, **resources: Any) -> None:
+        """Replace resources (e.g. `supabase=FakeSupabase(...)`); pass None to clear one"""
+        for name, resource in resources.items():
+            if resource is None:
+                self._overrides.pop(name, None)
+            else:
+                self._overrides[name] = resource
+
+    async def browser(self, proxy: Optional[Dict[str, str]] = None):
+        """Shared headless Chromium per proxy config, launched on first crawl"""
+        key = json.dumps(proxy or {}, sort_keys=True)
+        loop = asyncio.get_running_loop()
+        entry = self._browsers.get(key)
+        if entry and entry[1] is loop and entry[0].is_connected():
+            return entry[0]
+
+        if self._playwright_loop is not loop:
+            # Playwright objects (and the lock) are bound to the loop that made them
+            self._browser_lock = asyncio.Lock()
+            self._playwright_loop = loop
+            await self.close_browsers()
+
+        async with self._browser_lock:
+            entry = self._browsers.get(key)
+            if entry and entry[0].is_connected():
+                return entry[0]
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+
+            options = {"headless": True}
+            if proxy:
+                options["proxy"] = proxy
+            browser = await self._playwright.chromium.launch(**options)
+            self._browsers[key] = (browser, loop)
+            return browser
+
+    async def close_browsers(self) -> None:
+        browsers, self._browsers = self._browsers, {}
+        playwright, self._playwright = self._playwright, None
+        for browser, _ in browsers.values():
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.debug(f"Browser close failed: {e}")
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except Exception as e:
+                logger.debug(f"Playwright stop failed: {e}")
+
+    async def startup(self) -> None:
+        """Build the clients every request needs before traffic arrives"""
+        self.supabase
+        self.openai
+
+    async def shutdown(self) -> None:
+        await self.close_browsers()
+        client = self._resources.pop("openai", None)
+        if client is not None:
+            client.close()
+        self._resources.clear()
+
+    def reset(self) -> None:
+        """Forget built clients; a forked worker must not share its parent's connections"""
+        self._lock = threading.Lock()
+        self._resources.clear()
+        self._playwright = self._playwright_loop = self._browser_lock = None
+        self._browsers.clear()
+
+
+class LazyResource:
+    """Module-level stand-in that forwards to a container resource on first use"""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(getattr(container, self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self._name}>"
+
+
+def lazy(name: str) -> LazyResource:
+    return LazyResource(name)
+
+
+container = Container()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=container.reset)
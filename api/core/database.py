@@ -1,9 +1,11 @@
-from supabase import create_client, Client
-import os
-from api.settings import Settings
+from typing import TYPE_CHECKING
 
-settings = Settings()
+from .container import lazy
 
+if TYPE_CHECKING:
+    from supabase import Client
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+def get_supabase() -> "Client":
+    """Shared Supabase client; created on first use, so safe to bind at import time"""
+    return lazy("supabase")
@@ -0,0 +1,71 @@
+"""
+Per-request deadlines, carried in a context variable.
+
+The route opens a `deadline_scope`; everything awaited under it (and every
+task or worker thread started from it) sees the same absolute deadline and
+trims its own work to `remaining()`: Playwright timeouts, retries, OpenAI
+calls and the scoring loop. Work that should outlive the request (a crawl
+that keeps filling the cache) opens a scope of its own.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() deadline; None means unbounded
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Bound the enclosed work to `seconds` from now; None removes any deadline"""
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (may be negative), or None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    budget = remaining()
+    return budget is not None and budget <= 0
+
+
+def timeout_ms(cap_ms: int) -> int:
+    """A Playwright-style timeout: `cap_ms`, or less if the deadline is nearer"""
+    budget = remaining()
+    if budget is None:
+        return cap_ms
+    return max(1, min(cap_ms, int(budget * 1000)))
+
+
+async def with_deadline(awaitable: Awaitable[T], reserve: float = 0.0) -> T:
+    """
+    Await under the current deadline, keeping `reserve` seconds back for
+    whatever follows; raises DeadlineExceeded when the budget runs out.
+    """
+    budget = remaining()
+    if budget is None:
+        return await awaitable
+    budget -= reserve
+    if budget <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("no time left")
+    try:
+        return await asyncio.wait_for(awaitable, budget)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"gave up after {budget:.2f}s") from None
@@ -0,0 +1,121 @@
+"""
+Chat completion calls with a persistent response cache.
+
+Responses are stored on disk under LLM_CACHE_DIR, one JSON file per request,
+keyed by a hash of the model, the messages and every other parameter; the
+same prompt asked again (a page that failed scraping twice, the cuisine of a
+recipe stored again, the same variation request) is answered from disk.
+Prompt and completion tokens, tokens saved by the cache and latency per
+model go to /metrics.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from api.settings import get_settings
+from .metrics import cache_hit, cache_miss, llm_request_duration, llm_tokens, timed
+from .openai_gateway import Priority, gateway
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough count for text we never send; about four characters per token"""
+    return (len(text) + 3) // 4
+
+
+def request_key(model: str, messages: List[Dict], params: Dict) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, directory: str, ttl_seconds: float):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        staging = f"{path}.{os.getpid()}.tmp"
+        with open(staging, "w") as f:
+            json.dump({**entry, "created_at": time.time()}, f)
+        os.replace(staging, path)
+
+    def prune(self) -> int:
+        """Delete expired entries; returns how many were removed"""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+response_cache = LLMResponseCache(settings.LLM_CACHE_DIR, settings.LLM_CACHE_TTL_DAYS * 86400)
+
+
+async def chat_completion(
+    model: str, messages: List[Dict], cache: bool = True, priority: Priority = Priority.INTERACTIVE, **params
+) -> str:
+    """Content of the first choice; served from the disk cache when the same request was made before"""
+    use_cache = cache and settings.LLM_CACHE_ENABLED
+    key = request_key(model, messages, params)
+    start = time.perf_counter()
+
+    if use_cache:
+        entry = response_cache.get(key)
+        if entry is not None:
+            cache_hit("llm")
+            llm_tokens.inc(model, "saved_cache", amount=entry.get("prompt_tokens", 0))
+            llm_request_duration.observe(time.perf_counter() - start, model, "true")
+            return entry["content"]
+        cache_miss("llm")
+
+    with timed("llm"):
+        response = await gateway.chat(model, messages, priority, **params)
+    content = response.choices[0].message.content
+
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or estimate_tokens(
+        "".join(str(m.get("content", "")) for m in messages)
+    )
+    completion_tokens = getattr(usage, "completion_tokens", None) or estimate_tokens(content or "")
+    llm_tokens.inc(model, "prompt", amount=prompt_tokens)
+    llm_tokens.inc(model, "completion", amount=completion_tokens)
+    llm_request_duration.observe(time.perf_counter() - start, model, "false")
+
+    if use_cache and content is not None:
+        try:
+            response_cache.put(key, {"model": model, "content": content, "prompt_tokens": prompt_tokens})
+        except OSError as e:
+            logger.warning(f"Could not cache LLM response: {e}")
+    return content
+
+
+def record_prompt_reduction(model: str, original: str, reduced: str) -> None:
+    """Count the tokens a trimmed prompt saved against what would have been sent"""
+    llm_tokens.inc(model, "saved_reduction", amount=max(0, estimate_tokens(original) - estimate_tokens(reduced)))
@@ -0,0 +1,268 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans a sub-millisecond scoring pass up to a multi-page crawl
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# stage -> [total seconds, calls] for the request currently being handled
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {float(self.read()):g}",
+        ]
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *labels: str) -> Tuple[float, int]:
+        """(sum, count) for one label set"""
+        series = self._series.get(labels)
+        return (series[1], series[2]) if series else (0.0, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                le_label = f'le="{le}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le_label)} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {total:g}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_duration = registry.register(Histogram(
+    "pantrychef_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+))
+db_request_duration = registry.register(Histogram(
+    "pantrychef_db_request_duration_seconds",
+    "Supabase (PostgREST) round trips by table or RPC",
+    ["method", "target"],
+))
+http_request_duration = registry.register(Histogram(
+    "pantrychef_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+))
+llm_tokens = registry.register(Counter(
+    "pantrychef_llm_tokens_total",
+    "LLM tokens by model and kind: prompt and completion sent, saved_cache and saved_reduction avoided",
+    ["model", "kind"],
+))
+llm_request_duration = registry.register(Histogram(
+    "pantrychef_llm_request_duration_seconds",
+    "LLM calls by model, including answers served from the response cache",
+    ["model", "cached"],
+))
+cache_events = registry.register(Counter(
+    "pantrychef_cache_events_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+))
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration globally and against the current request"""
+    stage_duration.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.get(stage)
+        if entry is None:
+            timings[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a block as one stage; works around sync code and awaits alike"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def cache_hit(cache: str) -> None:
+    cache_events.inc(cache, "hit")
+
+
+def cache_miss(cache: str) -> None:
+    cache_events.inc(cache, "miss")
+
+
+def server_timing_header(timings: Dict[str, List[float]], total: float) -> str:
+    entries = [
+        f'{stage};dur={seconds * 1000:.1f};desc="{int(calls)} calls"'
+        for stage, (seconds, calls) in timings.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: times each request, records it by route template
+    and adds a Server-Timing header summarizing the stages it went through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, List[float]] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                header = server_timing_header(timings, time.perf_counter() - start)
+                headers.append((b"server-timing", header.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            )
+
+
+def instrument_httpx_client(client) -> None:
+    """
+    Time every request made through an httpx.Client (the Supabase client's
+    PostgREST session). The response body is read inside the hook so the
+    recorded time covers the whole round trip.
+    """
+
+    def on_request(request):
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    def on_response(response):
+        response.read()
+        request = response.request
+        elapsed = time.perf_counter() - request.extensions.get("metrics_start", time.perf_counter())
+        path = request.url.path
+        target = path.split("/rest/v1/", 1)[-1] or path
+        db_request_duration.observe(elapsed, request.method, target)
+        record_stage("db", elapsed)
+
+    client.event_hooks["request"].append(on_request)
+    client.event_hooks["response"].append(on_response)
@@ -0,0 +1,287 @@
+"""
+Shared async gateway for every OpenAI call.
+
+- Two token buckets keep requests and tokens per minute under the account
+  limits, so bursts queue here instead of turning into 429s.
+- Concurrency is adaptive (AIMD): each success raises the in-flight limit by
+  1/limit, each 429 halves it.
+- Retryable failures (429, timeouts, connection errors, 5xx) are retried
+  with full-jitter exponential backoff, honouring Retry-After.
+- Calls stop waiting, and stop retrying, at the request deadline.
+- Waiters are served by priority lane, so an embedding a user is waiting on
+  goes ahead of background ingestion and recipe refreshes.
+
+The SDK client is synchronous, so each admitted call runs in a worker thread
+and never blocks the event loop.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from api.settings import get_settings
+from .container import lazy
+from .deadline import remaining, with_deadline
+from .metrics import Counter, Gauge, Histogram, registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+client = lazy("openai")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously; holds at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def penalize(self, seconds: float) -> None:
+        """Empty the bucket for `seconds`, e.g. when the server says Retry-After"""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a priority-ordered wait queue"""
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            *_, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def succeeded(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def throttled(self) -> None:
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """429s, 5xx, timeouts and dropped connections; never bad requests or auth errors"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class OpenAIGateway:
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.requests = TokenBucket(self.requests_per_minute)
+        self.tokens = TokenBucket(self.tokens_per_minute)
+        self.limiter = AdaptiveLimiter(max(1, self.max_concurrency // 2), 1, self.max_concurrency)
+
+    def _bind_loop(self) -> None:
+        # Futures in the wait queue belong to one loop; a new loop starts clean
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._reset()
+
+    async def call(self, operation: str, fn: Callable[[], Any], tokens: int, priority: Priority) -> Any:
+        """
+        Run `fn` (a blocking SDK call) under the limits, retrying transient
+        failures; gives up with DeadlineExceeded at the request deadline
+        """
+        return await with_deadline(self._call(operation, fn, tokens, priority))
+
+    async def _call(self, operation: str, fn: Callable[[], Any], tokens: int, priority: Priority) -> Any:
+        self._bind_loop()
+        lane = priority.name.lower()
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.perf_counter()
+            await self.limiter.acquire(priority)
+            try:
+                await self.requests.acquire(1)
+                await self.tokens.acquire(tokens)
+                queue_wait.observe(time.perf_counter() - queued_at, lane)
+
+                started = time.perf_counter()
+                try:
+                    result = await asyncio.to_thread(fn)
+                except Exception as e:
+                    elapsed = time.perf_counter() - started
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        request_duration.observe(elapsed, operation, "error")
+                        raise
+                    request_duration.observe(elapsed, operation, "retry")
+                    failure, delay = e, self._backoff(attempt, e)
+                else:
+                    request_duration.observe(time.perf_counter() - started, operation, "ok")
+                    self.limiter.succeeded()
+                    return result
+            finally:
+                self.limiter.release()
+
+            budget = remaining()
+            if budget is not None and delay >= budget:
+                raise failure  # the retry could not finish in time anyway
+            retries.inc(operation, str(_status_code(failure) or type(failure).__name__))
+            logger.warning(f"OpenAI {operation} failed ({failure}); retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if _status_code(error) == 429:
+            self.limiter.throttled()
+            retry_after = _retry_after(error)
+            if retry_after:
+                self.requests.penalize(retry_after)
+                delay = max(delay, retry_after)
+        return delay
+
+    async def embed(
+        self, texts: List[str], model: str = "text-embedding-3-small", priority: Priority = Priority.INTERACTIVE
+    ) -> List[List[float]]:
+        tokens = sum(len(t) for t in texts) // 4 + 1
+        response = await self.call(
+            "embedding", lambda: client.embeddings.create(input=texts, model=model), tokens, priority
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def chat(self, model: str, messages: List[Dict], priority: Priority = Priority.INTERACTIVE, **params):
+        # Prompt estimate plus room for the answer; the bucket only needs to be roughly right
+        tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + params.get("max_tokens", 512)
+        return await self.call(
+            "chat", lambda: client.chat.completions.create(model=model, messages=messages, **params), tokens, priority
+        )
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+        }
+
+
+queue_wait = registry.register(Histogram(
+    "pantrychef_openai_queue_seconds",
+    "Time OpenAI calls waited for a concurrency slot and rate-limit budget, by lane",
+    ["lane"],
+))
+request_duration = registry.register(Histogram(
+    "pantrychef_openai_request_duration_seconds",
+    "OpenAI request latency by operation and outcome (ok, retry, error)",
+    ["operation", "outcome"],
+))
+retries = registry.register(Counter(
+    "pantrychef_openai_retries_total",
+    "OpenAI calls retried, by operation and status code or error",
+    ["operation", "reason"],
+))
+
+gateway = OpenAIGateway(
+    settings.OPENAI_REQUESTS_PER_MINUTE,
+    settings.OPENAI_TOKENS_PER_MINUTE,
+    settings.OPENAI_MAX_CONCURRENCY,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+)
+
+registry.register(Gauge(
+    "pantrychef_openai_queue_depth",
+    "OpenAI calls waiting for a concurrency slot",
+    lambda: gateway.limiter.queued,
+))
+registry.register(Gauge(
+    "pantrychef_openai_concurrency_limit",
+    "Current adaptive limit on concurrent OpenAI calls",
+    lambda: gateway.limiter.limit,
+))
@@ -0,0 +1,133 @@
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import random
+import re
+import time
+import uuid
+
+# Optional: pyinstrument is a low-overhead statistical profiler that
+# understands asyncio. Without it we fall back to cProfile.
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pragma: no cover - depends on the environment
+    SamplingProfiler = None
+    SpeedscopeRenderer = None
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-request"
+
+
+def sign_profile_token(secret: str, expires_at: int) -> str:
+    """Token for the X-Profile-Request header: '<expires_at>.<hmac>'"""
+    signature = hmac.new(secret.encode(), str(expires_at).encode(), hashlib.sha256).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    if not secret or "." not in token:
+        return False
+    expires_at, _ = token.split(".", 1)
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(token, sign_profile_token(secret, int(expires_at)))
+
+
+class ProfilingMiddleware:
+    """
+    Profiles individual requests on demand.
+
+    A request is profiled when it carries a valid signed X-Profile-Request
+    header, or when it is picked by `sample_rate`. With pyinstrument
+    installed the request is sampled in async mode. Only time spent in this
+    request's task is attributed to it, and awaits show up as waiting time. A
+    speedscope (flamegraph) JSON file is written. Without pyinstrument,
+    cProfile writes a .pstats file instead. cProfile sees everything running
+    on the event loop thread, so other requests' work can leak in, and only
+    one cProfile session can run at a time. At most `max_concurrent` profiles
+    are taken at once; extra triggers are served unprofiled.
+    """
+
+    def __init__(
+        self,
+        app,
+        output_dir: str,
+        secret: str = "",
+        sample_rate: float = 0.0,
+        max_concurrent: int = 1,
+        interval: float = 0.001,
+    ):
+        self.app = app
+        self.output_dir = output_dir
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_concurrent = max_concurrent if SamplingProfiler else 1
+        self.active = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self.active >= self.max_concurrent:
+            logger.info("Profiling skipped: too many profiles in flight")
+            await self.app(scope, receive, send)
+            return
+
+        self.active += 1
+        profile_id = self._profile_id(scope)
+        profiler = self._start()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            try:
+                path = self._stop(profiler, profile_id)
+                logger.info(f"Wrote request profile {path}")
+            except Exception as e:
+                logger.error(f"Failed to write request profile: {e}")
+            finally:
+                self.active -= 1
+
+    def _should_profile(self, scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode():
+                return verify_profile_token(self.secret, value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profile_id(self, scope) -> str:
+        slug = re.sub(r"[^a-zA-Z0-9]+", "-", scope["path"]).strip("-") or "root"
+        return f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method'].lower()}-{slug}-{uuid.uuid4().hex[:8]}"
+
+    def _start(self):
+        if SamplingProfiler:
+            profiler = SamplingProfiler(interval=self.interval, async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop(self, profiler, profile_id: str) -> str:
+        if SamplingProfiler and isinstance(profiler, SamplingProfiler):
+            profiler.stop()
+            path = os.path.join(self.output_dir, f"{profile_id}.speedscope.json")
+            with open(path, "w") as f:
+                f.write(profiler.output(renderer=SpeedscopeRenderer()))
+        else:
+            profiler.disable()
+            path = os.path.join(self.output_dir, f"{profile_id}.pstats")
+            profiler.dump_stats(path)
+        return path
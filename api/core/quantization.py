@@ -0,0 +1,45 @@
+"""
+Compact embedding encodings.
+
+int8 scalar quantization is symmetric per vector: `codes = round(v / scale)`
+with `scale = max|v| / 127`, so a 1536-d embedding is 1536 bytes plus a
+4-byte scale instead of ~6 KB of float32 (or ~30 KB as JSON text). The
+packed text form is base64 of `<float32 scale><int8 codes>`; it is what we
+store in `recipe_embeddings.embedding_q8` and ship over PostgREST.
+"""
+import base64
+from typing import Sequence, Tuple
+
+import numpy as np
+
+INT8_MAX = 127
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(n, d) float -> (n, d) int8 codes and (n,) float32 scales"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scales = np.abs(vectors).max(axis=1) / INT8_MAX
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).clip(-INT8_MAX, INT8_MAX).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+def pack_int8(vector: Sequence[float]) -> str:
+    codes, scales = quantize_int8(np.asarray(vector, dtype=np.float32)[None, :])
+    return base64.b64encode(scales[:1].astype("<f4").tobytes() + codes[0].tobytes()).decode("ascii")
+
+
+def unpack_int8(packed: str) -> np.ndarray:
+    """Packed text -> dequantized float32 vector"""
+    raw = base64.b64decode(packed)
+    scale = np.frombuffer(raw[:4], dtype="<f4")[0]
+    return np.frombuffer(raw[4:], dtype=np.int8).astype(np.float32) * scale
+
+
+def to_pgvector_literal(vector: Sequence[float]) -> str:
+    """pgvector text with float32 precision (9 significant digits round-trip exactly)"""
+    return "[" + ",".join(f"{x:.9g}" for x in np.asarray(vector, dtype=np.float32).tolist()) + "]"
@@ -0,0 +1,95 @@
+"""
+Request counts for search queries and pantry fingerprints.
+
+Each worker counts in memory and periodically adds its counts to the
+`query_stats` table through the `record_query_stats` RPC, which increments
+rather than overwrites. The cache-warming job reads the most requested keys
+back to know what to precompute after a deploy or a purge.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from api.settings import get_settings
+from .database import get_supabase
+from .text import canonical_query
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+supabase = get_supabase()
+
+QUERY = "query"
+PANTRY = "pantry"
+
+
+class QueryStats:
+    def __init__(self, flush_interval: float = 30.0):
+        self.flush_interval = flush_interval
+        # (kind, key) -> hits since the last flush, plus the text to store with them
+        self._hits: Counter = Counter()
+        self._values: Dict[Tuple[str, str], str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record_query(self, query: str) -> None:
+        key = canonical_query(query)
+        if key:
+            self._record(QUERY, key, " ".join(query.lower().split()))
+
+    def record_pantry(self, fingerprint: str) -> None:
+        if fingerprint:
+            self._record(PANTRY, fingerprint, fingerprint)
+
+    def _record(self, kind: str, key: str, value: str) -> None:
+        self._hits[(kind, key)] += 1
+        self._values[(kind, key)] = value
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="query-stats")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Add the pending counts to the table; returns how many keys were written"""
+        hits, self._hits = self._hits, Counter()
+        values, self._values = self._values, {}
+        if not hits:
+            return 0
+        stats = [
+            {"kind": kind, "key": key, "value": values[(kind, key)], "hits": count}
+            for (kind, key), count in hits.items()
+        ]
+        try:
+            await asyncio.to_thread(lambda: supabase.rpc("record_query_stats", {"stats": stats}).execute())
+        except Exception as e:
+            logger.error(f"Dropped query stats for {len(stats)} keys: {e}")
+            return 0
+        return len(stats)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    @staticmethod
+    def top(kind: str, limit: int, days: float) -> List[Dict]:
+        """Most requested keys of a kind seen within the last `days`"""
+        rows = supabase.table("query_stats") \
+            .select("key, value, hits") \
+            .eq("kind", kind) \
+            .gt("last_seen", (datetime.now() - timedelta(days=days)).isoformat()) \
+            .order("hits", desc=True) \
+            .limit(limit) \
+            .execute().data
+        return rows or []
+
+
+query_stats = QueryStats(settings.QUERY_STATS_FLUSH_INTERVAL)
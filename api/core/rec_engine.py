@@ -2,25 +2,31 @@ import asyncio
 import json
 import logging
 import os
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 from api.core.cache import cache_recipes, get_cached_recipes
-from api.settings import Settings
+from api.settings import get_settings
 import numpy as np
 from fastapi import HTTPException
-from openai import OpenAI, OpenAIError, RateLimitError
+from .container import lazy
 from .database import get_supabase
+from .deadline import DeadlineExceeded
+from .llm import chat_completion
+from .openai_gateway import Priority, gateway
+from .metrics import cache_hit, cache_miss, timed
 from api.models.schemas import Ingredient, RecipeCreate, ScoredRecipe
 
-settings = Settings()
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 supabase = get_supabase()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+client = lazy("openai")
 
-def normalize_ingredient(ingredient: Ingredient) -> str:
+def normalize_ingredient(ingredient: Union[Ingredient, str]) -> str:
     """Normalize ingredient names for comparison"""
+    name = ingredient if isinstance(ingredient, str) else ingredient.name
     return (
-        ingredient.name.lower()
+        name.lower()
         .replace("fresh", "")
         .replace("dried", "")
         .replace("chopped", "")
@@ -31,34 +37,74 @@ def cosine_similarity(a: List[float], b: List[float]) -> float:
     """Compute cosine similarity between two vectors"""
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
-async def get_embedding(text: str, model="text-embedding-3-small") -> list[float]:
-    """Get text embedding from OpenAI asynchronously with error handling"""
-    text = text.replace("\n", " ")
+# (model, text) -> embedding for recently embedded texts: the same pantry is
+# embedded on every visit, and the cache-warming job pre-fills popular ones
+recent_embeddings: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
 
-    def blocking_call():
-        return client.embeddings.create(input=[text], model=model)
 
-    try:
-        response = await asyncio.to_thread(blocking_call)
-        return response.data[0].embedding
-    except RateLimitError as e:
-        print(f"OpenAI rate limit error: {e}")
+def remember_embedding(model: str, text: str, embedding: list) -> None:
+    recent_embeddings[(model, text)] = embedding
+    recent_embeddings.move_to_end((model, text))
+    while len(recent_embeddings) > settings.EMBEDDING_CACHE_SIZE:
+        recent_embeddings.popitem(last=False)
+
+
+async def get_embedding(
+    text: str, model="text-embedding-3-small", priority: Priority = Priority.INTERACTIVE
+) -> list[float]:
+    """Get text embedding from OpenAI through the shared gateway; [] if it keeps failing"""
+    embeddings = await get_embeddings([text], model, priority)
+    return embeddings[0] if embeddings else []
+
+
+async def get_embeddings(
+    texts: List[str], model="text-embedding-3-small", priority: Priority = Priority.INTERACTIVE
+) -> List[list[float]]:
+    """
+    Embed several texts in one request; [] once retries are exhausted or the
+    deadline passes. Recently embedded texts are answered from memory.
+    """
+    texts = [text.replace("\n", " ") for text in texts]
+    if not texts:
         return []
-    except OpenAIError as e:
-        print(f"OpenAI API error: {e}")
+
+    known = {text: recent_embeddings[(model, text)] for text in texts if (model, text) in recent_embeddings}
+    missing = list(dict.fromkeys(text for text in texts if text not in known))
+    for _ in range(len(texts) - len(missing)):
+        cache_hit("embedding")
+
+    try:
+        if missing:
+            with timed("embedding"):
+                fetched = await gateway.embed(missing, model, priority)
+            for text, embedding in zip(missing, fetched):
+                cache_miss("embedding")
+                remember_embedding(model, text, embedding)
+                known[text] = embedding
+        return [known[text] for text in texts]
+    except DeadlineExceeded:
+        logger.warning("No time left for an embedding before the request deadline")
         return []
+    except Exception as e:
+        # openai is imported lazily (it is slow to import); by now the client has loaded it
+        from openai import OpenAIError
+
+        if isinstance(e, OpenAIError):
+            logger.error(f"OpenAI embedding failed after retries: {e}")
+            return []
+        raise
 
 
-def classify_cuisine(recipe) -> str:
+async def classify_cuisine(recipe, priority: Priority = Priority.BACKGROUND) -> str:
     """Classify recipe cuisine using LLM"""
     ingredients = ", ".join(
         f"{i.quantity} {i.unit} {i.name}" for i in recipe.ingredients
     )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
+        content = await chat_completion(
+            "gpt-3.5-turbo",
+            [
                 {
                     "role": "system",
                     "content": "Classify the cuisine type. Respond with just one word: Italian, Mexican, Chinese, Indian, American, Mediterranean, Japanese, Thai, French, or Other.",
@@ -68,10 +114,11 @@ def classify_cuisine(recipe) -> str:
                     "content": f"Title: {recipe.title}\nIngredients: {ingredients}",
                 },
             ],
+            priority=priority,
             temperature=0.3,
         )
 
-        return response.choices[0].message.content.strip()
+        return content.strip()
     
     except Exception as e:
         logger.warning(f"Cuisine Not Classified : {e}")
@@ -0,0 +1,69 @@
+"""
+In-process read-through cache for recipe rows, keyed by recipe id.
+
+Recipe pages and feeds fetch the same rows over and over; this keeps the
+most recently used ones in memory. Writes made by this worker (cuisine
+classification, refresh crawls) invalidate their rows directly; changes
+made by other workers are picked up once an entry is RECIPE_ROW_CACHE_TTL
+seconds old.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api.settings import get_settings
+from .metrics import cache_hit, cache_miss
+
+settings = get_settings()
+
+
+class RowCache:
+    def __init__(self, name: str, max_entries: int = 10000, ttl: float = 300.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.get_many([key]).get(str(key))
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Cached rows for the keys that have a live entry; records a hit or miss per key"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in map(str, keys):
+                entry = self._rows.get(key)
+                if entry is None or now - entry[0] > self.ttl:
+                    cache_miss(self.name)
+                    continue
+                self._rows.move_to_end(key)
+                found[key] = entry[1]
+                cache_hit(self.name)
+        return found
+
+    def put_many(self, rows: Iterable[Dict], key: str = "id") -> None:
+        now = time.monotonic()
+        with self._lock:
+            for row in rows:
+                self._rows[str(row[key])] = (now, row)
+                self._rows.move_to_end(str(row[key]))
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._rows.pop(str(key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+
+recipe_rows = RowCache("recipe_rows", settings.RECIPE_ROW_CACHE_SIZE, settings.RECIPE_ROW_CACHE_TTL)
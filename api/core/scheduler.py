@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .database import get_supabase
+from .metrics import Counter, Histogram, registry
+
+logger = logging.getLogger(__name__)
+supabase = get_supabase()
+
+# A job returns the number of rows it touched
+JobFunc = Callable[[], Awaitable[int]]
+
+job_duration = registry.register(Histogram(
+    "pantrychef_maintenance_job_duration_seconds",
+    "Duration of maintenance job runs",
+    ["job"],
+))
+job_rows = registry.register(Counter(
+    "pantrychef_maintenance_rows_affected_total",
+    "Rows affected by maintenance jobs",
+    ["job"],
+))
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    interval: float
+    func: JobFunc
+    run_on_start: bool = False
+    last_started_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_rows_affected: Optional[int] = None
+    last_error: Optional[str] = None
+    runs: int = 0
+    skipped: int = 0
+
+
+@dataclass
+class MaintenanceScheduler:
+    """
+    Runs periodic jobs inside the app process.
+
+    Every uvicorn worker runs its own scheduler, so each tick first takes a
+    database lease on the job (the `acquire_job_lease` RPC). Only the worker
+    that gets the lease runs the job; the others skip until the next tick.
+    The lease lasts slightly less than the interval, so the job runs about
+    once per interval across the whole deployment.
+    """
+
+    holder: str = field(
+        default_factory=lambda: f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    )
+    jobs: Dict[str, ScheduledJob] = field(default_factory=dict)
+    _tasks: List[asyncio.Task] = field(default_factory=list)
+
+    def register(self, name: str, interval: float, func: JobFunc, run_on_start: bool = False) -> None:
+        self.jobs[name] = ScheduledJob(name=name, interval=interval, func=func, run_on_start=run_on_start)
+
+    def start(self) -> None:
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"maintenance:{job.name}"))
+        logger.info(f"Maintenance scheduler started with jobs: {', '.join(self.jobs)}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "interval": job.interval,
+                "runs": job.runs,
+                "skipped": job.skipped,
+                "last_started_at": job.last_started_at,
+                "last_duration_ms": job.last_duration_ms,
+                "last_rows_affected": job.last_rows_affected,
+                "last_error": job.last_error,
+            }
+            for name, job in self.jobs.items()
+        }
+
+    async def _loop(self, job: ScheduledJob) -> None:
+        # Spread workers out so they don't all race for the lease at once
+        delay = random.uniform(0, min(job.interval, 30)) if job.run_on_start else job.interval
+        while True:
+            await asyncio.sleep(delay)
+            delay = job.interval
+            try:
+                await self.run_once(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Maintenance job '{job.name}' crashed: {e}")
+
+    async def run_once(self, job: ScheduledJob) -> bool:
+        """Run the job if this worker gets the lease; returns whether it ran"""
+        if not self._acquire_lease(job):
+            job.skipped += 1
+            return False
+
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        rows, error = 0, None
+        try:
+            rows = await job.func() or 0
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Maintenance job '{job.name}' failed: {e}")
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        job_duration.observe(duration_ms / 1000, job.name)
+        job_rows.inc(job.name, amount=rows)
+        job.runs += 1
+        job.last_started_at = started_at
+        job.last_duration_ms = duration_ms
+        job.last_rows_affected = rows
+        job.last_error = error
+        logger.info(f"Maintenance job '{job.name}' took {duration_ms:.0f}ms, {rows} rows affected")
+
+        self._record_run(job, started_at, duration_ms, rows, error)
+        return True
+
+    def _acquire_lease(self, job: ScheduledJob) -> bool:
+        try:
+            result = supabase.rpc(
+                "acquire_job_lease",
+                {
+                    "p_job_name": job.name,
+                    "p_holder": self.holder,
+                    "p_ttl_seconds": max(int(job.interval * 0.9), 1),
+                },
+            ).execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.warning(f"Could not acquire lease for '{job.name}': {e}")
+            return False
+
+    def _record_run(
+        self,
+        job: ScheduledJob,
+        started_at: datetime,
+        duration_ms: float,
+        rows: int,
+        error: Optional[str],
+    ) -> None:
+        try:
+            supabase.table("maintenance_runs").insert(
+                {
+                    "job_name": job.name,
+                    "holder": self.holder,
+                    "started_at": started_at.isoformat(),
+                    "duration_ms": round(duration_ms, 1),
+                    "rows_affected": rows,
+                    "error": error,
+                }
+            ).execute()
+        except Exception as e:
+            logger.warning(f"Could not record run of '{job.name}': {e}")
@@ -0,0 +1,120 @@
+"""
+Second stage of the recipe query cache: reuse a cached result set for a
+query that means the same thing as one already cached ("chicken noodle
+soup" vs "soup with chicken and noodles").
+
+`recipe_cache.query_embedding` holds the int8-packed embedding of each
+cached query. Every worker keeps the live ones in a small in-memory matrix,
+reloaded every SEMANTIC_CACHE_REFRESH_INTERVAL seconds and extended with its
+own writes, and looks a new query up by cosine similarity.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.settings import get_settings
+from .database import get_supabase
+from .quantization import unpack_int8
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+supabase = get_supabase()
+
+# Embeddings of recently looked-up queries, kept so the write that follows a
+# miss can store the embedding without calling the API again
+RECENT_EMBEDDINGS = 1024
+
+
+class SemanticQueryIndex:
+    def __init__(self, threshold: float = 0.92, refresh_interval: float = 30.0):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[np.ndarray, datetime]] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._hashes: List[str] = []
+        self._recent: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._refreshed_at = 0.0
+
+    def remember(self, canonical: str, embedding: Sequence[float]) -> None:
+        with self._lock:
+            self._recent[canonical] = list(embedding)
+            self._recent.move_to_end(canonical)
+            while len(self._recent) > RECENT_EMBEDDINGS:
+                self._recent.popitem(last=False)
+
+    def recent_embedding(self, canonical: str) -> Optional[List[float]]:
+        return self._recent.get(canonical)
+
+    def add(self, query_hash: str, embedding: Sequence[float], expires_at: datetime) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        with self._lock:
+            self._entries[query_hash] = (vector / norm, expires_at)
+            self._matrix = None
+
+    def discard(self, query_hashes: Sequence[str]) -> None:
+        with self._lock:
+            for query_hash in query_hashes:
+                if self._entries.pop(query_hash, None) is not None:
+                    self._matrix = None
+
+    def lookup(self, embedding: Sequence[float]) -> Optional[Tuple[str, float]]:
+        """(query_hash, similarity) of the closest live cached query above the threshold"""
+        self._refresh()
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        matrix, hashes = self._live_matrix()
+        if matrix is None or norm == 0 or matrix.shape[1] != query.shape[0]:
+            return None
+        scores = matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return hashes[best], float(scores[best])
+
+    def _live_matrix(self) -> Tuple[Optional[np.ndarray], List[str]]:
+        with self._lock:
+            now = datetime.now()
+            expired = [h for h, (_, expires_at) in self._entries.items() if expires_at <= now]
+            for query_hash in expired:
+                del self._entries[query_hash]
+            if expired or self._matrix is None:
+                self._hashes = list(self._entries)
+                self._matrix = np.stack([self._entries[h][0] for h in self._hashes]) if self._hashes else None
+            return self._matrix, self._hashes
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = now
+        try:
+            rows = supabase.table("recipe_cache") \
+                .select("query_hash, query_embedding, expires_at") \
+                .gt("expires_at", datetime.now()) \
+                .not_.is_("query_embedding", "null") \
+                .execute().data or []
+        except Exception as e:
+            logger.warning(f"Could not load cached query embeddings: {e}")
+            return
+        for row in rows:
+            try:
+                expires_at = datetime.fromisoformat(row["expires_at"])
+                if expires_at.tzinfo is not None:
+                    expires_at = expires_at.astimezone().replace(tzinfo=None)
+                self.add(row["query_hash"], unpack_int8(row["query_embedding"]), expires_at)
+            except (ValueError, TypeError) as e:
+                logger.debug(f"Skipping cached query embedding {row.get('query_hash')}: {e}")
+
+
+# Per-process index; loads the live entries on first lookup
+semantic_index = SemanticQueryIndex(settings.SEMANTIC_CACHE_THRESHOLD, settings.SEMANTIC_CACHE_REFRESH_INTERVAL)
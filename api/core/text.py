@@ -0,0 +1,31 @@
+"""
+Tokenization shared by the text index and the query cache.
+"""
+import re
+from typing import List
+
+STOPWORDS = {
+    "a", "an", "and", "best", "easy", "for", "in", "of", "on", "or", "quick",
+    "recipe", "recipes", "simple", "the", "to", "with",
+}
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def stem(token: str) -> str:
+    """Plural folding only; applied to documents and queries alike"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("oes", "ches", "shes", "xes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def canonical_query(query: str) -> str:
+    """Order-, case-, punctuation- and stop-word-insensitive form of a search query"""
+    return " ".join(sorted(set(tokenize(query)))) or " ".join(query.lower().split())
@@ -0,0 +1,192 @@
+"""
+In-process BM25 full-text index over recipe titles and canonical ingredients.
+
+Lets `/api/recipes/?query=...` answer from recipes already in the corpus
+instead of crawling. The index is rebuilt from the `recipes` table by a
+maintenance job, which writes a JSON snapshot (atomic rename); workers load
+it on first use, reload when the file changes and add the recipes they store
+themselves in between.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api.settings import get_settings
+from .database import get_supabase
+from .rec_engine import normalize_ingredient
+from .text import tokenize
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+supabase = get_supabase()
+
+K1 = 1.2
+B = 0.75
+# Title terms count this many times: "chicken curry" in a title says more than
+# chicken among twelve ingredients
+TITLE_WEIGHT = 2
+
+
+def document_terms(recipe: Dict) -> List[str]:
+    """Weighted term list for a recipe row (or RecipeCreate dump)"""
+    terms = tokenize(recipe.get("title") or "") * TITLE_WEIGHT
+    for ingredient in recipe.get("ingredients") or []:
+        name = ingredient.get("name") if isinstance(ingredient, dict) else getattr(ingredient, "name", "")
+        terms.extend(tokenize(normalize_ingredient(name or "")))
+    return terms
+
+
+class RecipeTextIndex:
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Counter] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._local: set = set()
+        self._loaded_mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, recipe_id: str, terms: Iterable[str]) -> None:
+        counts = Counter(terms)
+        with self._lock:
+            self._remove(recipe_id)
+            self._docs[recipe_id] = counts
+            self._lengths[recipe_id] = sum(counts.values())
+            self._total_length += self._lengths[recipe_id]
+            self._local.add(recipe_id)
+            for term, tf in counts.items():
+                self._postings[term][recipe_id] = tf
+
+    def add_recipes(self, recipes: Iterable[Dict]) -> None:
+        for recipe in recipes:
+            if recipe.get("id"):
+                self.add(str(recipe["id"]), document_terms(recipe))
+
+    def _remove(self, recipe_id: str) -> None:
+        counts = self._docs.pop(recipe_id, None)
+        if counts is None:
+            return
+        self._total_length -= self._lengths.pop(recipe_id, 0)
+        for term in counts:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(recipe_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float, float]]:
+        """
+        Best matches as (recipe_id, bm25 score, coverage), best first.
+
+        Coverage is the share of the query's IDF weight the recipe matches,
+        so 1.0 means every query term appears; it is comparable across
+        queries where raw BM25 scores are not.
+        """
+        self._refresh()
+        terms = list(dict.fromkeys(tokenize(query)))
+        n = len(self._docs)
+        if not terms or not n or not self._total_length:
+            return []
+        lengths = self._lengths
+        # BM25 length normalization, K1 * (1 - B + B * length / average_length), split up
+        base, per_term = K1 * (1 - B), K1 * B * n / self._total_length
+
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, float] = defaultdict(float)
+        total_idf = 0.0
+        for term in terms:
+            postings = self._postings.get(term, {})
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            total_idf += idf
+            weight = idf * (K1 + 1)
+            for recipe_id, tf in postings.items():
+                scores[recipe_id] += weight * tf / (tf + base + per_term * lengths[recipe_id])
+                matched[recipe_id] += idf
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [(recipe_id, score, matched[recipe_id] / total_idf) for recipe_id, score in ranked]
+
+    def save(self) -> None:
+        """Write the snapshot atomically; rebuilt postings are derived on load"""
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        staging = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}.tmp")
+        with self._lock:
+            docs = {recipe_id: dict(counts) for recipe_id, counts in self._docs.items()}
+        with open(staging, "w") as f:
+            json.dump({"version": 1, "created_at": time.time(), "docs": docs}, f)
+        os.replace(staging, self.path)
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            with open(self.path) as f:
+                docs = json.load(f)["docs"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load text index {self.path}: {e}")
+            return
+
+        postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        counts = {}
+        for recipe_id, terms in docs.items():
+            counts[recipe_id] = Counter(terms)
+            for term, tf in terms.items():
+                postings[term][recipe_id] = tf
+        with self._lock:
+            # Recipes this worker stored since the snapshot was taken stay searchable
+            for recipe_id in self._local - counts.keys():
+                counts[recipe_id] = self._docs[recipe_id]
+                for term, tf in counts[recipe_id].items():
+                    postings[term][recipe_id] = tf
+            self._docs, self._postings = counts, postings
+            self._lengths = {recipe_id: sum(c.values()) for recipe_id, c in counts.items()}
+            self._total_length = sum(self._lengths.values())
+            self._local = {recipe_id for recipe_id in self._local if recipe_id not in docs}
+            self._loaded_mtime = mtime
+        logger.info(f"Loaded text index {self.path} ({len(counts)} recipes)")
+
+
+def rebuild_text_index(path: str, page_size: int = 1000) -> int:
+    """Index every recipe and publish the snapshot; returns recipes indexed"""
+    fresh = RecipeTextIndex(path)
+    cursor = None
+    while True:
+        query = supabase.from_("recipes") \
+            .select("id, title, ingredients") \
+            .order("id") \
+            .limit(page_size)
+        if cursor is not None:
+            query = query.gt("id", cursor)
+        rows = query.execute().data or []
+        fresh.add_recipes(rows)
+        if len(rows) < page_size:
+            break
+        cursor = rows[-1]["id"]
+    fresh.save()
+    return len(fresh)
+
+
+# Per-process index; loads the snapshot on first search
+text_index = RecipeTextIndex(settings.TEXT_INDEX_PATH)
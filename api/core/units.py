@@ -0,0 +1,165 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from api.models.schemas import Ingredient
+
+# canonical unit -> (dimension, factor to the dimension's base unit)
+# Volume is measured in millilitres, mass in grams.
+UNITS: Dict[str, Tuple[str, float]] = {
+    "ml": ("volume", 1.0),
+    "l": ("volume", 1000.0),
+    "tsp": ("volume", 4.92892),
+    "tbsp": ("volume", 14.7868),
+    "fl oz": ("volume", 29.5735),
+    "cup": ("volume", 236.588),
+    "pint": ("volume", 473.176),
+    "quart": ("volume", 946.353),
+    "gallon": ("volume", 3785.41),
+    "g": ("mass", 1.0),
+    "kg": ("mass", 1000.0),
+    "oz": ("mass", 28.3495),
+    "lb": ("mass", 453.592),
+}
+
+UNIT_ALIASES: Dict[str, str] = {
+    "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml",
+    "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "teaspoon": "tsp", "teaspoons": "tsp", "tsps": "tsp",
+    "tablespoon": "tbsp", "tablespoons": "tbsp", "tbsps": "tbsp", "tbs": "tbsp", "tbl": "tbsp",
+    "fluid ounce": "fl oz", "fluid ounces": "fl oz", "fl. oz": "fl oz", "fl oz.": "fl oz",
+    "cups": "cup", "c": "cup",
+    "pints": "pint", "pt": "pint",
+    "quarts": "quart", "qt": "quart",
+    "gallons": "gallon", "gal": "gallon",
+    "gram": "g", "grams": "g", "gr": "g",
+    "kilogram": "kg", "kilograms": "kg", "kgs": "kg",
+    "ounce": "oz", "ounces": "oz",
+    "pound": "lb", "pounds": "lb", "lbs": "lb",
+}
+
+UNICODE_FRACTIONS = {
+    "½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75,
+    "⅕": 0.2, "⅖": 0.4, "⅗": 0.6, "⅘": 0.8, "⅙": 1 / 6, "⅚": 5 / 6,
+    "⅛": 0.125, "⅜": 0.375, "⅝": 0.625, "⅞": 0.875,
+}
+
+_NUMBER = re.compile(r"(\d+(?:\.\d+)?)(?:\s*/\s*(\d+))?")
+
+
+def canonical_unit(unit: Optional[str]) -> str:
+    """Map unit spellings ('Tablespoons', 'lbs') onto one canonical form"""
+    unit = (unit or "").lower().strip().rstrip(".")
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def unit_dimension(unit: Optional[str]) -> str:
+    """Dimension a unit can be converted within; unknown units only merge with themselves"""
+    unit = canonical_unit(unit)
+    if unit in UNITS:
+        return UNITS[unit][0]
+    return unit or "count"
+
+
+def parse_quantity(quantity: Optional[str]) -> Optional[float]:
+    """
+    Parse recipe quantities such as '2', '1.5', '1 1/2', '½' or '1-2'.
+    Ranges resolve to their upper bound, which is what a shopping list needs.
+    Returns None when nothing numeric can be read.
+    """
+    if not quantity:
+        return None
+
+    text = quantity.strip()
+    for char, value in UNICODE_FRACTIONS.items():
+        text = text.replace(char, f" {value}")
+
+    # '1-2' / '1 to 2' -> keep the upper bound
+    parts = re.split(r"\s*(?:-|–|to)\s*", text)
+    text = parts[-1] if len(parts) > 1 and parts[-1] else parts[0]
+
+    total = 0.0
+    found = False
+    for whole, denominator in _NUMBER.findall(text):
+        if denominator:
+            if float(denominator) == 0:
+                return None
+            total += float(whole) / float(denominator)
+        else:
+            total += float(whole)
+        found = True
+
+    return total if found else None
+
+
+def format_quantity(value: float) -> str:
+    """Render a summed quantity without float noise"""
+    return f"{round(value, 2):g}"
+
+
+def grocery_key(name: str, unit: Optional[str]) -> str:
+    """Merge key for a canonical ingredient name: one row per name and unit dimension"""
+    dimension = unit_dimension(unit)
+    return name if dimension == "count" else f"{name}_{dimension}"
+
+
+def split_quantity(quantity: Optional[str]) -> Tuple[Optional[float], List[str]]:
+    """
+    Split a quantity, possibly one merged before ('2 + a pinch'), into the
+    sum of its numeric terms (None if there are none) and the terms that
+    cannot be parsed, which are kept as written.
+    """
+    total = None
+    unparsed = []
+    for term in (quantity or "").split(" + "):
+        term = term.strip()
+        if not term:
+            continue
+        value = parse_quantity(term)
+        if value is None:
+            unparsed.append(term)
+        else:
+            total = (total or 0.0) + value
+    return total, unparsed
+
+
+def merge_quantities(first: Ingredient, second: Ingredient) -> Ingredient:
+    """
+    Sum two quantities of the same ingredient in compatible units.
+    The result is expressed in the first ingredient's unit, or the second's
+    if only it has a number. Terms that cannot be parsed ('a pinch') are not
+    guessed at but kept after the sum: '2' and '1 + a pinch' give '3 + a pinch'.
+    """
+    first_value, first_unparsed = split_quantity(first.quantity)
+    second_value, second_unparsed = split_quantity(second.quantity)
+
+    unit = first.unit
+    if first_value is None:
+        value, unit = second_value, second.unit
+    elif second_value is None:
+        value = first_value
+    else:
+        first_unit = canonical_unit(first.unit)
+        second_unit = canonical_unit(second.unit)
+        if first_unit != second_unit and first_unit in UNITS and second_unit in UNITS:
+            second_value = second_value * UNITS[second_unit][1] / UNITS[first_unit][1]
+        value = first_value + second_value
+
+    terms = ([format_quantity(value)] if value is not None else []) + first_unparsed + second_unparsed
+    return Ingredient(name=first.name, unit=unit, quantity=" + ".join(terms))
+
+
+def merge_ingredients(
+    ingredients: List[Tuple[str, Ingredient]]
+) -> Dict[str, Ingredient]:
+    """
+    Collapse (canonical name, ingredient) pairs into one ingredient per
+    grocery key, summing quantities whose units are compatible.
+    """
+    merged: Dict[str, Ingredient] = {}
+    for name, ingredient in ingredients:
+        key = grocery_key(name, ingredient.unit)
+        if key in merged:
+            merged[key] = merge_quantities(merged[key], ingredient)
+        else:
+            merged[key] = ingredient
+    return merged
@@ -0,0 +1,472 @@
+"""
+Recipe embedding matrix shared across worker processes through mmap.
+
+A builder publishes each snapshot as a new generation directory:
+
+    <root>/gen-<timestamp>-<pid>/vectors.npy   float32 (n, dim), rows L2-normalized
+    <root>/gen-<timestamp>-<pid>/vectors_f16.npy  float16 copy
+    <root>/gen-<timestamp>-<pid>/codes.npy     int8 (n, dim) + scales.npy float32 (n,)
+    <root>/gen-<timestamp>-<pid>/ids.npy       fixed-width bytes (n,), recipe ids
+    <root>/gen-<timestamp>-<pid>/ivf_*.npy     optional IVF centroids and list offsets
+    <root>/gen-<timestamp>-<pid>/meta.json
+    <root>/CURRENT                            name of the live generation
+    <root>/delta-<timestamp>-<pid>.npz         recipes stored since a snapshot
+
+CURRENT is replaced with an atomic rename, so readers see either the old or
+the new generation, never a partial one. Readers map the files read-only
+(`np.load(mmap_mode="r")`), so every worker shares the OS page cache copy
+instead of holding its own matrix. Old generations are removed once two
+newer ones exist; a worker still mapping one keeps a valid mapping until it
+notices CURRENT changed.
+
+Searches can run a first pass over the float16 or int8 copy (a half or a
+quarter of the bytes to stream) and then rescore the best
+`k * rescore_factor` candidates exactly against the float32 rows, which
+touches only those rows' pages. When the generation carries an IVF index
+(see api/core/ann_index.py), only the `probes` nearest lists are scanned.
+
+Recipes stored between rebuilds are appended as small delta files, which
+every worker picks up on its next check and searches exhaustively; the
+next generation folds them in and the files are removed.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.settings import get_settings
+from .ann_index import IVF_MIN_VECTORS, build_ivf, default_lists, probe_ranges
+from .database import get_supabase
+from .quantization import quantize_int8
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+supabase = get_supabase()
+
+CURRENT = "CURRENT"
+KEEP_GENERATIONS = 3
+PRECISIONS = ("float32", "float16", "int8")
+# Rows converted to float32 at a time in the approximate pass; small enough
+# that the scratch buffer stays in cache between the conversion and the matmul
+SCAN_CHUNK = 256
+
+
+def parse_embedding(value) -> np.ndarray:
+    """pgvector arrives as text ('[0.1,...]') over PostgREST, or as a JSON list"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def _encode_ids(ids: Sequence[str]) -> np.ndarray:
+    width = max((len(i) for i in ids), default=1)
+    return np.asarray([i.encode() for i in ids], dtype=f"S{width}")
+
+
+def _timestamp(name: str) -> int:
+    """Nanosecond timestamp in a `gen-<ns>-<pid>` or `delta-<ns>-<pid>.npz` name"""
+    return int(name.split("-")[1])
+
+
+def publish_generation(
+    root: str,
+    ids: Sequence[str],
+    vectors: np.ndarray,
+    ivf_lists: int = 0,
+    snapshot_ns: Optional[int] = None,
+) -> str:
+    """
+    Write a new generation and atomically make it current; returns its name.
+
+    `snapshot_ns` is when the source rows were read; deltas written after it
+    stay live on top of this generation. With `ivf_lists`, rows are stored
+    grouped by IVF list.
+    """
+    os.makedirs(root, exist_ok=True)
+    name = f"gen-{time.time_ns()}-{os.getpid()}"
+    staging = os.path.join(root, f".{name}.tmp")
+    os.makedirs(staging)
+
+    vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+    if ivf_lists and len(vectors):
+        order, offsets, centroids = build_ivf(vectors, ivf_lists)
+        vectors, ids = vectors[order], [ids[i] for i in order]
+        np.save(os.path.join(staging, "ivf_centroids.npy"), centroids)
+        np.save(os.path.join(staging, "ivf_offsets.npy"), offsets)
+        ivf_lists = len(centroids)
+
+    np.save(os.path.join(staging, "vectors.npy"), vectors)
+    np.save(os.path.join(staging, "vectors_f16.npy"), vectors.astype(np.float16))
+    codes, scales = quantize_int8(vectors) if len(vectors) else (np.zeros((0, 0), np.int8), np.zeros(0, np.float32))
+    np.save(os.path.join(staging, "codes.npy"), codes)
+    np.save(os.path.join(staging, "scales.npy"), scales)
+    np.save(os.path.join(staging, "ids.npy"), _encode_ids(ids))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"count": len(ids), "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                   "created_at": time.time(), "snapshot_ns": snapshot_ns or time.time_ns(),
+                   "ivf_lists": ivf_lists}, f)
+    os.replace(staging, os.path.join(root, name))
+
+    pointer = os.path.join(root, f".{CURRENT}.{os.getpid()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(root, CURRENT))
+
+    _remove_old_generations(root, keep=KEEP_GENERATIONS)
+    return name
+
+
+def _read_meta(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    meta.setdefault("snapshot_ns", int(meta.get("created_at", 0) * 1e9))
+    return meta
+
+
+def _remove_old_generations(root: str, keep: int) -> None:
+    generations = sorted((d for d in os.listdir(root) if d.startswith("gen-")), key=_timestamp)
+    for stale in generations[:-keep]:
+        shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
+
+    # Deltas already folded into every kept generation are no longer read
+    kept = generations[-keep:]
+    if not kept:
+        return
+    covered = _read_meta(os.path.join(root, kept[0])).get("snapshot_ns", 0)
+    for delta in os.listdir(root):
+        if delta.startswith("delta-") and delta.endswith(".npz") and _timestamp(delta) < covered:
+            try:
+                os.remove(os.path.join(root, delta))
+            except FileNotFoundError:
+                pass
+
+
+def append_delta(root: str, ids: Sequence[str], vectors: np.ndarray) -> str:
+    """Publish newly stored embeddings ahead of the next rebuild; returns the file name"""
+    os.makedirs(root, exist_ok=True)
+    name = f"delta-{time.time_ns()}-{os.getpid()}.npz"
+    staging = os.path.join(root, f".{name}.tmp")
+    with open(staging, "wb") as f:
+        np.savez(f, ids=_encode_ids(ids), vectors=normalize_rows(np.asarray(vectors, dtype=np.float32)))
+    os.replace(staging, os.path.join(root, name))
+    return name
+
+
+class SharedEmbeddingMatrix:
+    """Read-only, lazily (re)mapped view of the current generation plus live deltas"""
+
+    def __init__(
+        self,
+        root: str,
+        check_interval: float = 5.0,
+        precision: str = "float32",
+        rescore_factor: int = 4,
+        probes: int = 0,
+    ):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}")
+        self.root = root
+        self.check_interval = check_interval
+        self.precision = precision
+        self.rescore_factor = rescore_factor
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._generation: Optional[str] = None
+        self._snapshot_ns = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._compact: Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+        self._ivf: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._ids: Optional[np.ndarray] = None
+        self._row_of: Dict[str, int] = {}
+        self._deltas: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._delta: Tuple[List[str], Optional[np.ndarray]] = ([], None)
+        self._checked_at = 0.0
+
+    def _current_name(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if self._vectors is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            name = self._current_name()
+            if name is not None and name != self._generation:
+                self._map_generation(name)
+            self._load_deltas()
+
+    def _map_generation(self, name: str) -> None:
+        directory = os.path.join(self.root, name)
+        try:
+            vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+            ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        except (FileNotFoundError, ValueError) as e:
+            logger.warning(f"Could not map embedding generation {name}: {e}")
+            return
+        compact = {}
+        try:
+            compact["float16"] = (np.load(os.path.join(directory, "vectors_f16.npy"), mmap_mode="r"), None)
+            compact["int8"] = (
+                np.load(os.path.join(directory, "codes.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, "scales.npy"), mmap_mode="r"),
+            )
+        except FileNotFoundError:
+            pass  # generation predates compact copies; searches stay exact
+        try:
+            ivf = (
+                np.load(os.path.join(directory, "ivf_centroids.npy")),
+                np.load(os.path.join(directory, "ivf_offsets.npy")),
+            )
+        except FileNotFoundError:
+            ivf = None
+        self._vectors, self._ids, self._compact, self._ivf, self._generation = vectors, ids, compact, ivf, name
+        self._snapshot_ns = _read_meta(directory).get("snapshot_ns", 0)
+        self._row_of = {}
+        logger.info(f"Mapped embedding generation {name} ({len(ids)} vectors)")
+
+    def _load_deltas(self) -> None:
+        try:
+            names = sorted(
+                d for d in os.listdir(self.root)
+                if d.startswith("delta-") and d.endswith(".npz") and _timestamp(d) >= self._snapshot_ns
+            )
+        except FileNotFoundError:
+            names = []
+        if names == list(self._deltas):
+            return
+        deltas = {}
+        for name in names:
+            if name in self._deltas:
+                deltas[name] = self._deltas[name]
+                continue
+            try:
+                with np.load(os.path.join(self.root, name)) as data:
+                    deltas[name] = ([i.decode() for i in data["ids"]], data["vectors"])
+            except (FileNotFoundError, ValueError, OSError) as e:
+                logger.debug(f"Skipping embedding delta {name}: {e}")
+        self._deltas = deltas
+        if deltas:
+            self._delta = (
+                [i for ids, _ in deltas.values() for i in ids],
+                np.concatenate([vectors for _, vectors in deltas.values()]),
+            )
+        else:
+            self._delta = ([], None)
+
+    @property
+    def available(self) -> bool:
+        self._refresh()
+        return self._vectors is not None and len(self._vectors) > 0
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Make new recipes searchable in every worker before the next rebuild"""
+        if not len(ids):
+            return
+        append_delta(self.root, [str(i) for i in ids], vectors)
+        self._checked_at = 0.0
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 50,
+        threshold: float = 0.0,
+        precision: Optional[str] = None,
+        rescore_factor: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Top-k (recipe_id, cosine similarity) above `threshold`; scores are always exact.
+
+        `probes` > 0 scans only that many IVF lists when the generation has an
+        index; 0 scans everything.
+        """
+        self._refresh()
+        vectors, ids = self._vectors, self._ids
+        delta_ids, delta_vectors = self._delta
+        if vectors is None or not len(vectors):
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if q.shape[0] != vectors.shape[1] or norm == 0:
+            return []
+        q = q / norm
+
+        rows, scores = self._search_generation(
+            q,
+            k,
+            precision or self.precision,
+            rescore_factor or self.rescore_factor,
+            self.probes if probes is None else probes,
+        )
+        matches = [(ids[row].decode(), float(score)) for row, score in zip(rows, scores)]
+
+        if delta_vectors is not None and delta_vectors.shape[1] == q.shape[0]:
+            seen = {recipe_id for recipe_id, _ in matches}
+            delta_scores = delta_vectors @ q
+            matches.extend(
+                (recipe_id, float(score))
+                for recipe_id, score in zip(delta_ids, delta_scores)
+                if recipe_id not in seen
+            )
+            matches.sort(key=lambda m: -m[1])
+
+        return [m for m in matches[:k] if m[1] >= threshold]
+
+    def _search_generation(
+        self, q: np.ndarray, k: int, precision: str, rescore_factor: int, probes: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Best rows of the mapped generation and their exact scores, best first"""
+        vectors, compact = self._vectors, self._compact
+        if probes and self._ivf is not None:
+            ranges = probe_ranges(self._ivf[0], self._ivf[1], q, probes)
+        else:
+            ranges = [(0, len(vectors))]
+        if not ranges:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+        if precision == "float32" or precision not in compact:
+            scores = np.concatenate([vectors[start:stop] @ q for start, stop in ranges])
+        else:
+            matrix, scales = compact[precision]
+            approximate = np.concatenate([
+                self._scan((matrix[start:stop], None if scales is None else scales[start:stop]), q)
+                for start, stop in ranges
+            ])
+            pool = min(len(approximate), k * rescore_factor)
+            rows = rows[np.sort(np.argpartition(-approximate, pool - 1)[:pool])]
+            scores = vectors[rows] @ q
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    @staticmethod
+    def _scan(compact: Tuple[np.ndarray, Optional[np.ndarray]], q: np.ndarray) -> np.ndarray:
+        """Approximate scores over a compact copy, converted chunk by chunk"""
+        matrix, scales = compact
+        out = np.empty(len(matrix), dtype=np.float32)
+        scratch = np.empty((min(SCAN_CHUNK, len(matrix)), matrix.shape[1]), dtype=np.float32)
+        for start in range(0, len(matrix), SCAN_CHUNK):
+            chunk = matrix[start:start + SCAN_CHUNK]
+            rows = scratch[:len(chunk)]
+            np.copyto(rows, chunk, casting="unsafe")
+            np.matmul(rows, q, out=out[start:start + SCAN_CHUNK])
+        if scales is not None:
+            out *= scales
+        return out
+
+    def vector(self, recipe_id: str) -> Optional[np.ndarray]:
+        """Zero-copy row for one recipe (normalized), if present"""
+        self._refresh()
+        if self._ids is None:
+            return None
+        if not self._row_of:
+            self._row_of = {raw.decode(): row for row, raw in enumerate(self._ids)}
+        row = self._row_of.get(recipe_id)
+        if row is not None:
+            return self._vectors[row]
+        delta_ids, delta_vectors = self._delta
+        if recipe_id in delta_ids:
+            return delta_vectors[delta_ids.index(recipe_id)]
+        return None
+
+    def stats(self) -> Dict:
+        self._refresh()
+        return {
+            "generation": self._generation,
+            "vectors": 0 if self._vectors is None else int(self._vectors.shape[0]),
+            "dim": 0 if self._vectors is None else int(self._vectors.shape[1]),
+            "bytes_mapped": 0 if self._vectors is None else int(self._vectors.nbytes),
+            "precision": self.precision if self.precision in self._compact else "float32",
+            "ivf_lists": 0 if self._ivf is None else int(len(self._ivf[0])),
+            "probes": self.probes if self._ivf is not None else 0,
+            "delta_vectors": len(self._delta[0]),
+        }
+
+
+def load_embeddings(page_size: int = 1000) -> Tuple[List[str], np.ndarray]:
+    """
+    Page through recipe_embeddings by recipe_id; returns ids and a float32 matrix.
+
+    Reads the full-precision `embedding` column rather than the packed int8
+    one: the float32 rows are what searches rescore against, so they must
+    not carry quantization error.
+    """
+    ids: List[str] = []
+    pages: List[np.ndarray] = []
+    cursor = None
+    while True:
+        query = supabase.from_("recipe_embeddings") \
+            .select("recipe_id, embedding") \
+            .order("recipe_id") \
+            .limit(page_size)
+        if cursor is not None:
+            query = query.gt("recipe_id", cursor)
+        rows = query.execute().data or []
+
+        page_ids, vectors = [], []
+        for row in rows:
+            if not row.get("embedding"):
+                continue
+            vectors.append(parse_embedding(row["embedding"]))
+            page_ids.append(str(row["recipe_id"]))
+        if vectors:
+            ids.extend(page_ids)
+            pages.append(np.stack(vectors))
+        if len(rows) < page_size:
+            break
+        cursor = rows[-1]["recipe_id"]
+    matrix = np.concatenate(pages) if pages else np.zeros((0, 0), dtype=np.float32)
+    return ids, matrix
+
+
+def ivf_lists_for(count: int) -> int:
+    """IVF list count the settings ask for at this corpus size (0 = no index)"""
+    if settings.EMBEDDING_INDEX != "ivf" or count < IVF_MIN_VECTORS:
+        return 0
+    return settings.EMBEDDING_IVF_LISTS or default_lists(count)
+
+
+def rebuild_embedding_matrix(root: str, page_size: int = 1000) -> int:
+    """Snapshot every recipe embedding into a new generation; returns vectors written"""
+    snapshot_ns = time.time_ns()
+    ids, matrix = load_embeddings(page_size)
+    if not ids:
+        return 0
+    name = publish_generation(root, ids, matrix, ivf_lists=ivf_lists_for(len(ids)), snapshot_ns=snapshot_ns)
+    logger.info(f"Published embedding generation {name} with {len(ids)} vectors")
+    return len(ids)
+
+
+# Per-process view; maps nothing until first used
+embedding_matrix = SharedEmbeddingMatrix(
+    settings.EMBEDDING_MATRIX_DIR,
+    settings.EMBEDDING_MATRIX_CHECK_INTERVAL,
+    precision=settings.EMBEDDING_SEARCH_PRECISION,
+    rescore_factor=settings.EMBEDDING_RESCORE_FACTOR,
+    probes=settings.EMBEDDING_IVF_PROBES if settings.EMBEDDING_INDEX == "ivf" else 0,
+)
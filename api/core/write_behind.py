@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from postgrest.types import ReturnMethod
+
+from api.settings import get_settings
+
+from .database import get_supabase
+from .metrics import Gauge, Histogram, registry
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+supabase = get_supabase()
+
+UpsertGroup = Tuple[str, str]  # (table, on_conflict)
+TouchGroup = Tuple[str, str, str]  # (table, column, key column)
+
+
+class WriteBehindQueue:
+    """
+    Buffers non-critical writes so they happen off the request path.
+
+    Writes are coalesced by key while they wait: a second upsert of the same
+    row replaces the first, and repeated touches of the same row collapse to
+    one. A background task flushes everything in bulk (one upsert per table,
+    one `in_` update per touched column) whenever `max_batch` writes are
+    pending or `flush_interval` seconds have passed, and once more on
+    shutdown. When the flusher isn't running (scripts, one-off jobs) writes
+    go straight to the database.
+    """
+
+    def __init__(self, max_batch: int = 200, flush_interval: float = 1.0):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._upserts: Dict[UpsertGroup, Dict[Tuple, Dict]] = defaultdict(dict)
+        # Rows taken by the flush in progress, still visible until written
+        self._flushing: Dict[UpsertGroup, Dict[Tuple, Dict]] = {}
+        self._touches: Dict[TouchGroup, Set[Any]] = defaultdict(set)
+        self._touch_values: Dict[TouchGroup, Callable[[], Any]] = {}
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.rows_dropped = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(rows) for rows in self._upserts.values()) + \
+            sum(len(keys) for keys in self._touches.values())
+
+    def enqueue_upsert(self, table: str, row: Dict, on_conflict: str) -> None:
+        """Queue an upsert; a pending row with the same conflict key is replaced"""
+        group = (table, on_conflict)
+        if not self._running:
+            self._write_upserts(group, [row])
+            return
+
+        key = tuple(row[column] for column in on_conflict.split(","))
+        self._upserts[group][key] = row
+        self._maybe_wake()
+
+    def enqueue_touch(
+        self,
+        table: str,
+        column: str,
+        key: Any,
+        value: Callable[[], Any],
+        key_column: str = "id",
+    ) -> None:
+        """
+        Queue `column = value()` for one row. The value is computed at flush
+        time, so every row touched in the same flush gets it in one update.
+        """
+        group = (table, column, key_column)
+        self._touch_values.setdefault(group, value)
+        if not self._running:
+            self._write_touches(group, {key})
+            return
+
+        self._touches[group].add(key)
+        self._maybe_wake()
+
+    def pending_upsert(self, table: str, on_conflict: str, key: Tuple) -> Optional[Dict]:
+        """A queued or still flushing row, so readers can see their own writes"""
+        group = (table, on_conflict)
+        row = self._upserts.get(group, {}).get(key)
+        if row is None:
+            row = self._flushing.get(group, {}).get(key)
+        return row
+
+    async def discard_upserts(self, table: str, on_conflict: str, keys: Iterable[Tuple]) -> None:
+        """
+        Drop queued rows for the keys, so a flush doesn't write them back after
+        a delete. If a flush is already writing one of them, wait for it to
+        finish so a delete issued afterwards wins.
+        """
+        group = (table, on_conflict)
+        in_flight = False
+        for key in keys:
+            self._upserts.get(group, {}).pop(key, None)
+            in_flight |= self._flushing.get(group, {}).pop(key, None) is not None
+        if in_flight:
+            async with self._lock:
+                pass
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="write-behind")
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out whatever is still pending"""
+        if not self._running:
+            return
+        # Let the loop finish the flush it may be in rather than cancelling it
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._stopping = False
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write all pending rows; returns how many were written"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            upserts, self._upserts = self._upserts, defaultdict(dict)
+            touches, self._touches = self._touches, defaultdict(set)
+            if not upserts and not touches:
+                return 0
+
+            self._flushing = upserts
+            start = time.perf_counter()
+            written = 0
+            try:
+                for group, rows in list(upserts.items()):
+                    # Rows discarded while earlier groups were written are skipped
+                    if rows:
+                        written += await self._flush_group(self._write_upserts, group, list(rows.values()))
+                    del upserts[group]
+                for group, keys in list(touches.items()):
+                    written += await self._flush_group(self._write_touches, group, keys)
+                    del touches[group]
+            finally:
+                self._flushing = {}
+                # Groups a cancelled flush did not get to go back on the queue;
+                # rows queued since then are newer and win
+                for group, rows in upserts.items():
+                    self._upserts[group] = {**rows, **self._upserts[group]}
+                for group, keys in touches.items():
+                    self._touches[group] |= keys
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        flush_duration.observe(elapsed_ms / 1000)
+        self.flushes += 1
+        self.rows_flushed += written
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.total_flush_ms += elapsed_ms
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "rows_dropped": self.rows_dropped,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+    @property
+    def _running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _maybe_wake(self) -> None:
+        if self._wakeup is not None and self.depth >= self.max_batch:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    async def _flush_group(self, write, group, rows) -> int:
+        # The Supabase client is synchronous; keep its I/O off the event loop
+        try:
+            await asyncio.to_thread(write, group, rows)
+            return len(rows)
+        except Exception as e:
+            self.rows_dropped += len(rows)
+            logger.error(f"Dropped {len(rows)} write-behind rows for {group[0]}: {e}")
+            return 0
+
+    def _write_upserts(self, group: UpsertGroup, rows) -> None:
+        table, on_conflict = group
+        supabase.table(table) \
+            .upsert(list(rows), on_conflict=on_conflict, returning=ReturnMethod.minimal) \
+            .execute()
+
+    def _write_touches(self, group: TouchGroup, keys) -> None:
+        table, column, key_column = group
+        supabase.table(table) \
+            .update({column: self._touch_values[group]()}, returning=ReturnMethod.minimal) \
+            .in_(key_column, list(keys)) \
+            .execute()
+
+
+flush_duration = registry.register(Histogram(
+    "pantrychef_write_behind_flush_duration_seconds",
+    "Time to flush the write-behind queue",
+))
+
+write_behind = WriteBehindQueue(
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH,
+    flush_interval=settings.WRITE_BEHIND_FLUSH_INTERVAL,
+)
+
+registry.register(Gauge(
+    "pantrychef_write_behind_queue_depth",
+    "Writes waiting in the write-behind queue",
+    lambda: write_behind.depth,
+))
@@ -0,0 +1,210 @@
+"""
+Persistent crawl frontier: every recipe URL the crawler is asked for, with
+its priority and state, in a SQLite file shared by the workers on a host.
+
+- A URL is stored once. Queuing it again only raises its priority, and a
+  done URL is queued again only when asked to (`refetch`, for refreshes).
+  A URL that failed CRAWLER_FRONTIER_MAX_ATTEMPTS times is never queued
+  again; `prune` eventually forgets it.
+- Priorities: a user's search first, then refreshes of stored recipes, then
+  discovery (search results beyond what the search needed).
+- Crawls claim URLs with a lease. A URL whose worker died (restart, crash)
+  becomes available again when its lease runs out; finished URLs never are,
+  so a resumed batch does not fetch what was already done.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+from urllib.parse import urlsplit
+
+from api.settings import get_settings
+
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frontier_next ON frontier (state, priority, enqueued_at);
+"""
+
+
+class CrawlPriority(IntEnum):
+    USER = 0
+    REFRESH = 1
+    DISCOVERY = 2
+
+
+class CrawlFrontier:
+    def __init__(self, path: str, lease: float, max_attempts: int):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._ready = False
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per call: callers run in worker threads,
+        # and other processes share the file
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            if not self._ready:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript(SCHEMA)
+                self._ready = True
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def add(self, urls: Iterable[str], priority: CrawlPriority, refetch: bool = False) -> None:
+        """
+        Queue URLs not seen before; `refetch` queues done ones again too.
+        Failed URLs stay retired: they already used up their attempts.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                """
+                INSERT INTO frontier (url, host, priority, state, enqueued_at, updated_at)
+                VALUES (:url, :host, :priority, 'pending', :now, :now)
+                ON CONFLICT (url) DO UPDATE SET
+                    priority = CASE WHEN :requeue AND state = 'done'
+                        THEN excluded.priority ELSE MIN(priority, excluded.priority) END,
+                    state = CASE WHEN :requeue AND state = 'done' THEN 'pending' ELSE state END,
+                    attempts = CASE WHEN :requeue AND state = 'done' THEN 0 ELSE attempts END,
+                    enqueued_at = CASE WHEN :requeue AND state = 'done'
+                        THEN excluded.enqueued_at ELSE enqueued_at END,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    {"url": url, "host": urlsplit(url).netloc, "priority": int(priority), "now": now, "requeue": refetch}
+                    for url in urls
+                ],
+            )
+
+    def claim(self, urls: Iterable[str], priority: CrawlPriority) -> None:
+        """Mark URLs as being crawled now, queued or not, whatever their state"""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                """
+                INSERT INTO frontier (url, host, priority, state, attempts, lease_until, enqueued_at, updated_at)
+                VALUES (?, ?, ?, 'running', 1, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    priority = MIN(priority, excluded.priority),
+                    state = 'running',
+                    attempts = attempts + 1,
+                    lease_until = excluded.lease_until,
+                    updated_at = excluded.updated_at
+                """,
+                [(url, urlsplit(url).netloc, int(priority), now + self.lease, now, now) for url in urls],
+            )
+
+    def take(self, priorities: Iterable[CrawlPriority], limit: int) -> List[Tuple[str, CrawlPriority]]:
+        """
+        Lease up to `limit` queued URLs of the given priorities, best first,
+        including running ones whose lease has run out
+        """
+        priorities = [int(priority) for priority in priorities]
+        now = time.time()
+        with self._transaction() as connection:
+            rows = connection.execute(
+                f"""
+                SELECT url, priority FROM frontier
+                WHERE priority IN ({",".join("?" * len(priorities))})
+                  AND (state = 'pending' OR (state = 'running' AND lease_until < ?))
+                ORDER BY priority, enqueued_at
+                LIMIT ?
+                """,
+                [*priorities, now, limit],
+            ).fetchall()
+            connection.executemany(
+                "UPDATE frontier SET state = 'running', lease_until = ?, updated_at = ? WHERE url = ?",
+                [(now + self.lease, now, url) for url, _ in rows],
+            )
+        return [(url, CrawlPriority(priority)) for url, priority in rows]
+
+    def settle(self, done: Iterable[str] = (), failed: Iterable[str] = (), unfinished: Iterable[str] = ()) -> None:
+        """
+        Record a crawl's outcome: `done` URLs are finished, `failed` ones are
+        queued again until they run out of attempts, `unfinished` ones (cut
+        off by a deadline) are queued again as they were. A success resets
+        the attempts, so `max_attempts` counts consecutive failures.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.executemany(
+                "UPDATE frontier SET state = 'done', attempts = 0, lease_until = 0, updated_at = ? WHERE url = ?",
+                [(now, url) for url in done],
+            )
+            connection.executemany(
+                """
+                UPDATE frontier SET
+                    state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_until = 0,
+                    updated_at = ?
+                WHERE url = ?
+                """,
+                [(self.max_attempts, now, url) for url in failed],
+            )
+            connection.executemany(
+                """
+                UPDATE frontier SET state = 'pending', attempts = MAX(0, attempts - 1), lease_until = 0, updated_at = ?
+                WHERE url = ? AND state = 'running'
+                """,
+                [(now, url) for url in unfinished],
+            )
+
+    def retired(self, urls: Iterable[str]) -> Set[str]:
+        """Those of `urls` that failed too often to be queued again"""
+        urls = list(urls)
+        if not urls:
+            return set()
+        with self._transaction() as connection:
+            rows = connection.execute(
+                f"SELECT url FROM frontier WHERE state = 'failed' AND url IN ({','.join('?' * len(urls))})",
+                urls,
+            )
+            return {url for url, in rows}
+
+    def prune(self, max_age: float) -> int:
+        """Forget finished and failed URLs older than `max_age` seconds; returns how many"""
+        with self._transaction() as connection:
+            return connection.execute(
+                "DELETE FROM frontier WHERE state IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - max_age,),
+            ).rowcount
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """URL counts by state and priority"""
+        counts: Dict[str, Dict[str, int]] = {}
+        with self._transaction() as connection:
+            rows = connection.execute("SELECT state, priority, COUNT(*) FROM frontier GROUP BY state, priority")
+            for state, priority, count in rows:
+                counts.setdefault(state, {})[CrawlPriority(priority).name.lower()] = count
+        return counts
+
+
+frontier = CrawlFrontier(
+    settings.CRAWLER_FRONTIER_PATH,
+    settings.CRAWLER_FRONTIER_LEASE,
+    settings.CRAWLER_FRONTIER_MAX_ATTEMPTS,
+)
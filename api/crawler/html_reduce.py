@@ -0,0 +1,141 @@
+"""
+Shrink a recipe page to the part an LLM needs to find its ingredients.
+
+In order of preference: the `recipeIngredient` list from JSON-LD, the text
+of the (outermost) elements whose class or id mentions "ingredient", or the
+page's visible text. Scripts, styles, navigation, headers, footers and
+forms never make it into the prompt.
+"""
+import json
+import re
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional
+
+SKIP_TAGS = {"script", "style", "noscript", "svg", "nav", "header", "footer", "aside", "form", "iframe", "template"}
+BLOCK_TAGS = {"li", "p", "div", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "ul", "ol", "dd", "dt"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+INGREDIENT = re.compile(r"ingredient", re.I)
+
+
+class _RecipePageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.json_ld: List[str] = []
+        self.title: List[str] = []
+        self.visible: List[str] = []
+        self.ingredients: List[str] = []
+        self._stack: List[str] = []
+        self._skip_depth = 0
+        self._json_ld_depth: Optional[int] = None
+        self._ingredient_depth: Optional[int] = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag in BLOCK_TAGS:
+            self._newline()
+        if tag in VOID_TAGS:
+            return
+        self._stack.append(tag)
+        depth = len(self._stack)
+
+        if tag == "script" and (attributes.get("type") or "").lower() == "application/ld+json":
+            self._json_ld_depth = depth
+            self.json_ld.append("")
+        elif tag in SKIP_TAGS and not self._skip_depth:
+            self._skip_depth = depth
+        if tag in ("title", "h1"):
+            self._in_title = True
+        if (
+            self._ingredient_depth is None
+            and not self._skip_depth
+            and INGREDIENT.search(f"{attributes.get('class') or ''} {attributes.get('id') or ''}")
+        ):
+            self._ingredient_depth = depth
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or tag not in self._stack:
+            return
+        # Pop up to the matching tag; browsers tolerate unclosed elements
+        while self._stack:
+            depth = len(self._stack)
+            closed = self._stack.pop()
+            if depth == self._json_ld_depth:
+                self._json_ld_depth = None
+            if depth == self._skip_depth:
+                self._skip_depth = 0
+            if depth == self._ingredient_depth:
+                self._ingredient_depth = None
+            if closed in ("title", "h1"):
+                self._in_title = False
+            if closed == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self._json_ld_depth is not None:
+            self.json_ld[-1] += data
+            return
+        if self._skip_depth:
+            return
+        if self._in_title and not self.title:
+            self.title.append(data.strip())
+        self.visible.append(data)
+        if self._ingredient_depth is not None:
+            self.ingredients.append(data)
+
+    def _newline(self):
+        self.visible.append("\n")
+        if self._ingredient_depth is not None:
+            self.ingredients.append("\n")
+
+
+def _clean(chunks: List[str]) -> str:
+    lines = (" ".join(line.split()) for line in "".join(chunks).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _json_ld_recipes(blocks: List[str]) -> Iterator[dict]:
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                yield from walk(item)
+        elif isinstance(node, dict):
+            types = node.get("@type")
+            types = types if isinstance(types, list) else [types]
+            if "Recipe" in types:
+                yield node
+            for key in ("@graph", "mainEntity", "itemListElement"):
+                if key in node:
+                    yield from walk(node[key])
+
+    for block in blocks:
+        try:
+            yield from walk(json.loads(block))
+        except ValueError:
+            continue
+
+
+def reduce_recipe_html(html: str, max_chars: int = 6000) -> str:
+    """Ingredient-relevant text of a recipe page, at most `max_chars` long"""
+    parser = _RecipePageParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        # html.parser is lenient, but never let a malformed page lose the fallback
+        return _clean([html])[:max_chars]
+
+    title = parser.title[0] if parser.title else ""
+    for recipe in _json_ld_recipes(parser.json_ld):
+        ingredients = recipe.get("recipeIngredient") or recipe.get("ingredients")
+        if ingredients:
+            lines = [f"Title: {recipe.get('name') or title}", "Ingredients:"]
+            lines.extend(f"- {' '.join(str(i).split())}" for i in ingredients)
+            return "\n".join(lines)[:max_chars]
+
+    ingredients = _clean(parser.ingredients)
+    if ingredients:
+        return f"Title: {title}\nIngredients:\n{ingredients}"[:max_chars]
+    return _clean(parser.visible)[:max_chars]
@@ -0,0 +1,198 @@
+"""
+On-disk cache of crawled pages, keyed by URL.
+
+Each entry is one gzip-compressed JSON file under CRAWLER_PAGE_CACHE_DIR
+holding the page body, its ETag/Last-Modified validators and, once the
+crawler has parsed the page, the parsed result (a recipe's fields, or the
+recipe links of a search page).
+
+- Within its TTL (CRAWLER_PAGE_TTL_SEARCH or CRAWLER_PAGE_TTL_RECIPE) an
+  entry is used as is and no request goes out.
+- After that the page is fetched with If-None-Match/If-Modified-Since. A 304
+  renews the entry and keeps its parsed result, so the page is neither
+  downloaded again nor re-parsed. A 200 with the very same body (servers
+  without validators) still skips the parse.
+- Any other 200 replaces the body and drops the parsed result; the crawler
+  renders the body it just downloaded instead of fetching the page twice.
+
+Lookups by page type and outcome, and the bytes fetched and saved, go to
+/metrics. Reads and writes are blocking file I/O; async callers run them
+in a worker thread (`asyncio.to_thread`), as `revalidate` does itself.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from api.core.metrics import Counter, registry
+from api.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SEARCH = "search"
+RECIPE = "recipe"
+
+
+class PageEntry(NamedTuple):
+    url: str
+    kind: str
+    body: str
+    size: int  # encoded body bytes, i.e. what a refetch would download
+    etag: Optional[str]
+    last_modified: Optional[str]
+    validated_at: float
+    parsed: Optional[Any] = None
+
+
+class PageCache:
+    def __init__(self, directory: str, ttls: Dict[str, float], max_age: float):
+        self.directory = directory
+        self.ttls = ttls
+        self.max_age = max_age
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, url: str) -> Optional[PageEntry]:
+        try:
+            with gzip.open(self._path(url), "rt", encoding="utf-8") as f:
+                entry = PageEntry(**json.load(f))
+        except (OSError, ValueError, TypeError, EOFError):
+            return None
+        return entry if entry.url == url else None
+
+    def put(self, entry: PageEntry) -> PageEntry:
+        path = self._path(entry.url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        staging = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(staging, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(entry._asdict(), f)
+        os.replace(staging, path)
+        return entry
+
+    def fresh(self, entry: PageEntry) -> bool:
+        return time.time() - entry.validated_at < self.ttls.get(entry.kind, 0)
+
+    @staticmethod
+    def validators(entry: Optional[PageEntry]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def set_parsed(self, url: str, parsed: Any) -> None:
+        """Attach the crawler's parse of a cached page, to be reused while the page is unchanged"""
+        entry = self.get(url)
+        if entry is None:
+            return
+        try:
+            self.put(entry._replace(parsed=parsed))
+        except OSError as e:
+            logger.warning(f"Could not cache parsed page {url}: {e}")
+
+    def lookup(self, url: str, kind: str) -> Optional[PageEntry]:
+        """The entry for `url` if it is within its TTL, counted as a request saved"""
+        entry = self.get(url)
+        if entry is None or not self.fresh(entry):
+            return None
+        page_lookups.inc(kind, "fresh")
+        page_bytes.inc(kind, "saved", amount=entry.size)
+        return entry
+
+    async def revalidate(self, request, url: str, kind: str, timeout: float) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        (parsed, body) for `url`, fetched conditionally through the
+        Playwright request context `request`. `parsed` is set when the page
+        is unchanged and was parsed before; otherwise `body` is the HTML to
+        render, if one was fetched. (None, None) means the caller should
+        navigate as usual.
+        """
+        entry = await asyncio.to_thread(self.get, url)
+        try:
+            response = await request.get(url, headers=self.validators(entry), timeout=timeout)
+        except Exception as e:
+            page_lookups.inc(kind, "error")
+            logger.warning(f"Conditional fetch of {url} failed, navigating instead: {e}")
+            return None, None
+
+        if response.status == 304 and entry is not None:
+            page_lookups.inc(kind, "not_modified")
+            page_bytes.inc(kind, "saved", amount=entry.size)
+            return entry.parsed, (await asyncio.to_thread(self._renew, entry)).body
+        if not response.ok:
+            page_lookups.inc(kind, "error")
+            return None, None
+
+        body = await response.text()
+        size = len(body.encode("utf-8"))
+        page_bytes.inc(kind, "fetched", amount=size)
+        if entry is not None and entry.body == body:
+            # No validators (or weak ones) but the same page: keep the parse
+            page_lookups.inc(kind, "unchanged")
+            return entry.parsed, (await asyncio.to_thread(self._renew, entry)).body
+
+        page_lookups.inc(kind, "miss" if entry is None else "modified")
+        headers = response.headers
+        try:
+            await asyncio.to_thread(self.put, PageEntry(
+                url=url,
+                kind=kind,
+                body=body,
+                size=size,
+                etag=headers.get("etag"),
+                last_modified=headers.get("last-modified"),
+                validated_at=time.time(),
+            ))
+        except OSError as e:
+            logger.warning(f"Could not cache page {url}: {e}")
+        return None, body
+
+    def _renew(self, entry: PageEntry) -> PageEntry:
+        renewed = entry._replace(validated_at=time.time())
+        try:
+            self.put(renewed)
+        except OSError as e:
+            logger.warning(f"Could not renew cached page {entry.url}: {e}")
+        return renewed
+
+    def prune(self) -> int:
+        """Delete entries not validated within `max_age` seconds; returns how many were removed"""
+        removed = 0
+        cutoff = time.time() - self.max_age
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+page_lookups = registry.register(Counter(
+    "pantrychef_crawler_page_cache_total",
+    "Crawler page cache lookups by page type and outcome: fresh (no request), "
+    "not_modified (304, no download), unchanged (same body, no parse), miss, modified, error",
+    ["kind", "outcome"],
+))
+page_bytes = registry.register(Counter(
+    "pantrychef_crawler_page_bytes_total",
+    "Page bytes the crawler downloaded (fetched) or served from its page cache instead (saved)",
+    ["kind", "source"],
+))
+
+page_cache = PageCache(
+    settings.CRAWLER_PAGE_CACHE_DIR,
+    {SEARCH: settings.CRAWLER_PAGE_TTL_SEARCH, RECIPE: settings.CRAWLER_PAGE_TTL_RECIPE},
+    settings.CRAWLER_PAGE_CACHE_MAX_AGE_DAYS * 86400,
+)
@@ -0,0 +1,160 @@
+"""
+Per-host politeness for the crawler: how many requests may be in flight to a
+host, and how far apart they start.
+
+Each host gets an adaptive concurrency limit (between 1 and
+CRAWLER_HOST_MAX_CONCURRENCY, starting at CRAWLER_HOST_CONCURRENCY) and a
+delay between request starts (between CRAWLER_HOST_MIN_DELAY and
+CRAWLER_HOST_MAX_DELAY). A quick success raises the limit slowly and
+shortens the delay. A response slower than CRAWLER_HOST_TARGET_LATENCY
+lengthens the delay. Errors, timeouts and throttling statuses (429, 5xx)
+halve the limit and double the delay. Waiting requests are served in
+`CrawlPriority` order, so a user's search overtakes refreshes and discovery.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+from urllib.parse import urlsplit
+
+from api.core.deadline import DeadlineExceeded
+from api.core.metrics import Counter, Histogram, registry
+from api.core.openai_gateway import AdaptiveLimiter
+from api.settings import get_settings
+from .frontier import CrawlPriority
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Slowest the delay recovers from after an error when the minimum is zero
+ERROR_DELAY = 1.0
+
+
+class HostThrottled(Exception):
+    pass
+
+
+class HostSlot:
+    """Handed to the holder of a slot, to report the response status"""
+
+    def __init__(self, host: str):
+        self.host = host
+
+    def check(self, status: int) -> None:
+        """Raise `HostThrottled` for a 429 or 5xx, which the host's limits then back off from"""
+        if status == 429 or status >= 500:
+            raise HostThrottled(f"{self.host} answered {status}")
+
+
+class HostPolicy:
+    def __init__(
+        self,
+        host: str,
+        concurrency: int,
+        max_concurrency: int,
+        min_delay: float,
+        max_delay: float,
+        target_latency: float,
+    ):
+        self.host = host
+        self.limiter = AdaptiveLimiter(concurrency, 1, max_concurrency)
+        self.delay = min_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.target_latency = target_latency
+        self._next_start = 0.0
+
+    async def acquire(self, priority: CrawlPriority) -> None:
+        await self.limiter.acquire(int(priority))
+        # Slots are granted in priority order; start times are spaced in grant order
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.delay
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except asyncio.CancelledError:
+                self.limiter.release()
+                raise
+
+    def release(self) -> None:
+        self.limiter.release()
+
+    def succeeded(self, latency: float) -> None:
+        if latency > self.target_latency:
+            self.delay = min(self.max_delay, max(self.delay * 1.5, self.min_delay, 0.1))
+            return
+        self.delay = max(self.min_delay, self.delay * 0.9)
+        self.limiter.succeeded()
+
+    def failed(self) -> None:
+        self.limiter.throttled()
+        self.delay = min(self.max_delay, max(self.delay * 2, ERROR_DELAY))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+            "delay": round(self.delay, 3),
+        }
+
+
+class HostPolicies:
+    def __init__(self):
+        self._hosts: Dict[str, HostPolicy] = {}
+
+    def policy(self, url: str) -> HostPolicy:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostPolicy(
+                host,
+                settings.CRAWLER_HOST_CONCURRENCY,
+                settings.CRAWLER_HOST_MAX_CONCURRENCY,
+                settings.CRAWLER_HOST_MIN_DELAY,
+                settings.CRAWLER_HOST_MAX_DELAY,
+                settings.CRAWLER_HOST_TARGET_LATENCY,
+            )
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str, priority: CrawlPriority) -> AsyncIterator[HostSlot]:
+        """Hold one of the host's request slots for the block; its duration and outcome tune the limits"""
+        policy = self.policy(url)
+        queued_at = time.perf_counter()
+        await policy.acquire(priority)
+        started = time.perf_counter()
+        host_wait.observe(started - queued_at, priority.name.lower())
+        try:
+            yield HostSlot(policy.host)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            # Our deadline, not the host's fault
+            raise
+        except Exception:
+            policy.failed()
+            host_requests.inc(policy.host, "error")
+            raise
+        else:
+            latency = time.perf_counter() - started
+            policy.succeeded(latency)
+            host_requests.inc(policy.host, "slow" if latency > policy.target_latency else "ok")
+        finally:
+            policy.release()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {host: policy.stats() for host, policy in self._hosts.items()}
+
+
+host_wait = registry.register(Histogram(
+    "pantrychef_crawler_host_wait_seconds",
+    "Time crawler requests waited for a host slot, by crawl priority",
+    ["priority"],
+))
+host_requests = registry.register(Counter(
+    "pantrychef_crawler_host_requests_total",
+    "Crawler page loads by host and outcome (ok, slow, error)",
+    ["host", "outcome"],
+))
+
+hosts = HostPolicies()
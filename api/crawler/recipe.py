@@ -1,22 +1,35 @@
 import json
-from typing import List, Optional
-import openai
-from tenacity import retry, stop_after_attempt, wait_fixed
-from playwright.async_api import (
-    async_playwright,
-    TimeoutError as PlaywrightTimeoutError,
-)
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote_plus, urljoin
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
+from api.core.container import container
 from api.core.database import get_supabase
-from api.settings import Settings
+from api.core.deadline import DeadlineExceeded, expired, remaining, timeout_ms
+from api.core.llm import chat_completion, record_prompt_reduction
+from api.core.openai_gateway import Priority
+from api.core.metrics import timed
+from api.settings import get_settings
 from api.models.schemas import Ingredient, Recipe
+from .html_reduce import reduce_recipe_html
+from .frontier import CrawlPriority, frontier
+from .page_cache import RECIPE, SEARCH, page_cache
+from .politeness import HostThrottled, hosts
 
 import asyncio
 import logging
 
 
-# Init Settings
-settings = Settings()
+settings = get_settings()
+
+RETRY_WAIT = 2
+# Failures worth another attempt at a recipe page; anything else won't change on retry
+RETRYABLE = (PlaywrightTimeoutError, HostThrottled)
+
+# Recipe pages being scraped by this worker; a crawl asking for one of them
+# waits for that scrape instead of fetching the page again
+in_flight: Dict[str, asyncio.Future] = {}
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -30,8 +43,28 @@ console_handler.setFormatter(
 logger.addHandler(console_handler)
 
 
+def _deadline_near(retry_state) -> bool:
+    """Tenacity stop condition: no retry (2s wait plus a page load) fits before the deadline"""
+    budget = remaining()
+    return budget is not None and budget < RETRY_WAIT + 1
+
+
 class RecipeCrawler:
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        use_proxy: Optional[bool] = None,
+        concurrency: Optional[int] = None,
+        priority: CrawlPriority = CrawlPriority.USER,
+        use_page_cache: Optional[bool] = None,
+    ):
+        self.base_url = (base_url or settings.CRAWLER_BASE_URL).rstrip("/")
+        self.use_proxy = settings.CRAWLER_USE_PROXY if use_proxy is None else use_proxy
+        self.concurrency = concurrency or settings.CRAWLER_CONCURRENCY
+        # Order for host slots; only a user's search gets the interactive LLM lane
+        self.priority = priority
+        self.llm_priority = Priority.INTERACTIVE if priority == CrawlPriority.USER else Priority.BACKGROUND
+        self.use_page_cache = settings.CRAWLER_PAGE_CACHE_ENABLED if use_page_cache is None else use_page_cache
         self.proxy_host = settings.BRIGHT_DATA_PROXY_HOST
         self.proxy_port = settings.BRIGHT_DATA_PROXY_PORT
         self.proxy_user = settings.BRIGHT_DATA_PROXY_USERNAME
@@ -40,48 +73,114 @@ class RecipeCrawler:
         self.supabase = get_supabase()
 
     async def crawl_recipes(self, query="chicken soup", max_recipes=5) -> List[Recipe]:
-        async with async_playwright() as p:
-
-            browser = await self._launch_browser(p)
-            context = await browser.new_context(ignore_https_errors=True)
+        """
+        Search and scrape up to `max_recipes` recipes. Timeouts shrink to fit
+        the current deadline; pages not scraped by then are dropped.
+        """
+        if expired():
+            raise DeadlineExceeded(f"no time left to crawl {query!r}")
+        browser = await self._launch_browser()
+        context = await browser.new_context(ignore_https_errors=True)
+        try:
             page = await context.new_page()
 
             search_url = self._build_search_url(query)
             logger.info(f"Navigating to {search_url}")
-            await page.goto(search_url, timeout=60000, wait_until="load")
-
-            card_selector = await self._determine_card_selector(page)
-            recipe_urls = await self._extract_recipe_urls(
-                page, card_selector, max_recipes
-            )
+            with timed("crawl_search_page"):
+                recipe_urls = await self._load(page, search_url, SEARCH)
+
+            if recipe_urls is None:
+                card_selector = await self._determine_card_selector(page)
+                # Every card is kept with the cached page; this crawl takes the first few
+                recipe_urls = await self._extract_recipe_urls(page, card_selector, None)
+                if self.use_page_cache and recipe_urls:
+                    await asyncio.to_thread(page_cache.set_parsed, search_url, recipe_urls)
+            if settings.CRAWLER_DISCOVERY_ENABLED and len(recipe_urls) > max_recipes:
+                await asyncio.to_thread(frontier.add, recipe_urls[max_recipes:], CrawlPriority.DISCOVERY)
+            recipe_urls = recipe_urls[:max_recipes]
 
             recipes = await self._scrape_all_recipes(context, recipe_urls)
+        finally:
+            await context.close()
+
+        logger.info(recipes)
+
+        return recipes
+
+    async def scrape_urls(self, urls: List[str]) -> List[Recipe]:
+        """Scrape known recipe pages directly, skipping the search page"""
+        if not urls:
+            return []
+
+        browser = await self._launch_browser()
+        context = await browser.new_context(ignore_https_errors=True)
+        try:
+            return await self._scrape_all_recipes(context, urls)
+        finally:
+            await context.close()
+
+    async def _load(self, page, url: str, kind: str) -> Optional[Any]:
+        """
+        The page's earlier parse when the page cache knows it is unchanged.
+        Otherwise loads `url` into `page` and returns None; requests to the
+        site wait for a slot under the host's politeness limits.
+        """
+        if self.use_page_cache:
+            entry = await asyncio.to_thread(page_cache.lookup, url, kind)
+            if entry is not None:
+                if entry.parsed is not None:
+                    return entry.parsed
+                await self._open(page, url, entry.body)
+                return None
+
+        body = None
+        async with hosts.slot(url, self.priority) as slot:
+            if self.use_page_cache:
+                parsed, body = await page_cache.revalidate(page.context.request, url, kind, timeout=timeout_ms(60000))
+                if parsed is not None:
+                    return parsed
+            response = await self._open(page, url, body)
+            if response is not None:
+                slot.check(response.status)
+        return None
 
-            await browser.close()
+    async def _open(self, page, url: str, body: Optional[str]):
+        """Navigate to `url`, rendering `body` instead of downloading the document again when given"""
+        if body is None:
+            return await page.goto(url, timeout=timeout_ms(60000), wait_until="load")
 
-            logger.info(recipes)
+        def is_document(request_url: str) -> bool:
+            return request_url == url
 
-            return recipes
+        async def serve(route):
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=body)
+
+        await page.route(is_document, serve)
+        try:
+            return await page.goto(url, timeout=timeout_ms(60000), wait_until="load")
+        finally:
+            await page.unroute(is_document, serve)
 
     def _build_search_url(self, query):
-        return f"https://www.allrecipes.com/search?q={query.replace(' ', '+')}"
+        return f"{self.base_url}/search?q={quote_plus(query)}"
 
-    async def _launch_browser(self, playwright):
-        return await playwright.chromium.launch(
-            headless=True,
-            proxy={
+    async def _launch_browser(self):
+        """Shared browser from the app container; each crawl gets its own context"""
+        proxy = None
+        if self.use_proxy and self.proxy_host:
+            proxy = {
                 "server": f"http://{self.proxy_host}:{self.proxy_port}",
                 "username": self.proxy_user,
                 "password": self.proxy_pass,
-            },
-        )
+            }
+        return await container.browser(proxy)
 
     async def _determine_card_selector(self, page):
         try:
-            await page.wait_for_selector("a.card", timeout=15000)
+            await page.wait_for_selector("a.card", timeout=timeout_ms(15000))
             return "a.card"
         except PlaywrightTimeoutError:
-            await page.wait_for_selector("div.card__content", timeout=15000)
+            await page.wait_for_selector("div.card__content", timeout=timeout_ms(15000))
             return "div.card__content"
 
     async def _extract_recipe_urls(self, page, card_selector, max_recipes):
@@ -91,6 +190,8 @@ class RecipeCrawler:
         for card in cards[:max_recipes]:
             try:
                 href = await card.get_attribute("href")
+                if href:
+                    href = urljoin(page.url, href)
                 if href and href.startswith("http"):
                     urls.append(href)
             except Exception as e:
@@ -98,28 +199,78 @@ class RecipeCrawler:
         return urls
 
     async def _scrape_all_recipes(self, context, urls) -> List[Recipe]:
-        semaphore = asyncio.Semaphore(3)
+        """
+        Scrape recipe pages, at most `concurrency` at a time for this crawl.
+        The frontier records each page as claimed, then done, failed or (cut
+        off by the deadline) queued again.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return []
+        await asyncio.to_thread(frontier.claim, urls, self.priority)
+        semaphore = asyncio.Semaphore(self.concurrency)
 
         async def scrape_with_limit(url):
-            async with semaphore:
-                page = await context.new_page()
-                result = await self._scrape_recipe_with_retries(page, url)
-                await page.close()
-                return result
-
-        tasks = [scrape_with_limit(url) for url in urls]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        return [r for r in results if isinstance(r, Recipe)]
-
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
+            shared = in_flight.get(url)
+            if shared is not None:
+                return await asyncio.shield(shared)
+            in_flight[url] = asyncio.get_running_loop().create_future()
+            recipe = None
+            try:
+                async with semaphore:
+                    page = await context.new_page()
+                    try:
+                        recipe = await self._scrape_recipe_with_retries(page, url)
+                    except PlaywrightTimeoutError:
+                        logger.warning(f"Timeout loading recipe page {url}")
+                    except HostThrottled as e:
+                        logger.warning(f"Gave up on recipe page {url}: {e}")
+                    finally:
+                        await page.close()
+            finally:
+                in_flight.pop(url).set_result(recipe)
+            return recipe
+
+        tasks = [asyncio.create_task(scrape_with_limit(url)) for url in urls]
+        budget = remaining()
+        done, pending = await asyncio.wait(tasks, timeout=None if budget is None else max(0, budget))
+        if pending:
+            # Deadline reached: keep what finished, drop the rest
+            logger.warning(f"Deadline reached with {len(pending)} of {len(tasks)} recipe pages unfinished")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        finished = [(url, task) for url, task in zip(urls, tasks) if task in done]
+        recipes = {
+            url: task.result() for url, task in finished
+            if not task.exception() and isinstance(task.result(), Recipe)
+        }
+        await asyncio.to_thread(
+            frontier.settle,
+            done=list(recipes),
+            failed=[url for url, _ in finished if url not in recipes],
+            unfinished=[url for url, task in zip(urls, tasks) if task in pending],
+        )
+        return list(recipes.values())
+
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE),
+        stop=stop_after_attempt(3) | _deadline_near,
+        wait=wait_fixed(RETRY_WAIT),
+        reraise=True,
+    )
     async def _scrape_recipe_with_retries(self, page, url):
+        """Retries timeouts and throttling, re-raising the last one when out of attempts"""
         return await self._scrape_recipe(page, url)
 
     async def _scrape_recipe(self, page, url) -> Optional[Recipe]:
         try:
             logger.info(f"Scraping recipe: {url}")
-            await page.goto(url, timeout=60000, wait_until="load")
+            with timed("crawl_recipe_page"):
+                parsed = await self._load(page, url, RECIPE)
+            if parsed is not None:
+                return Recipe(**parsed)
 
             title = await self._get_title(page)
             prep_time, cook_time = await self._get_times(page)
@@ -144,11 +295,13 @@ class RecipeCrawler:
                     source_url=url,
                     source="allrecipes",
                 )
+                if self.use_page_cache:
+                    await asyncio.to_thread(page_cache.set_parsed, url, recipe.model_dump(mode="json"))
 
                 return recipe
 
-        except PlaywrightTimeoutError:
-            logger.warning(f"Timeout loading recipe page {url}")
+        except RETRYABLE:
+            raise
         except Exception as e:
             logger.error(f"Error scraping recipe {url}: {e}")
 
@@ -156,20 +309,23 @@ class RecipeCrawler:
 
     async def _llm_parse_ingredients(self, html: str) -> List[Ingredient]:
         """Fallback parsing using LLM when normal scraping fails"""
-        response = openai.chat.completions.create(
-            model="gpt-4-turbo",
-            response_format={"type": "json_object"},
-            messages=[
+        page_text = reduce_recipe_html(html, settings.LLM_HTML_MAX_CHARS)
+        record_prompt_reduction("gpt-4-turbo", html[:15000], page_text)
+        content = await chat_completion(
+            "gpt-4-turbo",
+            [
                 {
                     "role": "system",
-                    "content": "Extract recipe ingredients from this HTML. Return JSON with list of ingredients (name, quantity, unit).",
+                    "content": "Extract recipe ingredients from this recipe page text. Return JSON with list of ingredients (name, quantity, unit).",
                 },
-                {"role": "user", "content": html[:15000]},  
+                {"role": "user", "content": page_text},
             ],
+            priority=self.llm_priority,
+            response_format={"type": "json_object"},
         )
 
         try:
-            data = json.loads(response.choices[0].message.content)
+            data = json.loads(content)
             return [Ingredient(**ing) for ing in data.get("ingredients", [])]
         except:
             return []
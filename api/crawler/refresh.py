@@ -1,31 +1,81 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import json
+import logging
 
-from fastapi import logger
+from api.core.admission import AdmissionRejected, crawl_admission
 from api.core.database import get_supabase
+from api.core.row_cache import recipe_rows
+from api.crawler.frontier import CrawlPriority, frontier
 from api.crawler.recipe import RecipeCrawler
 
 supabase = get_supabase()
+logger = logging.getLogger(__name__)
 
 
-async def refresh_outdated_recipes(days_old=7):
+async def refresh_outdated_recipes(days_old=7, batch_size=20) -> int:
+    """
+    Queue the stalest recipes in the crawl frontier at refresh priority, then
+    re-crawl up to `batch_size` queued refreshes, oldest first, in one browser
+    session. Refreshes a restarted worker left unfinished are picked up
+    again; ones it finished are not, and pages that failed
+    CRAWLER_FRONTIER_MAX_ATTEMPTS times are left alone until the frontier
+    forgets them. Returns the number of recipes updated.
+    """
 
-    # Get recipes older than X days from Supabase
-    old_recipes = (
-        supabase.table("recipes")
-        .select("id,source_url,title")
-        .lt("last_updated", datetime.now() - timedelta(days=days_old))
-        .execute()
-    )
+    # Get recipes older than X days from Supabase, skipping pages the frontier
+    # retired after repeated failures: they would stay the stalest rows and
+    # take up every batch
+    cutoff = (datetime.now() - timedelta(days=days_old)).isoformat()
+    stale_urls = []
+    offset = 0
+    while len(stale_urls) < batch_size:
+        old_recipes = (
+            supabase.table("recipes")
+            .select("source_url")
+            .lt("last_updated", cutoff)
+            .order("last_updated")
+            .range(offset, offset + batch_size - 1)
+            .execute()
+        )
+        page = [recipe["source_url"] for recipe in old_recipes.data or []]
+        retired = await asyncio.to_thread(frontier.retired, page)
+        stale_urls.extend(url for url in page if url not in retired)
+        if len(page) < batch_size:
+            break
+        offset += batch_size
+    if stale_urls:
+        await asyncio.to_thread(frontier.add, stale_urls[:batch_size], CrawlPriority.REFRESH, refetch=True)
 
-    crawler = RecipeCrawler()
-    for recipe in old_recipes.data:
+    try:
+        async with crawl_admission.slot("recipe-refresh"):
+            queued = await asyncio.to_thread(frontier.take, [CrawlPriority.REFRESH], batch_size)
+            if not queued:
+                return 0
+            urls = [url for url, _ in queued]
+
+            crawler = RecipeCrawler(priority=CrawlPriority.REFRESH)
+            scraped = await crawler.scrape_urls(urls)
+    except AdmissionRejected:
+        logger.info("Skipped refreshing recipes: crawl not admitted")
+        return 0
+    by_url = {str(recipe.source_url).rstrip("/"): recipe for recipe in scraped}
+
+    stored = supabase.table("recipes").select("id,source_url,title").in_("source_url", urls).execute()
+    refreshed = 0
+    for recipe in stored.data or []:
+        updated = by_url.get(recipe["source_url"].rstrip("/"))
+        if not updated:
+            logger.warning(f"Failed to refresh {recipe['title']}")
+            continue
         try:
-            # Recrawl the recipe
-            updated = await crawler._scrape_recipe(recipe["source_url"])
-            if updated:
-                # Update database
-                supabase.table("recipes").update(updated.dict()).eq(
-                    "id", recipe["id"]
-                ).execute()
+            # Update database
+            supabase.table("recipes").update(
+                {**json.loads(updated.model_dump_json()), "last_updated": datetime.now().isoformat()}
+            ).eq("id", recipe["id"]).execute()
+            recipe_rows.invalidate([recipe["id"]])
+            refreshed += 1
         except Exception as e:
             logger.error(f"Failed to refresh {recipe['title']}: {e}")
+
+    return refreshed
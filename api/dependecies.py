@@ -1,6 +1,9 @@
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Query
 from typing import Optional
 from .services.session import SessionService as sessions
+from .settings import get_settings
+
+settings = get_settings()
 
 async def get_session_id(
     x_session_id: Optional[str] = Header(None, alias="X-Session-ID"),
@@ -19,5 +22,18 @@ async def get_session_id(
             status_code=401,
             detail="Invalid or expired session"
         )
-    
-    return session_id
\ No newline at end of file
+
+    if settings.SESSION_SLIDING_EXPIRY:
+        # Queued while the write-behind flusher runs; otherwise a direct DB write
+        await sessions.refresh_session(session_id)
+
+    return session_id
+
+
+def get_request_deadline(
+    timeout: Optional[float] = Query(None, gt=0, description="Seconds the response may take"),
+    x_request_timeout: Optional[float] = Header(None, alias="X-Request-Timeout", gt=0),
+) -> float:
+    """Time budget for the request: the client's (query parameter or header), capped, else the server default"""
+    requested = timeout or x_request_timeout or settings.REQUEST_DEADLINE_SECONDS
+    return min(requested, settings.REQUEST_DEADLINE_MAX_SECONDS)
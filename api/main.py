@@ -1,14 +1,50 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from api.core.admission import crawl_admission
+from api.core.container import container
+from api.core.metrics import MetricsMiddleware, registry
+from api.core.profiling import ProfilingMiddleware
+from api.core.query_stats import query_stats
+from api.core.vector_store import embedding_matrix
+from api.core.openai_gateway import gateway
+from api.core.write_behind import write_behind
+from api.crawler.frontier import frontier
+from api.crawler.politeness import hosts
 from api.routes import pantry, recipe, session
-from api.settings import Settings
+from api.services.maintenance import create_maintenance_scheduler
+from api.settings import get_settings
 
 import uvicorn
 
-settings = Settings()
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await container.startup()
+    await write_behind.start()
+    await query_stats.start()
+
+    scheduler = create_maintenance_scheduler() if settings.MAINTENANCE_ENABLED else None
+    if scheduler:
+        scheduler.start()
+    app.state.scheduler = scheduler
+
+    yield
+
+    if scheduler:
+        await scheduler.stop()
+    await query_stats.stop()
+    await write_behind.stop()
+    await container.shutdown()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="PantryChef API",
     description="API for recommending recipes based on pantry ingredients",
     version="0.1.0",
@@ -26,6 +62,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        output_dir=settings.PROFILING_DIR,
+        secret=settings.PROFILING_SECRET,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        max_concurrent=settings.PROFILING_MAX_CONCURRENT,
+        interval=settings.PROFILING_INTERVAL,
+    )
+
+# Outermost, so Server-Timing covers everything else
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(recipe.router, prefix="/api/recipes", tags=["recipes"])
 app.include_router(session.router, prefix="/api/sessions", tags=["sessions"])
@@ -37,5 +86,24 @@ async def root():
     return {"message": "Welcome to PantryChef API", "docs": "/docs", "redoc": "/redoc"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/internal/stats", include_in_schema=False)
+async def internal_stats():
+    scheduler = app.state.scheduler
+    return {
+        "write_behind": write_behind.stats(),
+        "maintenance": scheduler.stats() if scheduler else {},
+        "embedding_matrix": embedding_matrix.stats() if settings.LOCAL_VECTOR_SEARCH else {},
+        "openai_gateway": gateway.stats(),
+        "crawl_admission": crawl_admission.stats(),
+        "crawl_hosts": hosts.stats(),
+        "crawl_frontier": await asyncio.to_thread(frontier.stats),
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=settings.PORT)
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CrawlerTask(BaseModel):
@@ -23,3 +23,11 @@ class RecipeRequest(BaseModel):
 class RecommendationRequest(BaseModel):
     session_id: str
     filters: Optional["RecipeFilters"] = None
+
+
+class ShoppingListRequest(BaseModel):
+    recipe_ids: List[str]
+
+
+class RecipeBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100)
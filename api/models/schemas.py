@@ -15,6 +15,12 @@ class PantryItemOut(PantryItem):
     id: int
     created_at: datetime
     normalized_name: str
+    days_remaining: Optional[int] = None
+    expiry_status: Optional[str] = None
+
+class PantryBulkResult(BaseModel):
+    added: List[PantryItemOut]
+    duplicates: List[str]
 
 class PantryHash(BaseModel):
     hash: str
@@ -1,13 +1,20 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
 
-from api.core.database import get_supabase
 from api.dependecies import get_session_id
-from api.models.schemas import GroceryItemOut, Ingredient, PantryItem, PantryItemOut
+from api.models.requests import ShoppingListRequest
+from api.models.schemas import (
+    GroceryItemOut,
+    Ingredient,
+    PantryBulkResult,
+    PantryItem,
+    PantryItemOut,
+)
 from api.services.grocery import GroceryService
 from api.services.pantry import PantryService
+from api.services.recommendation import RecommendationService
 from api.services.session import SessionService
 
 logger = logging.getLogger(__name__)
@@ -17,8 +24,7 @@ router = APIRouter()
 session_service = SessionService()
 pantry_service = PantryService()
 grocery_service = GroceryService()
-
-supabase = get_supabase()
+recom_service = RecommendationService()
 
 @router.post("/", response_model=PantryItemOut)
 async def add_pantry_item(
@@ -30,14 +36,44 @@ async def add_pantry_item(
     except Exception as e:
         raise HTTPException(400, detail=str(e))
 
+@router.post("/bulk", response_model=PantryBulkResult)
+async def add_pantry_items(
+    items: List[PantryItem],
+    session_id: str = Depends(get_session_id)
+):
+    """Add many items at once; items already in the pantry are reported as duplicates"""
+    try:
+        return await pantry_service.add_pantry_items(items, session_id)
+    except Exception as e:
+        raise HTTPException(400, detail=str(e))
+
+@router.delete("/bulk")
+async def delete_pantry_items(
+    item_ids: List[int] = Body(...),
+    session_id: str = Depends(get_session_id)
+):
+    """Remove many items at once"""
+    deleted = await pantry_service.remove_pantry_items(item_ids, session_id)
+    return {"deleted": deleted}
+
 @router.get("/", response_model=List[PantryItemOut])
 async def get_pantry(
+    response: Response,
     session_id: str = Depends(get_session_id),
-    expiring_soon: bool = False
+    expiring_soon: bool = False,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
-    items = await pantry_service.get_pantry_items(session_id)
-    if expiring_soon:
-        items = [i for i in items if i.get("days_remaining") is not None and i["days_remaining"] <= 3]
+    """List pantry items a page at a time; the next page's cursor is sent in X-Next-Cursor"""
+    try:
+        items, next_cursor = await pantry_service.list_pantry_items(
+            session_id, limit=limit, cursor=cursor, expiring_soon=expiring_soon
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return items
 
 @router.delete("/{item_id}")
@@ -59,13 +95,38 @@ async def add_grocery_items(
     except Exception as e:
         raise HTTPException(400, detail=str(e))
 
+@router.post("/grocery/from-recipes", response_model=List[GroceryItemOut])
+async def add_grocery_items_from_recipes(
+    request: ShoppingListRequest,
+    session_id: str = Depends(get_session_id)
+):
+    """Add everything missing from the pantry for several recipes, merged into one list"""
+    try:
+        pantry_items = await pantry_service.get_normalized_names(session_id)
+        missing = await recom_service.generate_shopping_list(request.recipe_ids, pantry_items)
+        return await grocery_service.add_to_grocery(session_id, missing)
+    except Exception as e:
+        raise HTTPException(400, detail=str(e))
+
 @router.get("/grocery", response_model=List[GroceryItemOut])
 async def get_grocery(
+    response: Response,
     session_id: str = Depends(get_session_id),
-    purchased: Optional[bool] = None
+    purchased: Optional[bool] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
-    """Get grocery list with optional purchased filter"""
-    return await grocery_service.get_grocery_list(session_id, purchased)
+    """Get grocery list with optional purchased filter, a page at a time"""
+    try:
+        items, next_cursor = await grocery_service.get_grocery_list(
+            session_id, purchased, limit=limit, cursor=cursor
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @router.patch("/grocery/{item_id}/toggle", response_model=GroceryItemOut)
 async def toggle_grocery_item(
@@ -1,17 +1,22 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from api.core.database import get_supabase
+from fastapi import APIRouter, Depends, HTTPException, Response
 
-from api.dependecies import get_session_id
-from api.models.requests import RecipeFilters, RecipeRequest
+from api.core.admission import AdmissionRejected, admission_outcomes
+from api.core.cache import pantry_cache_key, served_cache_age
+from api.core.deadline import DeadlineExceeded, deadline_scope
+from api.core.query_stats import query_stats
+from api.dependecies import get_request_deadline, get_session_id
+from api.models.requests import RecipeBatchRequest, RecipeFilters, RecipeRequest
 from api.models.schemas import Recipe, RecipeDB, ScoredRecipe
 from api.services.pantry import PantryService
 from api.services.recipe import RecipeService
 from api.services.recommendation import RecommendationService
 from api.services.session import SessionService
 
+from api.settings import get_settings
 import logging
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -21,17 +26,17 @@ recipe_service = RecipeService()
 recom_service = RecommendationService()
 pantry_service = PantryService()
 
-supabase = get_supabase()
-
 @router.get("/", response_model=List[Recipe])
 async def list_recipes(
+    response: Response,
     session_id: str = Depends(get_session_id),
+    deadline: float = Depends(get_request_deadline),
     query: Optional[str] = None,
     cuisine: Optional[str] = None,
     max_time: Optional[int] = None,
     max_missing: Optional[int] = None
 ):
-    """Search with filters"""
+    """Search with filters; answers with what it has when the request deadline is reached"""
     filters = RecipeFilters(
         cuisine=cuisine,
         max_time=max_time,
@@ -40,24 +45,53 @@ async def list_recipes(
     
     recommendations = []
 
-    if query is not None:
-        await recipe_service.scrape_recipes(query)
+    with deadline_scope(deadline):
+        if query is not None:
+            try:
+                await recipe_service.scrape_recipes(query, session_id=session_id)
+            except AdmissionRejected as e:
+                retry_after = str(int(e.retry_after))
+                if settings.ADMISSION_ON_OVERLOAD == "reject":
+                    admission_outcomes.inc("rejected")
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Too many recipe searches in progress, try again shortly",
+                        headers={"Retry-After": retry_after},
+                    )
+                # Degrade: skip the crawl and recommend from the recipes already stored
+                admission_outcomes.inc("degraded")
+                logger.info(f"Crawl for {query!r} not admitted ({e.reason}); serving stored recipes")
+                response.headers["X-PantryChef-Degraded"] = "crawl-skipped"
+                response.headers["Retry-After"] = retry_after
+            except DeadlineExceeded:
+                # The crawl keeps going in the background; a repeat of this query will hit the cache
+                response.headers["X-PantryChef-Partial"] = "crawl-pending"
 
-    try :
-        pantry_items_data = await pantry_service.get_pantry_items(session_id)
-        pantry_items = [item.normalized_name for item in pantry_items_data]
-        recommendations = await recom_service.get_recommendations(
-            pantry_items, filters, query
-        )
-    except Exception as e:
-        logger.error(f"Failed to Generate Recommendations: {e}")
-        return []
+        try :
+            pantry_items_data = await pantry_service.get_pantry_items(session_id)
+            pantry_items = [item.normalized_name for item in pantry_items_data]
+            if query:
+                query_stats.record_query(query)
+            else:
+                query_stats.record_pantry(pantry_cache_key(pantry_items))
+            recommendations = await recom_service.get_recommendations(
+                pantry_items, filters, query
+            )
+        except Exception as e:
+            logger.error(f"Failed to Generate Recommendations: {e}")
+            return []
+
+    if served := served_cache_age():
+        age, stale = served
+        response.headers["Age"] = str(int(age))
+        response.headers["X-PantryChef-Cache"] = "stale" if stale else "hit"
     
     return recommendations
 
 @router.post("/recommend")
 async def get_recommended_recipes(
     session_id: str = Depends(get_session_id),
+    deadline: float = Depends(get_request_deadline),
     max_missing: Optional[int] = None,
     min_score: Optional[float] = 0.4
     ):
@@ -70,10 +104,13 @@ async def get_recommended_recipes(
     recommendations = []
 
     try :
-        pantry_items = await pantry_service.get_pantry_items(session_id)
-        recommendations = await recom_service.get_recommendations(
-            pantry_items, filters
-        )
+        pantry_items_data = await pantry_service.get_pantry_items(session_id)
+        pantry_items = [item.normalized_name for item in pantry_items_data]
+        query_stats.record_pantry(pantry_cache_key(pantry_items))
+        with deadline_scope(deadline):
+            recommendations = await recom_service.get_recommendations(
+                pantry_items, filters
+            )
     except Exception as e:
         logger.error(f"Failed to Generate Recommendations: {e}")
         return []
@@ -81,6 +118,15 @@ async def get_recommended_recipes(
     return recommendations
 
 
+@router.post("/batch", response_model=List[RecipeDB])
+async def get_recipes_batch(
+    request: RecipeBatchRequest,
+    session_id: str = Depends(get_session_id)
+):
+    """Get many recipes by id in one call, in request order; unknown ids are left out"""
+    return recipe_service.get_recipes_from_db(request.ids)
+
+
 @router.get("/{recipe_id}", response_model=RecipeDB)
 async def get_recipe(
     recipe_id: str,
@@ -4,7 +4,6 @@ from typing import List
 
 from fastapi import APIRouter
 
-from api.core.database import get_supabase
 from api.models.sessions import SessionData
 from api.services.session import SessionService
 
@@ -14,8 +13,6 @@ router = APIRouter()
 
 session_service = SessionService()
 
-supabase = get_supabase()
-
 
 @router.post("/", response_model=dict)
 async def create_session(pantry_items: List[str]):
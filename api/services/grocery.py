@@ -1,90 +1,127 @@
 import os
 import json
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 from api.core.database import get_supabase
+from api.core.rec_engine import normalize_ingredient
+from api.core.units import grocery_key, merge_ingredients, merge_quantities
 from api.models.schemas import Ingredient, GroceryItemOut
+from api.utils import decode_cursor, encode_cursor
 
 supabase = get_supabase()
 
 def normalize_ingredient_name(ingredient: Ingredient) -> str:
-        """Create consistent searchable name"""
-        parts = []
-        if ingredient.quantity:
-            parts.append(ingredient.quantity)
-        parts.append(ingredient.name)
-        if ingredient.unit:
-            parts.append(ingredient.unit)
-        return "_".join(part.lower().strip() for part in parts)
+        """Create consistent searchable name, shared by every quantity of the same ingredient"""
+        return grocery_key(normalize_ingredient(ingredient), ingredient.unit)
 
 
 class GroceryService:
     @staticmethod
     async def add_to_grocery(session_id: str, ingredients: List[Ingredient]) -> List[GroceryItemOut]:
-        """Add multiple ingredients to grocery list"""
-        items = []
-        for ingredient in ingredients:
-            normalized = normalize_ingredient_name(ingredient)
-            items.append({
+        """
+        Add multiple ingredients to grocery list.
+
+        Ingredients are merged by canonical name and compatible unit, folded into
+        any matching items already on the list and written back with a single
+        upsert on (session_id, normalized_name). An item already marked
+        purchased keeps its flag and gets the added quantity on top.
+        """
+        merged = merge_ingredients(
+            [(normalize_ingredient(ingredient), ingredient) for ingredient in ingredients]
+        )
+        if not merged:
+            return []
+
+        # Purchased rows too: the upsert conflicts on them just the same
+        existing = supabase.from_("grocery_items") \
+            .select("normalized_name, ingredient, purchased") \
+            .eq("session_id", session_id) \
+            .in_("normalized_name", list(merged)) \
+            .execute()
+
+        purchased = {}
+        for row in existing.data:
+            key = row["normalized_name"]
+            merged[key] = merge_quantities(Ingredient(**row["ingredient"]), merged[key])
+            purchased[key] = row["purchased"]
+
+        items = [
+            {
                 "session_id": session_id,
                 "ingredient": json.loads(ingredient.json()),
-                "normalized_name": normalized
-            })
-        
-        result = supabase.from_("grocery_items").insert(items).execute()
+                "normalized_name": key,
+                "purchased": purchased.get(key, False),
+            }
+            for key, ingredient in merged.items()
+        ]
+
+        result = supabase.from_("grocery_items") \
+            .upsert(items, on_conflict="session_id,normalized_name") \
+            .execute()
         return [GroceryItemOut(**item) for item in result.data]
 
     @staticmethod
-    async def get_grocery_list(session_id: str, purchased: Optional[bool] = None) -> List[GroceryItemOut]:
-        """Retrieve grocery items with purchase filter"""
+    async def get_grocery_list(
+        session_id: str,
+        purchased: Optional[bool] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[GroceryItemOut], Optional[str]]:
+        """
+        Retrieve one keyset-paginated page of grocery items, newest first,
+        with an optional purchased filter. Returns the page and the cursor for
+        the next one (None on the last page).
+        """
         query = supabase.from_("grocery_items") \
             .select("*") \
             .eq("session_id", session_id)
         
         if purchased is not None:
             query = query.eq("purchased", purchased)
+
+        if cursor:
+            created_at, item_id = decode_cursor(cursor, keys=2)
+            created_at = datetime.fromisoformat(created_at).isoformat()
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{int(item_id)})'
+            )
         
-        result = query.order("created_at", desc=True).execute()
-        return [GroceryItemOut(**item) for item in result.data]
+        result = query \
+            .order("created_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(limit + 1) \
+            .execute()
+        rows = result.data[:limit]
+
+        next_cursor = None
+        if len(result.data) > limit:
+            next_cursor = encode_cursor([rows[-1]["created_at"], rows[-1]["id"]])
+
+        return [GroceryItemOut(**item) for item in rows], next_cursor
 
     @staticmethod
     async def toggle_purchased(item_id: int, session_id: str) -> GroceryItemOut:
         """Mark item as purchased/unpurchased"""
-        # Verify ownership first
-        item = supabase.from_("grocery_items") \
-            .select("*") \
-            .eq("id", item_id)\
-            .eq("session_id", session_id)\
-            .single()\
-            .execute()
-        
-        if not item.data:
+        # Ownership check and flip happen in one conditional UPDATE ... RETURNING
+        result = supabase.rpc(
+            "toggle_grocery_item",
+            {"p_item_id": item_id, "p_session_id": session_id},
+        ).execute()
+
+        if not result.data:
             raise ValueError("Item not found in your grocery list")
-        
-        result = supabase.from_("grocery_items") \
-            .update({"purchased": not item.data["purchased"]}) \
-            .eq("id", item_id) \
-            .execute()
-        
+
         return GroceryItemOut(**result.data[0])
 
     @staticmethod
     async def remove_grocery_item(item_id: int, session_id: str) -> bool:
         """Delete item from grocery list"""
-        # Verify ownership
-        exists = supabase.from_("grocery_items") \
-            .select("id") \
-            .eq("id", item_id)\
-            .eq("session_id", session_id)\
-            .maybe_single()\
-            .execute()
-        
-        if not exists.data:
-            return False
-        
-        supabase.from_("grocery_items") \
+        # Scoped to the session, so another session's item is simply not found
+        result = supabase.from_("grocery_items") \
             .delete() \
             .eq("id", item_id) \
+            .eq("session_id", session_id) \
             .execute()
-        
-        return True
\ No newline at end of file
+
+        return bool(result.data)
@@ -0,0 +1,81 @@
+import asyncio
+
+from api.core.cache import clean_expired_cache
+from api.core.llm import response_cache
+from api.core.scheduler import MaintenanceScheduler
+from api.core.text_index import rebuild_text_index
+from api.core.vector_store import rebuild_embedding_matrix
+from api.crawler.frontier import frontier
+from api.crawler.page_cache import page_cache
+from api.services.recipe import RecipeService
+from api.services.session import SessionService
+from api.services.warmup import warm_caches
+from api.settings import get_settings
+
+settings = get_settings()
+
+
+async def purge_expired_sessions() -> int:
+    return await SessionService.cleanup_expired_sessions(
+        settings.MAINTENANCE_PURGE_CHUNK_SIZE, settings.MAINTENANCE_PURGE_MAX_CHUNKS
+    )
+
+
+async def refresh_recipes() -> int:
+    # Imported lazily so workers only load Playwright when the job actually runs
+    from api.crawler.refresh import refresh_outdated_recipes
+
+    return await refresh_outdated_recipes(
+        days_old=settings.RECIPE_REFRESH_DAYS_OLD,
+        batch_size=settings.RECIPE_REFRESH_BATCH_SIZE,
+    )
+
+
+async def crawl_frontier() -> int:
+    return await RecipeService.crawl_queued_recipes(settings.CRAWLER_FRONTIER_BATCH_SIZE)
+
+
+async def prune_crawl_frontier() -> int:
+    return await asyncio.to_thread(frontier.prune, settings.CRAWLER_FRONTIER_RETENTION_DAYS * 86400)
+
+
+async def rebuild_embeddings() -> int:
+    return await asyncio.to_thread(rebuild_embedding_matrix, settings.EMBEDDING_MATRIX_DIR)
+
+
+async def rebuild_text_search() -> int:
+    return await asyncio.to_thread(rebuild_text_index, settings.TEXT_INDEX_PATH)
+
+
+async def prune_llm_cache() -> int:
+    return await asyncio.to_thread(response_cache.prune)
+
+
+async def prune_page_cache() -> int:
+    return await asyncio.to_thread(page_cache.prune)
+
+
+def create_maintenance_scheduler() -> MaintenanceScheduler:
+    """Scheduler with the app's periodic clean-up jobs registered"""
+    scheduler = MaintenanceScheduler()
+    scheduler.register("purge_expired_sessions", settings.SESSION_PURGE_INTERVAL, purge_expired_sessions, run_on_start=True)
+    scheduler.register("clean_expired_cache", settings.CACHE_PURGE_INTERVAL, clean_expired_cache, run_on_start=True)
+    scheduler.register("refresh_outdated_recipes", settings.RECIPE_REFRESH_INTERVAL, refresh_recipes)
+    scheduler.register("crawl_frontier", settings.CRAWLER_FRONTIER_INTERVAL, crawl_frontier)
+    scheduler.register("prune_crawl_frontier", settings.CACHE_PURGE_INTERVAL, prune_crawl_frontier)
+    if settings.CACHE_WARM_ENABLED:
+        scheduler.register("warm_caches", settings.CACHE_WARM_INTERVAL, warm_caches, run_on_start=True)
+    if settings.LLM_CACHE_ENABLED:
+        scheduler.register("prune_llm_cache", settings.CACHE_PURGE_INTERVAL, prune_llm_cache)
+    if settings.CRAWLER_PAGE_CACHE_ENABLED:
+        scheduler.register("prune_page_cache", settings.CACHE_PURGE_INTERVAL, prune_page_cache)
+    if settings.LOCAL_VECTOR_SEARCH:
+        # The lease means one worker per host builds; the others remap via CURRENT
+        scheduler.register(
+            "rebuild_embedding_matrix", settings.EMBEDDING_MATRIX_REBUILD_INTERVAL, rebuild_embeddings, run_on_start=True
+        )
+    if settings.LOCAL_TEXT_SEARCH:
+        scheduler.register(
+            "rebuild_text_index", settings.TEXT_INDEX_REBUILD_INTERVAL, rebuild_text_search, run_on_start=True
+        )
+    return scheduler
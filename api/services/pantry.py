@@ -1,76 +1,23 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import hashlib
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from api.core.database import get_supabase
 from api.core.rec_engine import normalize_ingredient
-from api.models.schemas import PantryItem, PantryItemOut
+from api.models.schemas import PantryBulkResult, PantryItem, PantryItemOut
+from api.utils import decode_cursor, encode_cursor
 import logging
 
 logger = logging.getLogger(__name__)
 supabase = get_supabase()
 
-def calculate_expiry_status(expiry: datetime) -> str:
-    """
-    Determine expiry status from a datetime.
-    Returns: "expired", "expiring_soon", or "fresh"
-    """
-    if not expiry:
-        return "unknown"
-    
-    days_remaining = (expiry - datetime.now()).days
-    
-    if days_remaining < 0:
-        return "expired"
-    elif days_remaining <= 3:
-        return "expiring_soon"
-    else:
-        return "fresh"
-
-
-from datetime import datetime
-
-def calculate_expiry_status(expiry: Optional[datetime]) -> str:
-    """
-    Determine expiry status from a datetime.
-    Returns: "expired", "expiring_soon", or "fresh"
-    """
-    if not expiry:
-        return "unknown"
-    
-    now = datetime.now(timezone.utc)
-    days_remaining = (expiry - now).days
-
-    if days_remaining < 0:
-        return "expired"
-    elif days_remaining <= 3:
-        return "expiring_soon"
-    else:
-        return "fresh"
-
-
-def enrich_with_expiry(item: dict) -> dict:
-    """Add expiry metadata"""
-    expiry_raw = item.get("expiry_date")
-    expiry = None
-
-    if isinstance(expiry_raw, str):
-        try:
-            expiry = datetime.fromisoformat(expiry_raw)
-            if expiry.tzinfo is None:
-                expiry = expiry.replace(tzinfo=timezone.utc)
-        except ValueError:
-            expiry = None
-    elif isinstance(expiry_raw, datetime):
-        expiry = expiry if expiry.tzinfo else expiry.replace(tzinfo=timezone.utc)
-
-    now = datetime.now(timezone.utc)
+# days_remaining / expiry_status are computed columns defined in the database
+# (see supabase/migrations), so they come back with the rows instead of being
+# derived item by item in Python.
+PANTRY_COLUMNS = "*, days_remaining, expiry_status"
 
-    return {
-        **item,
-        "expiry_status": calculate_expiry_status(expiry),
-        "days_remaining": (expiry - now).days if expiry else None
-    }
+# Matches the "expiring_soon" status: days_remaining <= 3
+EXPIRING_SOON_DAYS = 3
 
 
 class PantryService:
@@ -78,40 +25,125 @@ class PantryService:
     async def get_pantry_items(session_id: str) -> List[PantryItemOut]:
         """Retrieve all items for a session with expiry status"""
         items = supabase.from_("pantry_items") \
-            .select("*") \
+            .select(PANTRY_COLUMNS) \
             .eq("session_id", session_id) \
             .execute()
         
-        return [enrich_with_expiry(item) for item in items.data]
+        return [PantryItemOut(**item) for item in items.data]
 
     @staticmethod
-    async def add_pantry_item(item: PantryItem, session_id: str) -> PantryItemOut:
-        """Add item and invalidate recipe cache"""
-        normalized = normalize_ingredient(item.ingredient)
+    async def list_pantry_items(
+        session_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        expiring_soon: bool = False,
+    ) -> Tuple[List[PantryItemOut], Optional[str]]:
+        """
+        One keyset-paginated page of pantry items.
+
+        The default listing walks the pantry by id. With `expiring_soon` the
+        window is pushed into a range predicate on expiry_date and rows are
+        walked by (expiry_date, id), soonest first. Returns the page and the
+        cursor for the next one (None on the last page).
+        """
+        query = supabase.from_("pantry_items") \
+            .select(PANTRY_COLUMNS) \
+            .eq("session_id", session_id)
+
+        after = decode_cursor(cursor, keys=2 if expiring_soon else 1) if cursor else None
+
+        if expiring_soon:
+            # days_remaining <= N  <=>  expiry_date < now + (N + 1) days
+            window_end = datetime.now(timezone.utc) + timedelta(days=EXPIRING_SOON_DAYS + 1)
+            query = query.lt("expiry_date", window_end.isoformat())
+            if after:
+                expiry, item_id = after
+                expiry = datetime.fromisoformat(expiry).isoformat()
+                query = query.or_(
+                    f'expiry_date.gt."{expiry}",'
+                    f'and(expiry_date.eq."{expiry}",id.gt.{int(item_id)})'
+                )
+            query = query.order("expiry_date").order("id")
+        else:
+            if after:
+                query = query.gt("id", int(after[0]))
+            query = query.order("id")
+
+        items = query.limit(limit + 1).execute()
+        rows = items.data[:limit]
+
+        next_cursor = None
+        if len(items.data) > limit:
+            last = rows[-1]
+            keys = [last["expiry_date"], last["id"]] if expiring_soon else [last["id"]]
+            next_cursor = encode_cursor(keys)
+
+        return [PantryItemOut(**item) for item in rows], next_cursor
 
-        existing = supabase.from_("pantry_items") \
-            .select("*") \
-            .eq("session_id", session_id) \
-            .eq("normalized_name", normalized) \
-            .execute()
+    @staticmethod
+    async def add_pantry_item(item: PantryItem, session_id: str) -> PantryItemOut:
+        """Add one item, failing if it is already in the pantry"""
+        result = await PantryService.add_pantry_items([item], session_id)
 
-        if existing.data:
+        if result.duplicates:
             raise Exception(f"Item '{item.ingredient.name}' already exists in pantry.")
 
-        data = {
-            **item.model_dump(),
-            "session_id": session_id,
-            "normalized_name": normalized,
-        }
+        return result.added[0]
 
-        # Convert expiry_date to ISO format if it exists
-        if data.get("expiry_date") and isinstance(data["expiry_date"], datetime):
-            data["expiry_date"] = data["expiry_date"].isoformat()
+    @staticmethod
+    async def add_pantry_items(items: List[PantryItem], session_id: str) -> PantryBulkResult:
+        """
+        Add many items with a single upsert.
+
+        Names are canonicalized up front; repeats within the batch and items
+        already in the pantry are reported back as duplicates instead of failing
+        the whole batch. Cached recommendations need no invalidation: they are
+        keyed by the pantry's set of names, so a changed pantry has a new key.
+        """
+        rows = {}
+        duplicates = []
+
+        for item in items:
+            normalized = normalize_ingredient(item.ingredient)
+            if normalized in rows:
+                duplicates.append(item.ingredient.name)
+                continue
+
+            data = {
+                **item.model_dump(),
+                "session_id": session_id,
+                "normalized_name": normalized,
+            }
+
+            # Convert expiry_date to ISO format if it exists
+            if data.get("expiry_date") and isinstance(data["expiry_date"], datetime):
+                data["expiry_date"] = data["expiry_date"].isoformat()
+
+            rows[normalized] = data
+
+        if not rows:
+            return PantryBulkResult(added=[], duplicates=duplicates)
+
+        # Rows that hit the (session_id, normalized_name) constraint are skipped
+        # and left out of the returned representation
+        db_items = supabase.from_("pantry_items") \
+            .upsert(
+                list(rows.values()),
+                on_conflict="session_id,normalized_name",
+                ignore_duplicates=True,
+            ) \
+            .execute()
+
+        inserted = {row["normalized_name"]: row for row in db_items.data}
+        duplicates.extend(
+            row["ingredient"]["name"] for name, row in rows.items() if name not in inserted
+        )
+
+        return PantryBulkResult(
+            added=[PantryItemOut(**row) for row in inserted.values()],
+            duplicates=duplicates,
+        )
 
-        db_item = supabase.from_("pantry_items").insert(data).execute()
-        
-        return PantryItemOut(**db_item.data[0])
-    
     @staticmethod
     async def remove_pantry_item(item_id, session_id):
         try:
@@ -122,4 +154,28 @@ class PantryService:
             .execute()
         except Exception as e:
             logger.error(f"Failed to update pantry item: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    async def remove_pantry_items(item_ids: List[int], session_id: str) -> List[int]:
+        """Delete many items with one `in_` filter and return the IDs actually removed"""
+        if not item_ids:
+            return []
+
+        deleted = supabase.table("pantry_items") \
+            .delete() \
+            .eq("session_id", session_id) \
+            .in_("id", list(set(item_ids))) \
+            .execute()
+
+        return [row["id"] for row in deleted.data]
+
+    @staticmethod
+    async def get_normalized_names(session_id: str) -> List[str]:
+        """Normalized names of everything currently in the pantry"""
+        items = supabase.from_("pantry_items") \
+            .select("normalized_name") \
+            .eq("session_id", session_id) \
+            .execute()
+
+        return [item["normalized_name"] for item in items.data]
@@ -2,55 +2,311 @@ import asyncio
 from datetime import datetime, timedelta
 import json
 import logging
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from api.core.cache import cache_recipes, get_cached_recipes
-from rapidfuzz import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
 
+from api.core.admission import AdmissionRejected, crawl_admission
 from api.core.database import get_supabase
-from api.core.rec_engine import cosine_similarity, normalize_ingredient, classify_cuisine, get_embedding
-from api.crawler.recipe import RecipeCrawler
+from api.core.deadline import DeadlineExceeded, deadline_scope, with_deadline
+from api.core.metrics import timed
+from api.core.quantization import pack_int8, unpack_int8
+from api.core.openai_gateway import Priority
+from api.core.row_cache import recipe_rows
+from api.core.rec_engine import cosine_similarity, normalize_ingredient, classify_cuisine, get_embedding, get_embeddings
+from api.core.text_index import text_index
+from api.crawler.frontier import CrawlPriority, frontier
+from api.core.vector_store import embedding_matrix, parse_embedding
 from api.models.schemas import Recipe, RecipeCreate, RecipeDB, ScoredRecipe
+from api.settings import get_settings
 
+settings = get_settings()
 supabase = get_supabase()
 logger = logging.getLogger(__name__)
 
+# Crawls started by requests; referenced here so they survive a request that stopped waiting
+background_crawls: Set[asyncio.Task] = set()
+
+
+def _crawl_finished(task: asyncio.Task) -> None:
+    background_crawls.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None and not isinstance(error, AdmissionRejected):
+        logger.error(f"Crawl failed: {error}")
+
+
+def _copy_row(row: Dict) -> Dict:
+    """Copy of a cached recipe row deep enough that editing it leaves the cache alone"""
+    copy = dict(row)
+    if isinstance(copy.get("ingredients"), list):
+        copy["ingredients"] = [dict(ingredient) if isinstance(ingredient, dict) else ingredient
+                               for ingredient in copy["ingredients"]]
+    return copy
+
+
 class RecipeService:
     @staticmethod
-    def get_recipe_from_db(recipe_id) -> RecipeDB:
-        recipes = supabase.from_("recipes").select("*").eq("id", recipe_id).single().execute()
-        return recipes.data if recipes else {}
+    def get_recipe_from_db(recipe_id) -> Optional[RecipeDB]:
+        """One recipe, read through the in-process row cache; None if there is no such recipe"""
+        recipes = RecipeService.get_recipes_from_db([recipe_id])
+        return RecipeDB(**recipes[0]) if recipes else None
     
     @staticmethod
-    async def scrape_recipes(query: str, max_recipes: int = 5) -> List[Recipe]:
+    def get_recipes_from_db(recipe_ids: Iterable[str]) -> List[Dict]:
+        """
+        Recipes in the order of `recipe_ids` (duplicates and unknown ids
+        dropped), served from the row cache with the misses fetched in a
+        single `in_` query. The rows are copies, so callers may modify them.
+        """
+        recipe_ids = list(dict.fromkeys(map(str, recipe_ids)))
+        if not recipe_ids:
+            return []
+        found = recipe_rows.get_many(recipe_ids)
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+        if missing:
+            recipes = supabase.from_("recipes").select("*").in_("id", missing).execute()
+            rows = recipes.data or []
+            recipe_rows.put_many(rows)
+            found.update((str(row["id"]), row) for row in rows)
+        return [_copy_row(found[recipe_id]) for recipe_id in recipe_ids if recipe_id in found]
+
+    @staticmethod
+    def get_recipe_embedding(recipe_id: str) -> Optional[np.ndarray]:
+        """Stored embedding for one recipe, if it has one"""
+        return RecipeService.get_recipe_embeddings([recipe_id]).get(str(recipe_id))
+
+    @staticmethod
+    def get_recipe_embeddings(recipe_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Stored embeddings by recipe id, taken from the shared embedding
+        matrix when it holds them and otherwise fetched in one `in_` query
+        on the compact int8 column; only rows written before that column
+        existed need a second query for `embedding`.
+        """
+        recipe_ids = list(dict.fromkeys(map(str, recipe_ids)))
+        embeddings: Dict[str, np.ndarray] = {}
+        if settings.LOCAL_VECTOR_SEARCH and recipe_ids and embedding_matrix.available:
+            for recipe_id in recipe_ids:
+                vector = embedding_matrix.vector(recipe_id)
+                if vector is not None:
+                    embeddings[recipe_id] = vector
+        missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in embeddings]
+        if not missing:
+            return embeddings
+
+        result = supabase.from_("recipe_embeddings") \
+            .select("recipe_id, embedding_q8") \
+            .in_("recipe_id", missing) \
+            .execute()
+        legacy = []
+        for row in result.data or []:
+            if row.get("embedding_q8"):
+                embeddings[str(row["recipe_id"])] = unpack_int8(row["embedding_q8"])
+            else:
+                legacy.append(row["recipe_id"])
+        if legacy:
+            result = supabase.from_("recipe_embeddings") \
+                .select("recipe_id, embedding") \
+                .in_("recipe_id", legacy) \
+                .execute()
+            for row in result.data or []:
+                if row.get("embedding"):
+                    embeddings[str(row["recipe_id"])] = parse_embedding(row["embedding"])
+        return embeddings
+
+    @staticmethod
+    def search_local(query: str, limit: int) -> List[RecipeDB]:
+        """Stored recipes matching the query well enough to skip a crawl, best first"""
+        with timed("text_search"):
+            hits = [
+                recipe_id
+                for recipe_id, _, coverage in text_index.search(query, limit * 2)
+                if coverage >= settings.TEXT_SEARCH_MIN_COVERAGE
+            ][:limit]
+        if not hits:
+            return []
+        by_id = {str(r["id"]): r for r in RecipeService.get_recipes_from_db(hits)}
+        return [RecipeDB(**by_id[recipe_id]) for recipe_id in hits if recipe_id in by_id]
+
+    @staticmethod
+    def index_recipes(recipes: List[Dict]) -> None:
+        """Make just-stored recipes findable by local text search before the next rebuild"""
+        if settings.LOCAL_TEXT_SEARCH:
+            text_index.add_recipes(recipes)
+
+    @staticmethod
+    def index_embeddings(recipe_ids: List[str], embeddings: List[List[float]]) -> None:
+        """Make just-stored recipes findable by local vector search before the next rebuild"""
+        if not settings.LOCAL_VECTOR_SEARCH:
+            return
+        try:
+            embedding_matrix.add(recipe_ids, np.asarray(embeddings, dtype=np.float32))
+        except Exception as e:
+            logger.warning(f"Could not add {len(recipe_ids)} embeddings to the local index: {e}")
+
+    @staticmethod
+    def match_ingredients(
+        pantry_set: Set[str],
+        ingredients: List[Dict],
+        fuzzy_threshold: int = 75,
+    ) -> Tuple[List[str], int, List[Dict]]:
+        """
+        Match recipe ingredients against a set of normalized pantry names.
+
+        Returns the normalized recipe ingredient names, the number of fuzzy
+        matches and the raw ingredients that are missing from the pantry.
+        """
+        names = []
+        fuzzy_matches = 0
+        missing = []
+
+        for ing in ingredients:
+            ingredient = normalize_ingredient(ing["name"])
+            names.append(ingredient)
+            if ingredient in pantry_set:
+                continue
+
+            best_match = process.extractOne(ingredient, pantry_set, scorer=fuzz.ratio)
+            if best_match and best_match[1] > fuzzy_threshold:
+                fuzzy_matches += 1
+            else:
+                missing.append(ing)
+
+        return names, fuzzy_matches, missing
+
+    @staticmethod
+    async def scrape_recipes(query: str, max_recipes: int = 5, session_id: Optional[str] = None) -> List[Recipe]:
+        """
+        Recipes for a search query: from the query cache, the local corpus, or a crawl.
+
+        Crawls run under admission control and raise `AdmissionRejected`
+        when the process is already crawling at capacity. A crawl still
+        running at the request deadline raises `DeadlineExceeded` but is not
+        cancelled: it finishes in the background and fills the cache.
+        """
         try:
-            if cached := await get_cached_recipes(query):
+            if cached := await get_cached_recipes(query, revalidate=RecipeService.revalidate_query):
                 logger.info(f"Cache hit for query: {query}")
                 return cached[:max_recipes]
-            
-            recipe_crawler = RecipeCrawler()
-            raw_recipes = await recipe_crawler.crawl_recipes(query, max_recipes)
 
-            if not raw_recipes:
-                logger.warning(f"No recipes found for query: {query}")
-                return []
-            
-            await cache_recipes(query, raw_recipes)
+            if (local := await RecipeService.answer_locally(query, max_recipes)) is not None:
+                return local
             
-            # Store recipes in parallel
-            stored_recipes = await RecipeService.store_recipes(raw_recipes) 
-            
-            return stored_recipes
+            crawl = asyncio.create_task(RecipeService.crawl_and_store(query, max_recipes, session_id))
+            background_crawls.add(crawl)
+            crawl.add_done_callback(_crawl_finished)
+            try:
+                # Keep some of the budget back for embedding and scoring
+                return await with_deadline(asyncio.shield(crawl), reserve=settings.REQUEST_DEADLINE_RESERVE)
+            except DeadlineExceeded:
+                logger.info(f"Crawl for {query!r} still running at the deadline; continuing in the background")
+                raise
+        except (AdmissionRejected, DeadlineExceeded):
+            raise
         except Exception as e:
             logger.error(f"Error scraping recipes: {str(e)}")
             raise
 
+    @staticmethod
+    async def answer_locally(query: str, max_recipes: int = 5) -> Optional[List[RecipeDB]]:
+        """Local-corpus hits for the query, cached as its result; None when there are too few"""
+        if not settings.LOCAL_TEXT_SEARCH:
+            return None
+        local = RecipeService.search_local(query, max_recipes)
+        if len(local) < max_recipes:
+            return None
+        logger.info(f"Answered query from the local corpus: {query}")
+        await cache_recipes(query, local)
+        return local
+
+    @staticmethod
+    async def revalidate_query(
+        query: str, max_recipes: int = 5, session_id: str = "cache-revalidation"
+    ) -> List[RecipeDB]:
+        """
+        Recompute a query's cached result without a request waiting on it.
+        Refreshes share one admission budget (`session_id`) so they cannot
+        crowd out user searches.
+        """
+        if (local := await RecipeService.answer_locally(query, max_recipes)) is not None:
+            return local
+        return await RecipeService.crawl_and_store(
+            query, max_recipes, session_id=session_id, priority=CrawlPriority.REFRESH
+        )
+
+    @staticmethod
+    async def crawl_and_store(
+        query: str,
+        max_recipes: int = 5,
+        session_id: Optional[str] = None,
+        priority: CrawlPriority = CrawlPriority.USER,
+    ) -> List[RecipeDB]:
+        """Crawl under admission control and its own time limit, then cache and store the results"""
+        # Imported here so processes that never crawl never load Playwright
+        from api.crawler.recipe import RecipeCrawler
+
+        # Not the request's deadline: the crawl may outlive the request
+        with deadline_scope(settings.CRAWL_BACKGROUND_TIMEOUT):
+            async with crawl_admission.slot(session_id):
+                recipe_crawler = RecipeCrawler(priority=priority)
+                raw_recipes = await recipe_crawler.crawl_recipes(query, max_recipes)
+
+                if not raw_recipes:
+                    logger.warning(f"No recipes found for query: {query}")
+                    return []
+
+                await cache_recipes(query, raw_recipes)
+
+                # Store recipes in parallel
+                return await RecipeService.store_recipes(raw_recipes)
+
+    @staticmethod
+    async def crawl_queued_recipes(batch_size: int = 10) -> int:
+        """
+        Crawl recipe pages queued in the frontier that no request is waiting
+        for: discovered links, and pages of user crawls that never finished
+        (cut off, or their worker restarted). Pages already stored are only
+        marked done. Returns the number of recipes stored.
+        """
+        from api.crawler.recipe import RecipeCrawler
+
+        try:
+            # Taken before leasing any URL, so a refused run leaves the queue as it was
+            async with crawl_admission.slot("crawl-frontier"):
+                queued = await asyncio.to_thread(frontier.take, [CrawlPriority.USER, CrawlPriority.DISCOVERY], batch_size)
+                if not queued:
+                    return 0
+                rows = supabase.from_("recipes") \
+                    .select("source_url") \
+                    .in_("source_url", [url for url, _ in queued]) \
+                    .execute().data or []
+                known = {row["source_url"].rstrip("/") for row in rows}
+                queued = [(url, priority) for url, priority in queued if url.rstrip("/") not in known]
+                if known:
+                    await asyncio.to_thread(frontier.settle, done=[row["source_url"] for row in rows])
+
+                stored = 0
+                for priority in sorted({priority for _, priority in queued}):
+                    urls = [url for url, url_priority in queued if url_priority == priority]
+                    recipes = await RecipeCrawler(priority=priority).scrape_urls(urls)
+                    stored += len(await RecipeService.store_recipes(recipes))
+                return stored
+        except AdmissionRejected:
+            logger.info("Skipped crawling the frontier: crawl not admitted")
+            return 0
+
     @staticmethod
     async def score_recipe(
         pantry_items: List[str],
         recipe: Dict,
         use_embeddings: bool = True,
         fuzzy_threshold: int = 75,
-        embedding_weight: float = 0.3
+        embedding_weight: float = 0.3,
+        embeddings: Optional[Dict[str, np.ndarray]] = None,
+        pantry_embedding: Optional[List[float]] = None
     ) -> ScoredRecipe:
         """
         Scores a recipe based on pantry items using hybrid matching.
@@ -61,56 +317,45 @@ class RecipeService:
             use_embeddings: Whether to use semantic similarity
             fuzzy_threshold: Minimum fuzz ratio to count as match (0-100)
             embedding_weight: How much to weight embedding similarity (0-1)
+            embeddings: Recipe embeddings already fetched with
+                get_recipe_embeddings; a recipe missing from it has none
+            pantry_embedding: Embedding of the pantry, if already computed
             
         Returns:
             ScoreResult with detailed scoring breakdown
         """
         # Initialize results
-        missing = []
-        fuzzy_matches = 0
         embedding_sim = None
 
         pantry_set = {normalize_ingredient(i) for i in pantry_items}
-        recipe_ingredients = [
-            normalize_ingredient(ing["name"]) for ing in recipe["ingredients"]
-        ]
 
         # Exact + Fuzzy Matching
-        for ingredient in recipe_ingredients:
-            if ingredient not in pantry_set:
-                # Check fuzzy matches
-                best_match = max(
-                    [
-                        (fuzz.ratio(ingredient, pantry_ing), pantry_ing)
-                        for pantry_ing in pantry_set
-                    ],
-                    default=(0, None),
-                )
-
-                if best_match[0] > 75:  # 75% similarity threshold
-                    fuzzy_matches += 1
-                else:
-                    missing.append(ingredient)
+        recipe_ingredients, fuzzy_matches, missing_raw = RecipeService.match_ingredients(
+            pantry_set, recipe["ingredients"], fuzzy_threshold
+        )
+        missing = [normalize_ingredient(ing["name"]) for ing in missing_raw]
 
-        total_ingredients = len(recipe_ingredients)
+        total_ingredients = len(recipe_ingredients) or 1
         exact_matches = len(pantry_set.intersection(recipe_ingredients))
         
         exact_score = (exact_matches + fuzzy_matches * 0.7) / total_ingredients
 
-        if use_embeddings and "id" in recipe:
+        if use_embeddings and recipe.get("similarity") is not None:
+            # Candidates from vector search already carry cosine(pantry, recipe)
+            embedding_sim = float(recipe["similarity"])
+            final_score = (1 - embedding_weight) * exact_score + embedding_weight * embedding_sim
+        elif use_embeddings and "id" in recipe:
             try:
                 # Get pre-computed embedding
-                emb_response = supabase.from_("recipe_embeddings") \
-                    .select("embedding") \
-                    .eq("recipe_id", recipe["id"]) \
-                    .single().execute()
-                
-                if emb_response.data:
-                    pantry_embedding = await get_embedding(", ".join(pantry_items))
-                    embedding_sim = cosine_similarity(
-                        pantry_embedding,
-                        emb_response.data["embedding"]
-                    )
+                if embeddings is not None:
+                    recipe_embedding = embeddings.get(str(recipe["id"]))
+                else:
+                    recipe_embedding = RecipeService.get_recipe_embedding(recipe["id"])
+
+                if recipe_embedding is not None:
+                    if pantry_embedding is None:
+                        pantry_embedding = await get_embedding(", ".join(pantry_items))
+                    embedding_sim = float(cosine_similarity(pantry_embedding, recipe_embedding))
                     
                     # Combine scores
                     final_score = (1 - embedding_weight) * exact_score + \
@@ -123,10 +368,12 @@ class RecipeService:
         else:
             final_score = exact_score
 
+        # Negative embedding similarity can pull the blend below 0
+        score = min(max(final_score, 0), 1)
         return {
-            "score": min(max(final_score, 0), 1),  
+            "score": score,
             "missing_ingredients": missing,
-            "match_percentage": round(final_score * 100, 1),
+            "match_percentage": round(score * 100, 1),
             "exact_matches": exact_matches,
             "fuzzy_matches": fuzzy_matches,
             "embedding_similarity": embedding_sim
@@ -143,22 +390,27 @@ class RecipeService:
         ingredients_text = ", ".join(
             f"{ing.quantity} {ing.unit} {ing.name}" for ing in recipe.ingredients
         )
-        embedding = await get_embedding(f"{recipe.title} {ingredients_text}")
+        embedding = await get_embedding(f"{recipe.title} {ingredients_text}", priority=Priority.BACKGROUND)
 
         supabase.from_("recipe_embeddings").insert(
             {
                 "recipe_id": recipe_db["id"],
                 "embedding": embedding,
+                "embedding_q8": pack_int8(embedding) if embedding else None,
                 "ingredients_text": ingredients_text,
             }
         ).execute()
+        if embedding:
+            RecipeService.index_embeddings([recipe_db["id"]], [embedding])
+        RecipeService.index_recipes([recipe_db])
 
         # Classify cuisine if not provided
         if not recipe_db.get("cuisine"):
-            cuisine = classify_cuisine(recipe)
+            cuisine = await classify_cuisine(recipe)
             supabase.from_("recipes").update({"cuisine": cuisine}).eq(
                 "id", recipe_db["id"]
             ).execute()
+            recipe_rows.invalidate([recipe_db["id"]])
             recipe_db["cuisine"] = cuisine
 
         return recipe_db
@@ -174,39 +426,50 @@ class RecipeService:
         res = supabase.from_("recipes").insert(recipes_payload).execute()
         db_recipes = res.data  # List of inserted recipes with IDs
 
-        # Prepare embeddings and ingredients text
+        # Prepare embeddings and ingredients text; one embeddings request for the whole batch
+        ingredients_texts = [
+            ", ".join(f"{ing.quantity} {ing.unit} {ing.name}" for ing in recipe.ingredients)
+            for recipe in recipes
+        ]
+        embeddings = await get_embeddings(
+            [f"{recipe.title} {text}" for recipe, text in zip(recipes, ingredients_texts)],
+            priority=Priority.BACKGROUND,
+        ) or [[] for _ in recipes]
+
         embeddings_payload = []
         updates = []
-        for recipe, db_recipe in zip(recipes, db_recipes):
-            ingredients_text = ", ".join(
-                f"{ing.quantity} {ing.unit} {ing.name}" for ing in recipe.ingredients
-            )
-            embedding = await get_embedding(f"{recipe.title} {ingredients_text}")
+        for recipe, db_recipe, ingredients_text, embedding in zip(recipes, db_recipes, ingredients_texts, embeddings):
 
             if not embedding or len(embedding) == 0:
-                print(f"Skipping recipe '{recipe.title}' due to empty embedding.")
+                logger.warning(f"Skipping recipe '{recipe.title}' due to empty embedding.")
                 continue
             
             embeddings_payload.append({
                 "recipe_id": db_recipe["id"],
                 "embedding": embedding,
+                "embedding_q8": pack_int8(embedding),
                 "ingredients_text": ingredients_text,
             })
 
             # Classify cuisine if missing
             if not db_recipe.get("cuisine"):
-                cuisine = classify_cuisine(recipe)
+                cuisine = await classify_cuisine(recipe)
                 updates.append({"id": db_recipe["id"], "cuisine": cuisine})
                 db_recipe["cuisine"] = cuisine
 
         # Insert all recipe embeddings at once
         if embeddings_payload:
             supabase.from_("recipe_embeddings").insert(embeddings_payload).execute()
+            RecipeService.index_embeddings(
+                [e["recipe_id"] for e in embeddings_payload], [e["embedding"] for e in embeddings_payload]
+            )
+        RecipeService.index_recipes(db_recipes)
 
         # Update cuisine classifications in bulk (if any)
         for update in updates:
             supabase.from_("recipes").update(
                 {"cuisine": update["cuisine"]}
             ).eq("id", update["id"]).execute()
+        recipe_rows.invalidate(update["id"] for update in updates)
 
         return db_recipes
@@ -2,27 +2,44 @@ import json
 from typing import Dict, List, Optional
 
 from fastapi import HTTPException
-from api.core.cache import cache_recipes, get_cached_recipes
+from api.core.admission import AdmissionRejected, crawl_admission
+from api.core.cache import cache_recipes, get_cached_recipes, pantry_cache_key
 from api.core.database import get_supabase
-from api.core.rec_engine import get_embedding
-from api.models.schemas import RecipeCreate, ScoredRecipe
+from api.core.deadline import expired
+from api.core.metrics import timed
+from api.core.quantization import to_pgvector_literal
+from api.core.llm import chat_completion
+from api.core.rec_engine import get_embedding, normalize_ingredient
+from api.core.units import merge_ingredients
+from api.core.vector_store import embedding_matrix
+from api.models.schemas import Ingredient, RecipeCreate, ScoredRecipe
 from api.services.recipe import RecipeService
 from api.utils import parse_time_to_minutes
+from api.settings import get_settings
+import logging
 
+settings = get_settings()
 supabase = get_supabase()
+logger = logging.getLogger(__name__)
 
 class RecommendationService:
     @staticmethod
-    def generate_shopping_list(recipe_id: str, pantry_items: List[str]) -> Dict:
-        """Identify missing ingredients for a specific recipe"""
-        recipe = RecipeService.get_recipe_from_db(recipe_id)
-        scoring = RecipeService.score_recipe(pantry_items, recipe)
-        
-        return {
-            'recipe': recipe['title'],
-            'missing_ingredients': scoring['missing_ingredients'],
-            'confidence': f"{scoring['match_percentage']}% match"
-        }
+    async def generate_shopping_list(recipe_ids: List[str], pantry_items: List[str]) -> List[Ingredient]:
+        """
+        Missing ingredients for several recipes at once, merged by canonical
+        name and compatible unit with quantities summed
+        """
+        recipes = RecipeService.get_recipes_from_db(recipe_ids)
+        pantry_set = {normalize_ingredient(i) for i in pantry_items}
+
+        missing = []
+        for recipe in recipes:
+            _, _, missing_raw = RecipeService.match_ingredients(pantry_set, recipe["ingredients"])
+            missing.extend(
+                (normalize_ingredient(ing["name"]), Ingredient(**ing)) for ing in missing_raw
+            )
+
+        return list(merge_ingredients(missing).values())
     
     def personalize_feed(recipes: List[Dict], user_prefs: Dict) -> List[Dict]:
         """Combine score with user preferences"""
@@ -38,50 +55,88 @@ class RecommendationService:
         
         return sorted(recipes, key=lambda x: -x['personal_score'])
     
+    @staticmethod
+    def local_vector_search(query_embedding: List[float], limit: int, threshold: float) -> List[Dict]:
+        """Same contract as the `vector_search` RPC, served from the shared mmap matrix"""
+        with timed("vector_search"):
+            matches = embedding_matrix.search(query_embedding, k=limit, threshold=threshold)
+        if not matches:
+            return []
+        by_id = {str(r["id"]): r for r in RecipeService.get_recipes_from_db([m[0] for m in matches])}
+        return [
+            {**by_id[recipe_id], "similarity": similarity}
+            for recipe_id, similarity in matches
+            if recipe_id in by_id
+        ]
+
     @staticmethod
     async def get_recommendations(
         pantry_items: List[str], filters: Optional[Dict] = None, query = None
     ) -> List[ScoredRecipe]:
-        """Main recommendation logic"""
+        """
+        Main recommendation logic.
+
+        Under a request deadline, recipes still unscored when it passes are
+        scored on ingredient matches alone (no embedding calls), and the
+        trimmed result is not cached.
+        """
         
         filters = filters or {}
         recipes = []
 
         if query:
-            cached = await get_cached_recipes(query)
+            # Shares the query's entry with search, so it is refreshed the same way
+            cached = await get_cached_recipes(query, revalidate=RecipeService.revalidate_query)
             if cached:
                 return cached
 
         query_embedding = await get_embedding(", ".join(pantry_items))
-        query_embedding_str = "[" + ",".join(map(str, query_embedding)) + "]" if query_embedding else ""
 
-        try:
-            similar = supabase.rpc(
-                "vector_search",
-                {
-                    "query_embedding": query_embedding_str,
-                    "match_threshold": 0.7,
-                    "match_count": 50,
-                },
-            ).execute()
-            recipes = similar.data or []
-        except Exception as e:
-            print(f"Vector search failed: {e}")
-            recipes = []
+        if settings.LOCAL_VECTOR_SEARCH and query_embedding and embedding_matrix.available:
+            recipes = RecommendationService.local_vector_search(query_embedding, 50, 0.7)
+        elif query_embedding:
+            query_embedding_str = to_pgvector_literal(query_embedding)
+            try:
+                similar = supabase.rpc(
+                    "vector_search",
+                    {
+                        "query_embedding": query_embedding_str,
+                        "match_threshold": 0.7,
+                        "match_count": 50,
+                    },
+                ).execute()
+                recipes = similar.data or []
+            except Exception as e:
+                logger.warning(f"Vector search failed: {e}")
+                recipes = []
 
         if not recipes:
            
-            query_db = supabase.table("recipes")
+            query_db = supabase.table("recipes").select("*")
             if filters.get("cuisine"):
                 query_db = query_db.eq("cuisine", filters["cuisine"])
             
             response = query_db.limit(50).execute()
             recipes = response.data or []
 
+        # Embeddings for the candidates vector search did not already score, in one query
+        embeddings = {}
+        if not expired():
+            embeddings = RecipeService.get_recipe_embeddings(
+                recipe["id"] for recipe in recipes if recipe.get("similarity") is None and "id" in recipe
+            )
+
         # Score each recipe
         scored_recipes = []
+        trimmed = 0  # recipes scored without embeddings once the deadline passed
         for recipe in recipes:
-            scored = RecipeService.score_recipe(pantry_items, recipe)
+            use_embeddings = not trimmed and not expired()
+            trimmed += not use_embeddings
+            with timed("scoring"):
+                scored = await RecipeService.score_recipe(
+                    pantry_items, recipe, use_embeddings=use_embeddings,
+                    embeddings=embeddings, pantry_embedding=query_embedding,
+                )
 
             # Apply filters
             if (
@@ -94,35 +149,32 @@ class RecommendationService:
                 continue
 
             max_time = filters.get("max_time")
-            print(max_time)
             if max_time is not None:
                 cook_time = recipe.get("cook_time", None)
                 prep_time = recipe.get("prep_time", None)
                 cook_time_mins = parse_time_to_minutes(cook_time)
                 prep_time_mins = parse_time_to_minutes(prep_time)
                 total_time = cook_time_mins + prep_time_mins
-                print(total_time)
 
                 if total_time == 0 or total_time > max_time:
                     continue
 
-            scored_recipes.append(ScoredRecipe(**{**recipe, **scored}))
+            with timed("serialize"):
+                scored_recipes.append(ScoredRecipe(**{**recipe, **scored}))
 
-        cache_key = query or ",".join(pantry_items)
-
-        await cache_recipes(cache_key, scored_recipes)
+        if trimmed:
+            logger.warning(f"Deadline reached while scoring; {trimmed} recipes scored without embeddings")
+        else:
+            cache_key = query or pantry_cache_key(pantry_items)
+            await cache_recipes(cache_key, scored_recipes)
         
         # Sort by score and return
         scored_recipes.sort(key=lambda x: x.score, reverse=True)
         return scored_recipes[: filters.get("limit", 10)]
 
     @staticmethod
-    async def generate_recipe_variation(recipe: Dict, pantry_items: List[str]) -> Dict:
-        """Generate a recipe variation using LLM"""
-        from openai import OpenAI
-
-        client = OpenAI()
-
+    async def generate_recipe_variation(recipe: Dict, pantry_items: List[str], session_id: Optional[str] = None) -> Dict:
+        """Generate a recipe variation using LLM, under the same admission control as crawls"""
         prompt = f"""Create a variation of this recipe using mainly these ingredients: {', '.join(pantry_items)}.
         
         Original Recipe:
@@ -132,32 +184,40 @@ class RecommendationService:
         Create a similar but modified version that uses as many of the provided ingredients as possible.
         Return in JSON format with: title, ingredients (list with name, quantity, unit), and instructions."""
 
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            response_format={"type": "json_object"},
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional chef. Create recipe variations.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-        )
-
         try:
-            variation = json.loads(response.choices[0].message.content)
-            # Store the variation
-            variation_db = await RecipeService.store_recipe(
-                RecipeCreate(
-                    title=variation["title"],
-                    ingredients=variation["ingredients"],
-                    source_url=f"variation-of-{recipe['id']}",
-                    source="llm-generated",
+            async with crawl_admission.slot(session_id):
+                content = await chat_completion(
+                    "gpt-4-turbo",
+                    [
+                        {
+                            "role": "system",
+                            "content": "You are a professional chef. Create recipe variations.",
+                        },
+                        {"role": "user", "content": prompt},
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.7,
                 )
-            )
-            return variation_db
-        except Exception as e:
+
+                try:
+                    variation = json.loads(content)
+                    # Store the variation
+                    variation_db = await RecipeService.store_recipe(
+                        RecipeCreate(
+                            title=variation["title"],
+                            ingredients=variation["ingredients"],
+                            source_url=f"variation-of-{recipe['id']}",
+                            source="llm-generated",
+                        )
+                    )
+                    return variation_db
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=400, detail=f"Failed to generate variation: {str(e)}"
+                    )
+        except AdmissionRejected as e:
             raise HTTPException(
-                status_code=400, detail=f"Failed to generate variation: {str(e)}"
+                status_code=429,
+                detail="Too many recipe generations in progress, try again shortly",
+                headers={"Retry-After": str(int(e.retry_after))},
             )
@@ -1,14 +1,18 @@
 from datetime import datetime, timedelta
 import json
+import logging
 from typing import List
 import uuid
 
 from fastapi import HTTPException
+from postgrest.types import CountMethod, ReturnMethod
 from api.core.database import get_supabase
+from api.core.write_behind import write_behind
 from api.models.sessions import SessionCreate, SessionData
 from api.services.recommendation import RecommendationService
 
 supabase = get_supabase()
+logger = logging.getLogger(__name__)
 
 
 class SessionService:
@@ -52,30 +56,64 @@ class SessionService:
         return True
 
     async def refresh_session(session_id: str) -> datetime:
-        """Extend session validity by 7 days from now"""
+        """Extend session validity by 7 days from now (written behind the request)"""
         new_expiry = datetime.now() + timedelta(days=7)
-        supabase.from_("sessions") \
-            .update({
-                "expires_at": new_expiry,
-            }) \
-            .eq("id", session_id) \
-            .execute()
+        write_behind.enqueue_touch(
+            "sessions",
+            "expires_at",
+            session_id,
+            lambda: (datetime.now() + timedelta(days=7)).isoformat(),
+        )
         return new_expiry
 
-    async def cleanup_expired_sessions():
-        """Remove expired sessions and their associated data"""
-        expired = supabase.from_("sessions") \
-            .select("id") \
-            .lt("expires_at", datetime.now()) \
-            .execute()
-        
-        for session in expired.data:
-            # Delete session
-            supabase.from_("sessions") \
-                .delete() \
-                .eq("id", session["id"]) \
+    @staticmethod
+    async def cleanup_expired_sessions(chunk_size: int = 500, max_chunks: int = 20) -> int:
+        """
+        Remove expired sessions and their associated data in chunks.
+
+        Each chunk is one `in_` delete per table: pantry and grocery items first,
+        then the sessions themselves. A run stops after `max_chunks` chunks, or
+        as soon as a chunk deletes nothing (the same sessions would only be
+        selected again); what is left goes to the next run. Returns the total
+        number of rows deleted.
+        """
+        cutoff = datetime.now()
+        deleted = 0
+
+        for _ in range(max_chunks):
+            expired = supabase.from_("sessions") \
+                .select("id") \
+                .lt("expires_at", cutoff) \
+                .limit(chunk_size) \
                 .execute()
 
+            session_ids = [session["id"] for session in expired.data]
+            if not session_ids:
+                break
+
+            chunk_deleted = 0
+            for table, column in (
+                ("pantry_items", "session_id"),
+                ("grocery_items", "session_id"),
+                ("sessions", "id"),
+            ):
+                result = supabase.from_(table) \
+                    .delete(count=CountMethod.exact, returning=ReturnMethod.minimal) \
+                    .in_(column, session_ids) \
+                    .execute()
+                chunk_deleted += result.count or 0
+            deleted += chunk_deleted
+
+            if not chunk_deleted:
+                logger.warning(f"Deleted none of {len(session_ids)} expired sessions; stopping the purge")
+                break
+            if len(session_ids) < chunk_size:
+                break
+        else:
+            logger.info(f"Session purge stopped after {max_chunks} chunks; the rest goes to the next run")
+
+        return deleted
+
     async def get_session(self, session_id: str):
         res = supabase.from_("sessions").select("*").eq("id", session_id).execute()
         if not res.data:
@@ -0,0 +1,100 @@
+"""
+Cache warming: recompute the most requested searches and pantries before
+users ask for them, e.g. after a deploy or a cache purge.
+
+Candidates come from `query_stats` (request counts recorded by the routes),
+topped up with recently cached searches from `recipe_cache`. Each is
+recomputed by a small pool of lanes. A search with a fresh cache entry is
+only loaded into memory; the others are answered locally or crawled. A
+pantry gets its embedding and scored recommendations computed. That fills
+the DB cache for every worker, and the row and embedding caches of the
+worker running the job.
+"""
+import asyncio
+import logging
+from typing import List
+
+from api.core.admission import AdmissionRejected
+from api.core.cache import is_pantry_cache_key, peek_cached_recipes
+from api.core.database import get_supabase
+from api.core.query_stats import PANTRY, QUERY, QueryStats
+from api.core.text import canonical_query
+from api.services.recipe import RecipeService
+from api.services.recommendation import RecommendationService
+from api.settings import get_settings
+
+settings = get_settings()
+supabase = get_supabase()
+logger = logging.getLogger(__name__)
+
+
+def popular_queries(limit: int, days: float) -> List[str]:
+    """Most requested searches, topped up with the most recently cached ones"""
+    queries = {row["key"]: row["value"] for row in QueryStats.top(QUERY, limit, days)}
+    if len(queries) < limit:
+        rows = supabase.table("recipe_cache") \
+            .select("query") \
+            .order("expires_at", desc=True) \
+            .limit(limit * 4) \
+            .execute().data or []
+        for row in rows:
+            query = row.get("query") or ""
+            if query and not is_pantry_cache_key(query):
+                queries.setdefault(canonical_query(query), query)
+            if len(queries) >= limit:
+                break
+    return list(queries.values())[:limit]
+
+
+def popular_pantries(limit: int, days: float) -> List[List[str]]:
+    return [row["key"].split(",") for row in QueryStats.top(PANTRY, limit, days)]
+
+
+async def warm_query(query: str, lane: int) -> bool:
+    entry = peek_cached_recipes(query)
+    if entry is not None and not entry.stale:
+        recipes = entry.results
+    else:
+        recipes = await RecipeService.revalidate_query(query, session_id=f"cache-warming:{lane}")
+    # Load the result rows too, for the recipe pages users open next. Cached
+    # results are models; freshly stored ones are rows.
+    ids = [recipe["id"] if isinstance(recipe, dict) else recipe.id for recipe in recipes]
+    RecipeService.get_recipes_from_db(recipe_id for recipe_id in ids if recipe_id)
+    return bool(recipes)
+
+
+async def warm_pantry(pantry_items: List[str], lane: int) -> bool:
+    return bool(await RecommendationService.get_recommendations(pantry_items))
+
+
+async def warm_caches() -> int:
+    """Recompute popular searches and pantries; returns how many produced results"""
+    days = settings.CACHE_WARM_WINDOW_DAYS
+    queries, pantries = await asyncio.gather(
+        asyncio.to_thread(popular_queries, settings.CACHE_WARM_QUERIES, days),
+        asyncio.to_thread(popular_pantries, settings.CACHE_WARM_PANTRIES, days),
+    )
+    work: asyncio.Queue = asyncio.Queue()
+    for query in queries:
+        work.put_nowait((warm_query, query))
+    for pantry in pantries:
+        work.put_nowait((warm_pantry, pantry))
+
+    warmed = 0
+
+    async def lane(number: int) -> None:
+        nonlocal warmed
+        while not work.empty():
+            warm, key = work.get_nowait()
+            try:
+                produced = await warm(key, number)
+                warmed += produced
+            except AdmissionRejected:
+                # Users are crawling at capacity; this key waits for the next run
+                logger.info(f"Skipped warming {key!r}: crawl not admitted")
+            except Exception as e:
+                logger.warning(f"Could not warm {key!r}: {e}")
+
+    await asyncio.gather(*(lane(number) for number in range(max(1, settings.CACHE_WARM_CONCURRENCY))))
+    logger.info(f"Warmed {warmed} of {len(queries)} searches and {len(pantries)} pantries")
+    return warmed
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import List, Optional, Union
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings
@@ -17,6 +18,123 @@ class Settings(BaseSettings):
     BRIGHT_DATA_PROXY_USERNAME: str = os.getenv("BRIGHT_DATA_PROXY_USERNAME", "")
     BRIGHT_DATA_PROXY_PASSWORD: str = os.getenv("BRIGHT_DATA_PROXY_PASSWORD", "")
 
+    # Crawler target; point at a local fixture server and drop the proxy to run offline
+    CRAWLER_BASE_URL: str = "https://www.allrecipes.com"
+    CRAWLER_USE_PROXY: bool = True
+    CRAWLER_CONCURRENCY: int = 3
+
+    # Crawler page cache with conditional revalidation (see api/crawler/page_cache.py)
+    CRAWLER_PAGE_CACHE_ENABLED: bool = True
+    CRAWLER_PAGE_CACHE_DIR: str = "data/page_cache"
+    CRAWLER_PAGE_TTL_SEARCH: int = 3600  # seconds a page is used without revalidating
+    CRAWLER_PAGE_TTL_RECIPE: int = 86400
+    CRAWLER_PAGE_CACHE_MAX_AGE_DAYS: int = 30
+
+    # Persistent crawl frontier (see api/crawler/frontier.py)
+    CRAWLER_FRONTIER_PATH: str = "data/crawl_frontier.sqlite3"
+    CRAWLER_FRONTIER_LEASE: float = 600.0  # seconds before a URL claimed by a dead worker is crawled again
+    CRAWLER_FRONTIER_MAX_ATTEMPTS: int = 3
+    CRAWLER_FRONTIER_INTERVAL: int = 600
+    CRAWLER_FRONTIER_BATCH_SIZE: int = 10
+    CRAWLER_FRONTIER_RETENTION_DAYS: int = 30
+    CRAWLER_DISCOVERY_ENABLED: bool = False  # queue search results beyond the ones a search needed
+
+    # Per-host crawl politeness (see api/crawler/politeness.py)
+    CRAWLER_HOST_CONCURRENCY: int = 4
+    CRAWLER_HOST_MAX_CONCURRENCY: int = 8
+    CRAWLER_HOST_MIN_DELAY: float = 0.25  # seconds between request starts to one host
+    CRAWLER_HOST_MAX_DELAY: float = 10.0
+    CRAWLER_HOST_TARGET_LATENCY: float = 5.0  # slower page loads count as back-pressure
+
+    # Request deadlines (see api/core/deadline.py); clients may ask for less or more, up to the max
+    REQUEST_DEADLINE_SECONDS: float = 15.0
+    REQUEST_DEADLINE_MAX_SECONDS: float = 60.0
+    REQUEST_DEADLINE_RESERVE: float = 1.0  # kept back from the crawl for embedding and scoring
+    CRAWL_BACKGROUND_TIMEOUT: float = 180.0  # limit for a crawl the request stopped waiting for
+
+    # Admission control for request-triggered crawls (see api/core/admission.py)
+    ADMISSION_MAX_CRAWLS: int = 4
+    ADMISSION_PER_SESSION: int = 1  # running or waiting
+    ADMISSION_MAX_QUEUE: int = 16
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0
+    ADMISSION_ON_OVERLOAD: str = "degrade"  # degrade (serve stored recipes) | reject (429)
+
+    # Background maintenance (intervals in seconds)
+    MAINTENANCE_ENABLED: bool = True
+    MAINTENANCE_PURGE_CHUNK_SIZE: int = 500
+    MAINTENANCE_PURGE_MAX_CHUNKS: int = 20  # per run; the rest waits for the next one
+    SESSION_PURGE_INTERVAL: int = 3600
+    SESSION_SLIDING_EXPIRY: bool = False  # push expires_at out by 7 days on every authenticated request
+    CACHE_PURGE_INTERVAL: int = 3600
+    RECIPE_REFRESH_INTERVAL: int = 86400
+    RECIPE_REFRESH_DAYS_OLD: int = 7
+    RECIPE_REFRESH_BATCH_SIZE: int = 20
+
+    # Write-behind queue for non-critical writes
+    WRITE_BEHIND_MAX_BATCH: int = 200
+    WRITE_BEHIND_FLUSH_INTERVAL: float = 1.0
+
+    # Local similarity search over an mmap-shared embedding matrix (see api/core/vector_store.py)
+    LOCAL_VECTOR_SEARCH: bool = False
+    EMBEDDING_MATRIX_DIR: str = "data/embeddings"
+    EMBEDDING_MATRIX_CHECK_INTERVAL: float = 5.0
+    EMBEDDING_MATRIX_REBUILD_INTERVAL: int = 3600
+    EMBEDDING_SEARCH_PRECISION: str = "float32"  # float32 | float16 | int8 first pass
+    EMBEDDING_RESCORE_FACTOR: int = 4  # exact rescoring pool = k * factor
+    EMBEDDING_INDEX: str = "flat"  # flat | ivf candidate generation
+    EMBEDDING_IVF_LISTS: int = 0  # 0 = about 4 * sqrt(vectors)
+    EMBEDDING_IVF_PROBES: int = 16
+
+    # BM25 search over stored recipes before crawling (see api/core/text_index.py)
+    LOCAL_TEXT_SEARCH: bool = False
+    TEXT_INDEX_PATH: str = "data/text_index.json"
+    TEXT_INDEX_REBUILD_INTERVAL: int = 3600
+    TEXT_SEARCH_MIN_COVERAGE: float = 0.75  # share of the query's IDF weight a hit must match
+
+    # Query result cache (see api/core/cache.py); within the grace window an
+    # expired entry is served while a single background refresh runs
+    RECIPE_CACHE_TTL_HOURS: float = 24.0
+    RECIPE_CACHE_STALE_GRACE_HOURS: float = 24.0  # 0 = never serve expired entries
+
+    # In-process cache of recipe rows by id (see api/core/row_cache.py)
+    RECIPE_ROW_CACHE_SIZE: int = 10000
+    RECIPE_ROW_CACHE_TTL: float = 300.0  # bounds staleness from other workers' writes
+
+    # Cache warming from request stats (see api/services/warmup.py)
+    CACHE_WARM_ENABLED: bool = True
+    CACHE_WARM_INTERVAL: int = 3600
+    CACHE_WARM_QUERIES: int = 50
+    CACHE_WARM_PANTRIES: int = 20
+    CACHE_WARM_CONCURRENCY: int = 2
+    CACHE_WARM_WINDOW_DAYS: float = 7.0  # only keys requested this recently count
+    QUERY_STATS_FLUSH_INTERVAL: float = 30.0
+    EMBEDDING_CACHE_SIZE: int = 2048  # recently embedded texts kept in memory
+
+    # Reuse cached results for queries whose embeddings are this close (see api/core/semantic_cache.py)
+    SEMANTIC_QUERY_CACHE: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_REFRESH_INTERVAL: float = 30.0
+
+    # Shared OpenAI rate limits and retries (see api/core/openai_gateway.py)
+    OPENAI_REQUESTS_PER_MINUTE: int = 3000
+    OPENAI_TOKENS_PER_MINUTE: int = 1000000
+    OPENAI_MAX_CONCURRENCY: int = 16
+    OPENAI_MAX_RETRIES: int = 4
+
+    # On-disk LLM response cache (see api/core/llm.py)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: str = "data/llm_cache"
+    LLM_CACHE_TTL_DAYS: int = 30
+    LLM_HTML_MAX_CHARS: int = 6000  # page text sent to the ingredient-extraction fallback
+
+    # Per-request profiling (see api/core/profiling.py)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: str = os.getenv("PROFILING_SECRET", "")
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_CONCURRENT: int = 2
+    PROFILING_INTERVAL: float = 0.001
+
     ENVIRONMENT: Optional[str] = os.getenv("ENVIRONMENT", "development")
     DEBUG: bool = ENVIRONMENT == "development"
 
@@ -40,3 +158,9 @@ class Settings(BaseSettings):
         case_sensitive = True
         env_file = [".env", f".env.{os.getenv('ENVIRONMENT', 'development')}"]
         env_file_encoding = "utf-8"
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Settings are read (including the .env files) once per process"""
+    return Settings()
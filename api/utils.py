@@ -1,4 +1,7 @@
+import base64
+import json
 import re
+from typing import Any, List, Optional
 
 def parse_time_to_minutes(time_str: str) -> int:
     """Parse time strings like '15 mins', '1 hr 30 mins' to total minutes."""
@@ -21,3 +24,27 @@ def parse_time_to_minutes(time_str: str) -> int:
         minutes = int(min_match.group(1))
 
     return hours * 60 + minutes
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque, URL-safe keyset cursor from the sort-key values of the last row"""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Optional[int] = None) -> List[Any]:
+    """
+    Inverse of encode_cursor; raises ValueError on anything malformed,
+    including a cursor that does not hold exactly `keys` values when given.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    if keys is not None and len(values) != keys:
+        raise ValueError(f"Invalid cursor: expected {keys} keys, got {len(values)}")
+    return values
@@ -0,0 +1,218 @@
+"""
+Offline crawler benchmark against recorded (or synthetic) HTML fixtures.
+
+Serves a fixture directory locally (see benchmarks/crawler_fixtures.py),
+points `RecipeCrawler` at it with the proxy bypassed and runs every fixture
+query at each concurrency level:
+
+    python -m benchmarks.bench_crawler --concurrency 1 3 6 --page-latency-ms 150 \
+        --output crawl.json [--compare previous.json]
+
+Reports pages per second, time per recipe, peak browser RSS and extraction
+correctness against the golden `Recipe` fields. Without `--fixtures`, the
+checked-in set is used if present, otherwise a synthetic one is generated.
+Needs a Playwright Chromium (`playwright install chromium`).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from benchmarks import crawler_fixtures
+from benchmarks.harness import BackgroundServer, environment, free_port, write_report
+
+FIELDS = ("title", "prep_time", "cook_time", "image_url")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="fixture directory (default: checked-in set or synthetic)")
+    parser.add_argument("--recipes", type=int, default=30, help="synthetic fixture size when generating")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--max-recipes", type=int, default=10, help="recipes taken per search page")
+    parser.add_argument("--page-latency-ms", type=float, default=100.0, help="server delay per HTML page")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the queries per level")
+    parser.add_argument(
+        "--page-cache", action="store_true",
+        help="crawl through the page cache (empty at each level), so repeat passes show its savings",
+    )
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    return parser.parse_args()
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(c) for c in f.read().split()]
+    except OSError:
+        return []
+
+
+def browser_rss_bytes(root: Optional[int] = None) -> int:
+    """Resident memory of every descendant process (Playwright driver + Chromium); Linux only"""
+    total, stack = 0, list(_children(root or os.getpid()))
+    while stack:
+        pid = stack.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            continue
+        stack.extend(_children(pid))
+    return total
+
+
+async def sample_memory(peak: Dict[str, int], stop: asyncio.Event, interval: float = 0.1) -> None:
+    while not stop.is_set():
+        peak["rss"] = max(peak["rss"], browser_rss_bytes())
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def score_extraction(recipes, golden: Dict[str, Dict], origin: str, base_url: str) -> Dict[str, float]:
+    """Field accuracy and ingredient precision/recall of crawled recipes vs the golden set"""
+    fields = {name: 0 for name in FIELDS}
+    exact = matched_ingredients = crawled_ingredients = expected_ingredients = 0
+    found = 0
+
+    for recipe in recipes:
+        expected = golden.get(urlsplit(str(recipe.source_url)).path)
+        if expected is None:
+            continue
+        found += 1
+        actual = recipe.model_dump()
+        if actual.get("image_url"):
+            actual["image_url"] = actual["image_url"].replace(base_url, origin)
+        for name in FIELDS:
+            fields[name] += actual.get(name) == expected.get(name)
+
+        got = {(i["name"], i["unit"], i["quantity"]) for i in actual["ingredients"]}
+        want = {(i["name"], i["unit"], i["quantity"]) for i in expected["ingredients"]}
+        matched_ingredients += len(got & want)
+        crawled_ingredients += len(got)
+        expected_ingredients += len(want)
+        exact += all(actual.get(n) == expected.get(n) for n in FIELDS) and got == want
+
+    return {
+        "recipes_scored": found,
+        "exact_recipe_matches": exact,
+        "exact_match_rate": round(exact / found, 4) if found else 0.0,
+        "field_accuracy": {n: round(c / found, 4) if found else 0.0 for n, c in fields.items()},
+        "ingredient_precision": round(matched_ingredients / crawled_ingredients, 4) if crawled_ingredients else 0.0,
+        "ingredient_recall": round(matched_ingredients / expected_ingredients, 4) if expected_ingredients else 0.0,
+    }
+
+
+async def run_level(crawler, queries: List[str], max_recipes: int, repeat: int, hits: Dict[str, int]) -> Dict:
+    before = dict(hits)
+    peak = {"rss": 0}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_memory(peak, stop))
+
+    recipes, per_query = [], []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            query_start = time.perf_counter()
+            found = await crawler.crawl_recipes(query, max_recipes=max_recipes)
+            per_query.append(time.perf_counter() - query_start)
+            recipes.extend(found)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    from api.core.container import container
+
+    await container.close_browsers()
+
+    pages = sum(hits[k] - before[k] for k in ("search", "recipe"))
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "pages": pages,
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+        "recipes": len(recipes),
+        "s_per_recipe": round(elapsed / len(recipes), 3) if recipes else None,
+        "mean_s_per_query": round(sum(per_query) / len(per_query), 3) if per_query else None,
+        "peak_browser_rss_mib": round(peak["rss"] / 2**20, 1),
+        "missing_pages": hits["missing"] - before["missing"],
+    }, recipes
+
+
+def compare_crawl_reports(current: Dict, baseline_path: str) -> None:
+    import json
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'concurrency':<12} {'pages/s':>18} {'s/recipe':>18} {'exact match':>18}", file=sys.stderr)
+    for level, result in current["results"].items():
+        before = baseline.get("results", {}).get(level)
+        if not before:
+            continue
+        print(
+            f"{level:<12} {before['pages_per_sec']:>8}->{result['pages_per_sec']:<8} "
+            f"{before['s_per_recipe']}->{result['s_per_recipe']:<8} "
+            f"{before['correctness']['exact_match_rate']:>8}->{result['correctness']['exact_match_rate']:<8}",
+            file=sys.stderr,
+        )
+
+
+def main():
+    args = parse_args()
+    directory = args.fixtures
+    if not directory:
+        if os.path.exists(os.path.join(crawler_fixtures.DEFAULT_DIR, "manifest.json")):
+            directory = crawler_fixtures.DEFAULT_DIR
+        else:
+            directory = tempfile.mkdtemp(prefix="crawler-fixtures-")
+            crawler_fixtures.synthesize(directory, recipes=args.recipes, per_query=args.max_recipes)
+
+    app = crawler_fixtures.create_app(directory, args.page_latency_ms)
+    manifest, hits = app.state.manifest, app.state.hits
+    server = BackgroundServer(app, free_port()).start()
+
+    from api.crawler.recipe import RecipeCrawler
+
+    results = {}
+    try:
+        for level in args.concurrency:
+            crawler = RecipeCrawler(
+                base_url=server.url, use_proxy=False, concurrency=level, use_page_cache=args.page_cache
+            )
+            if args.page_cache:
+                from api.crawler.page_cache import page_cache
+
+                page_cache.directory = tempfile.mkdtemp(prefix="page-cache-")
+            stats, recipes = asyncio.run(
+                run_level(crawler, list(manifest["searches"]), args.max_recipes, args.repeat, hits)
+            )
+            stats["correctness"] = score_extraction(recipes, manifest["golden"], manifest["origin"], server.url)
+            results[str(level)] = stats
+    finally:
+        server.stop()
+
+    report = {
+        "meta": {
+            **environment(),
+            "fixtures": directory,
+            "queries": len(manifest["searches"]),
+            "recipe_pages": len(manifest["pages"]),
+            "page_latency_ms": args.page_latency_ms,
+            "max_recipes": args.max_recipes,
+            "page_cache": args.page_cache,
+        },
+        "results": results,
+    }
+    write_report(report, args.output)
+    if args.compare:
+        compare_crawl_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
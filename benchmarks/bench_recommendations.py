@@ -0,0 +1,162 @@
+"""
+Microbenchmarks for the scoring and recommendation hot paths.
+
+Runs fully offline against a synthetic corpus, the in-memory Supabase
+stand-in and fake embeddings:
+
+    python -m benchmarks.bench_recommendations --recipes 2000 --vocabulary 400 \
+        --pantry 25 --output bench.json [--compare previous.json]
+"""
+import argparse
+import asyncio
+import json
+from typing import List
+
+from benchmarks.corpus import CorpusConfig, FakeEmbedder, FakeOpenAI, generate_corpus, populate
+from benchmarks.fake_supabase import FakeStore, FakeSupabase
+from benchmarks.harness import (
+    compare_reports,
+    environment,
+    install_fakes,
+    measure,
+    peak_memory,
+    write_report,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=1000, help="synthetic corpus size")
+    parser.add_argument("--vocabulary", type=int, default=300, help="distinct ingredient names")
+    parser.add_argument("--pantry", type=int, default=20, help="pantry size")
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions per benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare throughput against")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = CorpusConfig(recipes=args.recipes, vocabulary=args.vocabulary, pantry_size=args.pantry, seed=args.seed)
+    corpus = generate_corpus(config)
+
+    embedder = FakeEmbedder()
+    store = FakeStore()
+    supabase = FakeSupabase(store)
+    openai_client = FakeOpenAI(embedder)
+    install_fakes(supabase, openai_client)
+    populate(store, corpus, embedder)
+
+    # Imported after the fakes are wired in
+    import numpy as np
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    import tempfile
+
+    from api.core.rec_engine import cosine_similarity, normalize_ingredient
+    from api.core.text_index import RecipeTextIndex, rebuild_text_index
+    from api.core.vector_store import SharedEmbeddingMatrix, rebuild_embedding_matrix
+    from api.models.schemas import Ingredient, Recipe, ScoredRecipe
+    from api.services.recipe import RecipeService
+    from api.services.recommendation import RecommendationService
+
+    recipes = store.rows("recipes")
+    sample = recipes[: min(200, len(recipes))]
+    ingredient_models = [Ingredient(**i) for r in sample for i in r["ingredients"]]
+    pantry = corpus.pantry
+    pantry_set = {normalize_ingredient(i) for i in pantry}
+    embeddings = {e["recipe_id"]: e["embedding"] for e in store.rows("recipe_embeddings")}
+    pantry_vector = embedder.embed(", ".join(pantry))
+    sample_vectors = [embeddings[r["id"]] for r in sample]
+    matrix = np.asarray([embeddings[r["id"]] for r in recipes], dtype=np.float32)
+    matrix_dir = tempfile.mkdtemp(prefix="bench-embeddings-")
+    rebuild_embedding_matrix(matrix_dir)
+    shared_matrix = SharedEmbeddingMatrix(matrix_dir)
+    text_index_path = f"{matrix_dir}/text_index.json"
+    rebuild_text_index(text_index_path)
+    text_index = RecipeTextIndex(text_index_path)
+    text_queries = [r["title"].split(" #")[0] for r in sample[:20]]
+    rpc_params = {"query_embedding": pantry_vector, "match_threshold": 0.0, "match_count": 50}
+    loop = asyncio.new_event_loop()
+
+    def run(coro_fn):
+        return lambda: loop.run_until_complete(coro_fn())
+
+    async def score_all(use_embeddings: bool):
+        # Prefetched in one query, the way get_recommendations scores its candidates
+        embeddings = RecipeService.get_recipe_embeddings(r["id"] for r in sample) if use_embeddings else None
+        for recipe in sample:
+            await RecipeService.score_recipe(pantry, recipe, use_embeddings=use_embeddings, embeddings=embeddings)
+
+    def score_plain():
+        return score_all(False)
+
+    def score_embedded():
+        return score_all(True)
+
+    def recommend():
+        return RecommendationService.get_recommendations(pantry, {})
+
+    # A fixed-size response so serialization numbers are comparable across runs
+    scored = [
+        ScoredRecipe(**r, score=0.5, missing_ingredients=[i["name"] for i in r["ingredients"][:3]],
+                     match_percentage=50.0, exact_matches=1, fuzzy_matches=0, embedding_similarity=0.8)
+        for r in sample[:50]
+    ]
+    recipe_list = TypeAdapter(List[Recipe])
+
+    benchmarks = {
+        "normalize_ingredient": (
+            lambda: [normalize_ingredient(i) for i in ingredient_models], len(ingredient_models),
+        ),
+        "fuzzy_match_ingredients": (
+            lambda: [RecipeService.match_ingredients(pantry_set, r["ingredients"]) for r in sample], len(sample),
+        ),
+        "cosine_similarity_pairwise": (
+            lambda: [cosine_similarity(pantry_vector, v) for v in sample_vectors], len(sample_vectors),
+        ),
+        "cosine_similarity_matrix": (
+            lambda: matrix @ np.asarray(pantry_vector, dtype=np.float32)
+            / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(pantry_vector)),
+            len(recipes),
+        ),
+        "vector_search_rpc": (lambda: supabase.rpc("vector_search", rpc_params).execute(), 1),
+        "vector_search_mmap": (lambda: shared_matrix.search(pantry_vector, k=50), 1),
+        "text_search_bm25": (lambda: [text_index.search(q, 10) for q in text_queries], len(text_queries)),
+        "score_recipe": (run(score_plain), len(sample)),
+        "score_recipe_with_embeddings": (run(score_embedded), len(sample)),
+        "get_recommendations": (run(recommend), 1),
+        "serialize_response_pydantic": (lambda: recipe_list.dump_json(scored), len(scored)),
+        "serialize_response_jsonable_encoder": (lambda: json.dumps(jsonable_encoder(scored)), len(scored)),
+    }
+
+    results = {}
+    for name, (fn, ops) in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        store.round_trips = 0
+        repeat = max(3, args.repeat // 4) if name in ("get_recommendations", "score_recipe_with_embeddings") else args.repeat
+        stats = measure(fn, repeat=repeat, warmup=2, ops_per_call=ops)
+        stats["db_round_trips_per_call"] = round(store.round_trips / (repeat + 2), 2)
+        stats.update(peak_memory(fn))
+        results[name] = stats
+
+    loop.close()
+    report = {
+        "meta": {
+            **environment(),
+            "corpus": {"recipes": config.recipes, "vocabulary": config.vocabulary, "pantry": config.pantry_size, "seed": config.seed},
+            "fake_openai_calls": openai_client.calls,
+        },
+        "results": results,
+    }
+    write_report(report, args.output)
+    if args.compare:
+        compare_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
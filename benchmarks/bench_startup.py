@@ -0,0 +1,149 @@
+"""
+Cold-start benchmark: import time, lifespan startup, first request and fork.
+
+Every sample runs in a fresh interpreter so nothing is warm except the OS
+page cache:
+
+    python -m benchmarks.bench_startup --runs 10 --output startup.json [--compare previous.json]
+
+Reports wall time to `import api.main`, to finish the lifespan startup and to
+serve the first request, peak RSS, how many modules were loaded (and whether
+Playwright / OpenAI / Supabase were among them), the time for a forked
+worker to rebuild its clients, and the slowest imports from `-X importtime`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.harness import environment, write_report
+
+HEAVY_MODULES = ("playwright", "openai", "supabase", "numpy", "rapidfuzz")
+
+CHILD = r"""
+import json, os, resource, sys, time
+start = time.perf_counter()
+import api.main
+imported = time.perf_counter()
+loaded = {m: m in sys.modules for m in HEAVY}
+modules = len(sys.modules)
+
+import asyncio
+from fastapi.testclient import TestClient
+from api.core.container import container
+
+client = TestClient(api.main.app)
+client.__enter__()
+started = time.perf_counter()
+client.get("/")
+served = time.perf_counter()
+
+read_fd, write_fd = os.pipe()
+fork_start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    container.supabase
+    container.openai
+    os.write(write_fd, str(time.perf_counter() - fork_start).encode())
+    os._exit(0)
+fork_s = float(os.read(read_fd, 64).decode())
+os.waitpid(pid, 0)
+client.__exit__(None, None, None)
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "lifespan_startup_ms": (started - imported) * 1000,
+    "first_request_ms": (served - started) * 1000,
+    "ready_ms": (served - start) * 1000,
+    "fork_rebuild_ms": fork_s * 1000,
+    "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": modules,
+    "loaded_at_import": loaded,
+}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters to sample")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    return parser.parse_args()
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("MAINTENANCE_ENABLED", "false")
+    env["PYTHONDONTWRITEBYTECODE"] = "0"
+    return env
+
+
+def sample() -> Dict:
+    code = f"HEAVY = {HEAVY_MODULES!r}\n{CHILD}"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=child_env(), check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> List[Dict]:
+    """Cumulative import time per module, from `python -X importtime`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"],
+        capture_output=True, text=True, env=child_env(), check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [p.strip() for p in line.replace("import time:", "|").split("|")]
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top]
+
+
+def summarize_runs(runs: List[Dict]) -> Dict:
+    summary = {}
+    for key in ("import_ms", "lifespan_startup_ms", "first_request_ms", "ready_ms", "fork_rebuild_ms", "peak_rss_mib"):
+        values = [r[key] for r in runs]
+        summary[key] = {
+            "median": round(statistics.median(values), 2),
+            "min": round(min(values), 2),
+            "max": round(max(values), 2),
+        }
+    summary["modules"] = runs[-1]["modules"]
+    summary["loaded_at_import"] = runs[-1]["loaded_at_import"]
+    return summary
+
+
+def compare_startup_reports(current: Dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'metric':<22} {'baseline':>12} {'current':>12} {'change':>8}", file=sys.stderr)
+    for key, value in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not isinstance(value, dict) or not isinstance(before, dict) or "median" not in value:
+            continue
+        old, new = before["median"], value["median"]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{key:<22} {old:>12.1f} {new:>12.1f} {change:>+7.1f}%", file=sys.stderr)
+
+
+def main():
+    args = parse_args()
+    runs = [sample() for _ in range(args.runs)]
+    report = {
+        "meta": {**environment(), "runs": args.runs},
+        "results": summarize_runs(runs),
+        "slowest_imports": slowest_imports(args.top),
+    }
+    write_report(report, args.output)
+    if args.compare:
+        compare_startup_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
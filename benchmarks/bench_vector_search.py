@@ -0,0 +1,174 @@
+"""
+Recall / latency benchmark for the local embedding search.
+
+Publishes a synthetic, clustered embedding matrix (real embeddings are far
+from uniform, so uniform random vectors would flatter approximate search)
+into a temporary generation directory and compares every search variant
+against exact float32 search:
+
+    python -m benchmarks.bench_vector_search --vectors 50000 --dim 1536 \
+        --queries 200 --k 50 --output vectors.json [--compare previous.json]
+
+Each variant reports recall@k against the exact top-k, p50/p99 latency and
+the bytes per vector its first pass streams. A second generation is built
+with an IVF index (`--lists`, default about 4 * sqrt(n)) and searched at
+every `--probes` setting, with an exact and an int8 first pass over the
+probed lists.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.harness import environment, summarize, write_report
+
+Search = Callable[[np.ndarray], List[Tuple[str, float]]]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000, help="matrix rows")
+    parser.add_argument("--dim", type=int, default=1536, help="embedding dimension")
+    parser.add_argument("--clusters", type=int, default=64, help="topics the synthetic vectors gather around")
+    parser.add_argument("--queries", type=int, default=100, help="timed queries per variant")
+    parser.add_argument("--k", type=int, default=50, help="results per query (match_count)")
+    parser.add_argument("--rescore", type=int, nargs="*", default=[1, 2, 4, 8], help="rescore factors to try")
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (0 = about 4 * sqrt(vectors))")
+    parser.add_argument("--probes", type=int, nargs="*", default=[1, 4, 8, 16, 32, 64], help="IVF probe counts to try")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    return parser.parse_args()
+
+
+def clustered_vectors(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=n)
+    return centers[assignment] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def recall(found: Sequence[Tuple[str, float]], truth: Sequence[Tuple[str, float]]) -> float:
+    expected = {recipe_id for recipe_id, _ in truth}
+    return len(expected & {recipe_id for recipe_id, _ in found}) / len(expected) if expected else 1.0
+
+
+def run_variant(search: Search, queries: np.ndarray, truth: List[List[Tuple[str, float]]]) -> Dict:
+    search(queries[0])  # warm the mapping and page cache
+    samples, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        samples.append(time.perf_counter() - start)
+        recalls.append(recall(found, expected))
+    result = summarize(samples)
+    result["recall"] = round(float(np.mean(recalls)), 4)
+    result["min_recall"] = round(float(np.min(recalls)), 4)
+    return result
+
+
+def variants(matrix, k: int, rescore_factors: Sequence[int]) -> Dict[str, Tuple[Search, float]]:
+    """name -> (search function, bytes per vector scanned in the first pass)"""
+    dim = matrix.stats()["dim"]
+    found = {"float32_exact": (lambda q: matrix.search(q, k, -1.0, precision="float32", probes=0), 4 * dim)}
+    for precision, width in (("float16", 2 * dim), ("int8", dim + 4)):
+        for factor in rescore_factors:
+            found[f"{precision}_rescore{factor}"] = (
+                lambda q, p=precision, f=factor: matrix.search(q, k, -1.0, precision=p, rescore_factor=f, probes=0),
+                width,
+            )
+    return found
+
+
+def ivf_variants(matrix, k: int, probe_counts: Sequence[int]) -> Dict[str, Tuple[Search, float]]:
+    """IVF searches; bytes per vector are averaged over the whole matrix (the fraction probed)"""
+    stats = matrix.stats()
+    dim, lists = stats["dim"], stats["ivf_lists"]
+    found = {}
+    for probes in probe_counts:
+        if probes > lists:
+            continue
+        share = probes / lists
+        found[f"ivf_p{probes}"] = (
+            lambda q, n=probes: matrix.search(q, k, -1.0, precision="float32", probes=n),
+            round(4 * dim * share, 1),
+        )
+        found[f"ivf_p{probes}_int8"] = (
+            lambda q, n=probes: matrix.search(q, k, -1.0, precision="int8", rescore_factor=2, probes=n),
+            round((dim + 4) * share, 1),
+        )
+    return found
+
+
+def compare_vector_reports(current: Dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'variant':<22} {'p50 before':>11} {'p50 now':>9} {'recall before':>14} {'recall now':>11}", file=sys.stderr)
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        print(
+            f"{name:<22} {before['p50_us']:>11.0f} {result['p50_us']:>9.0f}"
+            f" {before['recall']:>14.4f} {result['recall']:>11.4f}",
+            file=sys.stderr,
+        )
+
+
+def main():
+    args = parse_args()
+    from api.core.ann_index import default_lists
+    from api.core.vector_store import SharedEmbeddingMatrix, publish_generation
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.vectors, args.dim, args.clusters, rng)
+    ids = [f"recipe-{i}" for i in range(args.vectors)]
+    queries = vectors[rng.integers(0, args.vectors, size=args.queries)] \
+        + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    root = tempfile.mkdtemp(prefix="bench-vectors-")
+    start = time.perf_counter()
+    publish_generation(root, ids, vectors)
+    publish_s = time.perf_counter() - start
+
+    lists = args.lists or default_lists(args.vectors)
+    ivf_root = tempfile.mkdtemp(prefix="bench-vectors-ivf-")
+    start = time.perf_counter()
+    publish_generation(ivf_root, ids, vectors, ivf_lists=lists)
+    ivf_build_s = time.perf_counter() - start
+    del vectors
+
+    matrix = SharedEmbeddingMatrix(root)
+    ivf_matrix = SharedEmbeddingMatrix(ivf_root)
+    truth = [matrix.search(q, args.k, -1.0, precision="float32") for q in queries]
+
+    results = {}
+    candidates = {**variants(matrix, args.k, args.rescore), **ivf_variants(ivf_matrix, args.k, args.probes)}
+    for name, (search, bytes_per_vector) in candidates.items():
+        results[name] = {**run_variant(search, queries, truth), "bytes_per_vector": bytes_per_vector}
+        print(f"{name:<22} recall={results[name]['recall']:.4f} p50={results[name]['p50_us']:.0f}us", file=sys.stderr)
+
+    report = {
+        "meta": {
+            **environment(),
+            "vectors": args.vectors,
+            "dim": args.dim,
+            "clusters": args.clusters,
+            "queries": args.queries,
+            "k": args.k,
+            "publish_s": round(publish_s, 3),
+            "ivf_lists": lists,
+            "ivf_publish_s": round(ivf_build_s, 3),
+        },
+        "results": results,
+    }
+    write_report(report, args.output)
+    if args.compare:
+        compare_vector_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Synthetic recipe / pantry corpus and deterministic fake embeddings.
+
+Nothing here touches the network: embeddings are built from hashed token
+vectors, so texts sharing ingredients land close together in the same way
+real embeddings would, and identical inputs always embed identically.
+"""
+import hashlib
+import random
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BASE_INGREDIENTS = [
+    "chicken breast", "chicken thigh", "ground beef", "pork chop", "bacon", "salmon",
+    "shrimp", "tofu", "egg", "milk", "butter", "heavy cream", "cheddar cheese",
+    "parmesan cheese", "mozzarella", "greek yogurt", "sour cream", "all-purpose flour",
+    "sugar", "brown sugar", "honey", "maple syrup", "olive oil", "vegetable oil",
+    "sesame oil", "soy sauce", "fish sauce", "rice vinegar", "balsamic vinegar",
+    "lemon juice", "lime juice", "garlic", "onion", "red onion", "shallot", "ginger",
+    "scallion", "carrot", "celery", "bell pepper", "jalapeno", "tomato",
+    "cherry tomatoes", "tomato paste", "potato", "sweet potato", "spinach", "kale",
+    "broccoli", "cauliflower", "zucchini", "mushroom", "corn", "peas", "green beans",
+    "black beans", "chickpeas", "lentils", "rice", "basmati rice", "pasta",
+    "spaghetti", "penne", "egg noodles", "bread crumbs", "tortilla", "basil",
+    "parsley", "cilantro", "thyme", "rosemary", "oregano", "cumin", "paprika",
+    "chili powder", "turmeric", "cinnamon", "nutmeg", "black pepper", "salt",
+    "bay leaf", "chicken broth", "beef broth", "coconut milk", "peanut butter",
+    "almonds", "walnuts", "avocado", "lemon", "lime", "apple", "banana",
+    "blueberries", "strawberries", "vanilla extract", "baking powder", "baking soda",
+    "dark chocolate", "cocoa powder", "mayonnaise", "dijon mustard", "ketchup",
+]
+MODIFIERS = ["", "", "", "fresh ", "dried ", "chopped "]
+UNITS = ["", "cup", "cups", "tbsp", "tsp", "g", "oz", "lb", "clove", "can"]
+QUANTITIES = ["1", "2", "3", "1/2", "1 1/2", "1/4", "4", "½", "200", "1-2"]
+CUISINES = ["Italian", "Mexican", "Chinese", "Indian", "American", "Mediterranean", "Japanese", "Thai", "French"]
+DISHES = ["soup", "stew", "salad", "curry", "stir fry", "bake", "pasta", "tacos", "bowl", "roast"]
+
+
+@dataclass
+class CorpusConfig:
+    recipes: int = 1000
+    vocabulary: int = 300
+    pantry_size: int = 20
+    min_ingredients: int = 5
+    max_ingredients: int = 14
+    seed: int = 42
+
+
+@dataclass
+class Corpus:
+    config: CorpusConfig
+    vocabulary: List[str]
+    recipes: List[Dict]
+    pantry: List[str]
+    queries: List[str] = field(default_factory=list)
+
+
+def build_vocabulary(size: int) -> List[str]:
+    vocab = list(BASE_INGREDIENTS[:size])
+    index = 0
+    while len(vocab) < size:
+        vocab.append(f"{BASE_INGREDIENTS[index % len(BASE_INGREDIENTS)]} variety {index // len(BASE_INGREDIENTS) + 1}")
+        index += 1
+    return vocab
+
+
+def generate_corpus(config: Optional[CorpusConfig] = None) -> Corpus:
+    """Recipes draw ingredients with Zipf-like popularity, like real corpora"""
+    config = config or CorpusConfig()
+    rng = random.Random(config.seed)
+    vocab = build_vocabulary(config.vocabulary)
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(vocab))]
+
+    recipes = []
+    for index in range(config.recipes):
+        count = rng.randint(config.min_ingredients, config.max_ingredients)
+        names = set()
+        while len(names) < min(count, len(vocab)):
+            names.add(rng.choices(vocab, weights)[0])
+        names = sorted(names)
+        ingredients = [
+            {
+                "name": rng.choice(MODIFIERS) + name,
+                "unit": rng.choice(UNITS),
+                "quantity": rng.choice(QUANTITIES),
+            }
+            for name in names
+        ]
+        cuisine = rng.choice(CUISINES)
+        recipes.append({
+            "title": f"{cuisine} {names[0]} {rng.choice(DISHES)} #{index}",
+            "ingredients": ingredients,
+            "prep_time": f"{rng.randint(5, 40)} mins",
+            "cook_time": rng.choice(["", f"{rng.randint(10, 50)} mins", f"1 hr {rng.randint(0, 45)} mins"]),
+            "image_url": f"https://img.example.com/{index}.jpg",
+            "source_url": f"https://recipes.example.com/recipe/{index}/",
+            "source": "synthetic",
+            "cuisine": cuisine,
+        })
+
+    pantry = sorted({rng.choices(vocab, weights)[0] for _ in range(config.pantry_size * 3)})[: config.pantry_size]
+    queries = [f"{rng.choice(vocab)} {rng.choice(DISHES)}" for _ in range(50)]
+    return Corpus(config=config, vocabulary=vocab, recipes=recipes, pantry=pantry, queries=queries)
+
+
+class FakeEmbedder:
+    """Bag-of-tokens embeddings: each token maps to a fixed random unit vector"""
+
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+        self._tokens: Dict[str, np.ndarray] = {}
+
+    def _token(self, token: str) -> np.ndarray:
+        vector = self._tokens.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.sha1(token.encode()).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            self._tokens[token] = vector
+        return vector
+
+    def embed(self, text: str) -> List[float]:
+        tokens = [t for t in text.lower().replace(",", " ").split() if t.isalpha()]
+        if not tokens:
+            tokens = ["<empty>"]
+        vector = np.sum([self._token(t) for t in tokens], axis=0)
+        return (vector / (np.linalg.norm(vector) + 1e-12)).tolist()
+
+
+class FakeOpenAI:
+    """Stands in for `openai.OpenAI` for embeddings and chat completions"""
+
+    def __init__(self, embedder: Optional[FakeEmbedder] = None, cuisine: str = "Italian"):
+        self.embedder = embedder or FakeEmbedder()
+        self.cuisine = cuisine
+        self.calls = {"embeddings": 0, "chat": 0}
+        self.embeddings = SimpleNamespace(create=self._embeddings)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _embeddings(self, input, model=None, **_):
+        self.calls["embeddings"] += 1
+        texts = input if isinstance(input, list) else [input]
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=self.embedder.embed(text), index=i) for i, text in enumerate(texts)
+        ])
+
+    def _chat(self, model=None, messages=None, **_):
+        self.calls["chat"] += 1
+        content = '{"ingredients": []}' if _.get("response_format") else self.cuisine
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def populate(store, corpus: Corpus, embedder: FakeEmbedder, session_id: str = "bench-session") -> None:
+    """Load the corpus, its embeddings, one session and its pantry into a FakeStore"""
+    from datetime import datetime, timedelta, timezone
+
+    from api.core.quantization import pack_int8
+
+    recipes = store.insert("recipes", corpus.recipes)
+    rows = []
+    for recipe in recipes:
+        embedding = embedder.embed(f"{recipe['title']} " + ", ".join(i["name"] for i in recipe["ingredients"]))
+        rows.append({
+            "recipe_id": recipe["id"],
+            "embedding": embedding,
+            "embedding_q8": pack_int8(embedding),
+            "ingredients_text": ", ".join(i["name"] for i in recipe["ingredients"]),
+        })
+    store.insert("recipe_embeddings", rows)
+    store.insert("sessions", {
+        "id": session_id,
+        "session_data": {"pantry_items": corpus.pantry},
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
+    })
+    store.insert("pantry_items", [
+        {
+            "session_id": session_id,
+            "ingredient": {"name": name, "unit": "", "quantity": ""},
+            "normalized_name": name,
+            "expiry_date": None,
+        }
+        for name in corpus.pantry
+    ])
+    store.round_trips = 0
@@ -0,0 +1,274 @@
+"""
+Recorded crawler fixtures and the local HTTP server that replays them.
+
+A fixture directory holds `manifest.json` plus the HTML it points at:
+
+    {
+      "origin": "https://www.allrecipes.com",
+      "searches": {"chicken soup": "search/chicken-soup.html"},
+      "pages": {"/recipe/123/slug/": "recipes/recipe-123-slug.html"},
+      "golden": {"/recipe/123/slug/": {"title": ..., "ingredients": [...], ...}}
+    }
+
+`record` captures live pages through the crawler's own browser and proxy and
+takes the golden `Recipe` fields from the crawler's extraction at record
+time (review them by hand before trusting them). `synthesize` renders
+allrecipes-style markup from the synthetic corpus so a fixture set exists
+without network access. The server rewrites `origin` to its own URL, so
+absolute links in recorded pages stay on the local host.
+
+    python -m benchmarks.crawler_fixtures record --query "chicken soup" --query "beef stew" \
+        --max-recipes 10 --out benchmarks/fixtures/crawler
+    python -m benchmarks.crawler_fixtures synthesize --recipes 40 --out /tmp/crawler-fixtures
+    python -m benchmarks.crawler_fixtures serve --fixtures benchmarks/fixtures/crawler --port 8900
+"""
+import argparse
+import asyncio
+import html
+import json
+import os
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+from starlette.routing import Route
+
+from benchmarks.corpus import CorpusConfig, generate_corpus
+
+DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "crawler")
+SYNTHETIC_ORIGIN = "https://recipes.invalid"
+# 1x1 transparent GIF so image requests resolve without touching the network
+PIXEL = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00"
+    b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+SCRIPT_TAG = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "index"
+
+
+def load_manifest(directory: str) -> Dict:
+    with open(os.path.join(directory, "manifest.json")) as f:
+        return json.load(f)
+
+
+def write_manifest(directory: str, manifest: Dict) -> None:
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _write_page(directory: str, relative: str, content: str) -> None:
+    path = os.path.join(directory, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+# --- synthetic pages ------------------------------------------------------------
+
+def render_search_page(query: str, links: List[str]) -> str:
+    cards = "\n".join(
+        f'<a class="card" href="{html.escape(link)}"><span class="card__title">Recipe {i}</span></a>'
+        for i, link in enumerate(links)
+    )
+    return f"<!doctype html><html><head><title>{html.escape(query)}</title></head><body>\n{cards}\n</body></html>"
+
+
+def render_recipe_page(recipe: Dict) -> str:
+    details = "".join(
+        f'<div class="mm-recipes-details__item"><div class="mm-recipes-details__label">{label}:</div>'
+        f'<div class="mm-recipes-details__value">{html.escape(value)}</div></div>'
+        for label, value in (("Prep Time", recipe["prep_time"]), ("Cook Time", recipe["cook_time"]))
+        if value
+    )
+    ingredients = "".join(
+        '<li class="mm-recipes-structured-ingredients__list-item"><p>'
+        f'<span data-ingredient-quantity="true">{html.escape(i["quantity"])}</span> '
+        f'<span data-ingredient-unit="true">{html.escape(i["unit"])}</span> '
+        f'<span data-ingredient-name="true">{html.escape(i["name"])}</span></p></li>'
+        for i in recipe["ingredients"]
+    )
+    return (
+        f"<!doctype html><html><head><title>{html.escape(recipe['title'])}</title></head><body>"
+        f'<h1 class="article-heading">{html.escape(recipe["title"])}</h1>'
+        f'<img class="primary-image__image" src="{html.escape(recipe["image_url"])}">'
+        f'<div class="mm-recipes-details">{details}</div>'
+        f'<ul class="mm-recipes-structured-ingredients__list">{ingredients}</ul>'
+        "</body></html>"
+    )
+
+
+def synthesize(directory: str, recipes: int = 40, per_query: int = 10, seed: int = 42) -> Dict:
+    """Render a fixture set from the synthetic corpus; golden values are exact by construction"""
+    corpus = generate_corpus(CorpusConfig(recipes=recipes, seed=seed))
+    manifest = {"origin": SYNTHETIC_ORIGIN, "searches": {}, "pages": {}, "golden": {}}
+
+    paths = []
+    for index, recipe in enumerate(corpus.recipes):
+        path = f"/recipe/{index}/{slugify(recipe['title'])}/"
+        page = {
+            "title": recipe["title"],
+            "prep_time": recipe["prep_time"] or None,
+            "cook_time": recipe["cook_time"] or None,
+            "ingredients": recipe["ingredients"],
+            "image_url": f"/img/{index}.gif",
+        }
+        relative = f"recipes/{slugify(path)}.html"
+        _write_page(directory, relative, render_recipe_page(page))
+        manifest["pages"][path] = relative
+        manifest["golden"][path] = page
+        paths.append(path)
+
+    for start in range(0, len(paths), per_query):
+        query = corpus.queries[start // per_query % len(corpus.queries)]
+        if query in manifest["searches"]:
+            query = f"{query} {start // per_query}"
+        relative = f"search/{slugify(query)}.html"
+        _write_page(directory, relative, render_search_page(query, paths[start:start + per_query]))
+        manifest["searches"][query] = relative
+
+    write_manifest(directory, manifest)
+    return manifest
+
+
+# --- recording ------------------------------------------------------------------
+
+async def record(directory: str, queries: List[str], max_recipes: int = 10) -> Dict:
+    """Capture live search and recipe pages plus the crawler's extraction of each"""
+    from api.core.container import container
+    from api.crawler.recipe import RecipeCrawler
+
+    crawler = RecipeCrawler()
+    manifest = {"origin": crawler.base_url, "searches": {}, "pages": {}, "golden": {}}
+
+    browser = await crawler._launch_browser()
+    context = await browser.new_context(ignore_https_errors=True)
+    page = await context.new_page()
+    try:
+        for query in queries:
+            await page.goto(crawler._build_search_url(query), timeout=60000, wait_until="load")
+            selector = await crawler._determine_card_selector(page)
+            urls = await crawler._extract_recipe_urls(page, selector, max_recipes)
+            relative = f"search/{slugify(query)}.html"
+            _write_page(directory, relative, SCRIPT_TAG.sub("", await page.content()))
+            manifest["searches"][query] = relative
+
+            for url in urls:
+                path = urlsplit(url).path
+                if path in manifest["pages"]:
+                    continue
+                await page.goto(url, timeout=60000, wait_until="load")
+                prep_time, cook_time = await crawler._get_times(page)
+                relative = f"recipes/{slugify(path)}.html"
+                _write_page(directory, relative, SCRIPT_TAG.sub("", await page.content()))
+                manifest["pages"][path] = relative
+                manifest["golden"][path] = {
+                    "title": await crawler._get_title(page),
+                    "prep_time": prep_time,
+                    "cook_time": cook_time,
+                    "ingredients": [i.model_dump() for i in await crawler._get_ingredients(page)],
+                    "image_url": await crawler._get_image_url(page),
+                }
+    finally:
+        await container.close_browsers()
+
+    write_manifest(directory, manifest)
+    return manifest
+
+
+# --- replay server --------------------------------------------------------------
+
+def create_app(directory: str, latency_ms: float = 0.0) -> Starlette:
+    """Serve a fixture directory; unknown pages are 404s, images a 1x1 GIF"""
+    manifest = load_manifest(directory)
+    origin = manifest["origin"].rstrip("/")
+    cache: Dict[str, str] = {}
+    hits = {"search": 0, "recipe": 0, "image": 0, "missing": 0}
+
+    def read(relative: str) -> str:
+        if relative not in cache:
+            with open(os.path.join(directory, relative)) as f:
+                cache[relative] = f.read()
+        return cache[relative]
+
+    def rewrite(request: Request, content: str) -> str:
+        return content.replace(origin, str(request.base_url).rstrip("/"))
+
+    async def pause():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    async def search(request: Request) -> Response:
+        await pause()
+        relative = manifest["searches"].get(request.query_params.get("q", ""))
+        if not relative:
+            hits["missing"] += 1
+            return HTMLResponse("<html><body>No results</body></html>", status_code=404)
+        hits["search"] += 1
+        return HTMLResponse(rewrite(request, read(relative)))
+
+    async def page(request: Request) -> Response:
+        path = request.url.path
+        if path.startswith("/img/") or path.endswith((".jpg", ".jpeg", ".png", ".gif", ".webp")):
+            hits["image"] += 1
+            return Response(PIXEL, media_type="image/gif")
+        await pause()
+        relative = manifest["pages"].get(path) or manifest["pages"].get(path.rstrip("/") + "/")
+        if not relative:
+            hits["missing"] += 1
+            return Response(status_code=404)
+        hits["recipe"] += 1
+        return HTMLResponse(rewrite(request, read(relative)))
+
+    app = Starlette(routes=[
+        Route("/search", search),
+        Route("/{path:path}", page),
+    ])
+    app.state.manifest = manifest
+    app.state.hits = hits
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="capture live pages (needs the crawler proxy)")
+    rec.add_argument("--query", action="append", required=True)
+    rec.add_argument("--max-recipes", type=int, default=10)
+    rec.add_argument("--out", default=DEFAULT_DIR)
+
+    syn = commands.add_parser("synthesize", help="render fixtures from the synthetic corpus")
+    syn.add_argument("--recipes", type=int, default=40)
+    syn.add_argument("--per-query", type=int, default=10)
+    syn.add_argument("--seed", type=int, default=42)
+    syn.add_argument("--out", default=DEFAULT_DIR)
+
+    serve = commands.add_parser("serve", help="replay a fixture directory over HTTP")
+    serve.add_argument("--fixtures", default=DEFAULT_DIR)
+    serve.add_argument("--port", type=int, default=8900)
+    serve.add_argument("--latency-ms", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "record":
+        manifest = asyncio.run(record(args.out, args.query, args.max_recipes))
+        print(f"recorded {len(manifest['searches'])} searches, {len(manifest['pages'])} recipe pages to {args.out}")
+    elif args.command == "synthesize":
+        manifest = synthesize(args.out, args.recipes, args.per_query, args.seed)
+        print(f"wrote {len(manifest['searches'])} searches, {len(manifest['pages'])} recipe pages to {args.out}")
+    else:
+        import uvicorn
+
+        uvicorn.run(create_app(args.fixtures, args.latency_ms), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+OpenAI-compatible HTTP stand-in for `/v1/embeddings` and `/v1/chat/completions`.
+
+Embeddings come from the deterministic FakeEmbedder; every response waits a
+configurable latency (plus uniform jitter) so load tests see realistic
+upstream stalls without spending tokens. Point the app at it with
+OPENAI_BASE_URL=http://host:port/v1.
+"""
+import asyncio
+import base64
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.corpus import FakeEmbedder
+
+
+@dataclass
+class LatencyProfile:
+    embedding_ms: float = 40.0
+    chat_ms: float = 400.0
+    jitter: float = 0.25  # +/- fraction of the base latency
+    seed: Optional[int] = None
+    _rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def delay(self, base_ms: float) -> float:
+        spread = base_ms * self.jitter
+        return max(0.0, base_ms + self._rng.uniform(-spread, spread)) / 1000
+
+
+def encode_embedding(vector, encoding_format: Optional[str]):
+    """The SDK asks for base64 (little-endian float32) by default; plain lists otherwise"""
+    if encoding_format == "base64":
+        return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+    return list(vector)
+
+
+def create_app(
+    embedder: Optional[FakeEmbedder] = None,
+    latency: Optional[LatencyProfile] = None,
+    cuisine: str = "Italian",
+) -> Starlette:
+    embedder = embedder or FakeEmbedder()
+    latency = latency or LatencyProfile()
+    calls: Dict[str, int] = {"embeddings": 0, "chat": 0}
+
+    async def embeddings(request: Request) -> JSONResponse:
+        body = await request.json()
+        calls["embeddings"] += 1
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(latency.delay(latency.embedding_ms))
+        return JSONResponse({
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": encode_embedding(embedder.embed(text), body.get("encoding_format"))}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": sum(len(t.split()) for t in texts), "total_tokens": sum(len(t.split()) for t in texts)},
+        })
+
+    async def chat(request: Request) -> JSONResponse:
+        body = await request.json()
+        calls["chat"] += 1
+        await asyncio.sleep(latency.delay(latency.chat_ms))
+        if body.get("response_format"):
+            content = json.dumps({"ingredients": []})
+        else:
+            content = cuisine
+        return JSONResponse({
+            "id": f"chatcmpl-{calls['chat']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    app = Starlette(routes=[
+        Route("/v1/embeddings", embeddings, methods=["POST"]),
+        Route("/v1/chat/completions", chat, methods=["POST"]),
+    ])
+    app.state.calls = calls
+    return app
@@ -0,0 +1,499 @@
+"""
+In-memory stand-in for the subset of Supabase/PostgREST the app uses.
+
+`FakeSupabase` mimics the synchronous supabase-py query builder
+(`table()/from_()`, filters, `order`, `limit`, `single`, `upsert`, `rpc`,
+`execute()`), backed by `FakeStore`, a dict-of-lists table engine. The HTTP
+stand-in used by the load harness drives the same engine, so both see
+identical semantics. Every executed statement counts as one round trip.
+"""
+import itertools
+import json
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _to_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace(" ", "T", 1).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _normalize(value: Any) -> Any:
+    """Bring a filter operand and a stored value into comparable shapes"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    if isinstance(value, str) and _ISO.match(value):
+        try:
+            return _to_datetime(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def parse_vector(value: Any) -> np.ndarray:
+    """pgvector text ('[0.1,0.2]') or a JSON list -> float32 array"""
+    if isinstance(value, str):
+        value = json.loads(value) if value else []
+    return np.asarray(value, dtype=np.float32)
+
+
+# --- filters -----------------------------------------------------------------
+
+Filter = Callable[[Dict], bool]
+
+
+def _coerce(left: Any, right: Any) -> Any:
+    """Operands arriving over HTTP are strings; match the stored value's type"""
+    if isinstance(left, bool) and isinstance(right, str):
+        return right.lower() == "true"
+    if isinstance(left, (int, float)) and isinstance(right, str):
+        try:
+            return type(left)(right)
+        except ValueError:
+            return right
+    return right
+
+
+def compare(op: str, column: str, operand: Any) -> Filter:
+    def check(row: Dict) -> bool:
+        value = row.get(column)
+        if op == "is":
+            return value is None if operand in (None, "null") else value is operand
+        if op == "in":
+            return any(_normalize(value) == _coerce(_normalize(value), _normalize(o)) for o in operand)
+        if value is None:
+            return False
+        left = _normalize(value)
+        right = _coerce(left, _normalize(operand))
+        try:
+            if op == "eq":
+                return left == right
+            if op == "neq":
+                return left != right
+            if op == "gt":
+                return left > right
+            if op == "gte":
+                return left >= right
+            if op == "lt":
+                return left < right
+            if op == "lte":
+                return left <= right
+        except TypeError:
+            return str(left) > str(right) if op in ("gt", "gte") else False
+        raise ValueError(f"Unsupported operator {op}")
+
+    return check
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def parse_logic_tree(text: str, conjunction: str = "or") -> Filter:
+    """Parse PostgREST `or=(...)` / `and(...)` filter syntax into a predicate"""
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        text = text[1:-1]
+
+    predicates = []
+    for term in _split_top_level(text):
+        term = term.strip()
+        match = re.match(r"^(and|or)\((.*)\)$", term)
+        if match:
+            predicates.append(parse_logic_tree(match.group(2), match.group(1)))
+            continue
+        column, op, value = term.split(".", 2)
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        if op == "in":
+            value = [v.strip('"') for v in value.strip("()").split(",")]
+        predicates.append(compare(op, column, None if value == "null" else value))
+
+    combine = any if conjunction == "or" else all
+    return lambda row: combine(p(row) for p in predicates)
+
+
+# --- store -------------------------------------------------------------------
+
+def _pantry_days_remaining(row: Dict) -> Optional[int]:
+    if not row.get("expiry_date"):
+        return None
+    delta = _normalize(row["expiry_date"]) - datetime.now(timezone.utc)
+    return delta.days
+
+
+def _pantry_expiry_status(row: Dict) -> str:
+    days = _pantry_days_remaining(row)
+    if days is None:
+        return "unknown"
+    if days < 0:
+        return "expired"
+    if days <= 3:
+        return "expiring_soon"
+    return "fresh"
+
+
+@dataclass
+class TableSpec:
+    # column -> factory for values filled in on insert
+    defaults: Dict[str, Callable[[], Any]] = field(default_factory=dict)
+    # computed columns selectable by name (PostgREST computed fields)
+    computed: Dict[str, Callable[[Dict], Any]] = field(default_factory=dict)
+
+
+class FakeStore:
+    """Thread-safe in-memory tables plus the RPCs the app calls"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict]] = {}
+        self.lock = threading.RLock()
+        self.round_trips = 0
+        self._ids = itertools.count(1)
+        self.specs: Dict[str, TableSpec] = {
+            "recipes": TableSpec(defaults={
+                "id": lambda: str(uuid.uuid4()),
+                "created_at": _now,
+                "last_updated": _now,
+                "cuisine": lambda: None,
+            }),
+            "pantry_items": TableSpec(
+                defaults={"id": self._next_id, "created_at": _now},
+                computed={
+                    "days_remaining": _pantry_days_remaining,
+                    "expiry_status": _pantry_expiry_status,
+                },
+            ),
+            "grocery_items": TableSpec(defaults={
+                "id": self._next_id, "created_at": _now, "purchased": lambda: False,
+            }),
+            "sessions": TableSpec(defaults={"created_at": _now}),
+            "maintenance_runs": TableSpec(defaults={"id": self._next_id}),
+        }
+        self.rpcs: Dict[str, Callable[[Dict], Any]] = {
+            "vector_search": self._rpc_vector_search,
+            "toggle_grocery_item": self._rpc_toggle_grocery_item,
+            "acquire_job_lease": self._rpc_acquire_job_lease,
+            "record_query_stats": self._rpc_record_query_stats,
+        }
+
+    def _next_id(self) -> int:
+        return next(self._ids)
+
+    def rows(self, table: str) -> List[Dict]:
+        return self.tables.setdefault(table, [])
+
+    # -- statements --
+
+    def select(self, table, columns="*", filters=(), order=(), limit=None, offset=0) -> List[Dict]:
+        with self.lock:
+            self.round_trips += 1
+            rows = [r for r in self.rows(table) if all(f(r) for f in filters)]
+            for column, desc in reversed(list(order)):
+                rows.sort(
+                    key=lambda r: (r.get(column) is None, _normalize(r.get(column)) if r.get(column) is not None else 0),
+                    reverse=desc,
+                )
+            rows = rows[offset:]
+            if limit is not None:
+                rows = rows[:limit]
+            return [self._project(table, r, columns) for r in rows]
+
+    def insert(self, table, payload, on_conflict: str = "", upsert=False, ignore_duplicates=False) -> List[Dict]:
+        rows = payload if isinstance(payload, list) else [payload]
+        with self.lock:
+            self.round_trips += 1
+            spec = self.specs.get(table, TableSpec())
+            keys = [c.strip() for c in on_conflict.split(",") if c.strip()] or ["id"]
+            written = []
+            for row in rows:
+                row = _jsonable(dict(row))
+                existing = None
+                if upsert and all(k in row for k in keys):
+                    existing = next(
+                        (r for r in self.rows(table) if all(r.get(k) == row[k] for k in keys)),
+                        None,
+                    )
+                if existing is not None:
+                    if ignore_duplicates:
+                        continue
+                    existing.update(row)
+                    written.append(dict(existing))
+                    continue
+                for column, factory in spec.defaults.items():
+                    if row.get(column) is None:
+                        row[column] = factory()
+                self.rows(table).append(row)
+                written.append(dict(row))
+            return written
+
+    def update(self, table, values, filters=()) -> List[Dict]:
+        values = _jsonable(dict(values))
+        with self.lock:
+            self.round_trips += 1
+            updated = []
+            for row in self.rows(table):
+                if all(f(row) for f in filters):
+                    row.update(values)
+                    updated.append(dict(row))
+            return updated
+
+    def delete(self, table, filters=()) -> List[Dict]:
+        with self.lock:
+            self.round_trips += 1
+            keep, deleted = [], []
+            for row in self.rows(table):
+                (deleted if all(f(row) for f in filters) else keep).append(row)
+            self.tables[table] = keep
+            return deleted
+
+    def rpc(self, name: str, params: Dict) -> Any:
+        with self.lock:
+            self.round_trips += 1
+            if name not in self.rpcs:
+                raise ValueError(f"Unknown RPC {name}")
+            return self.rpcs[name](params or {})
+
+    def _project(self, table: str, row: Dict, columns: str) -> Dict:
+        spec = self.specs.get(table, TableSpec())
+        names = [c.strip() for c in (columns or "*").split(",") if c.strip()]
+        out = {}
+        for name in names:
+            if name == "*":
+                out.update(row)
+            elif name in spec.computed:
+                out[name] = spec.computed[name](row)
+            else:
+                out[name] = row.get(name)
+        return out
+
+    # -- RPCs --
+
+    def _rpc_vector_search(self, params: Dict) -> List[Dict]:
+        query = parse_vector(params.get("query_embedding"))
+        if query.size == 0:
+            return []
+        embeddings = self.rows("recipe_embeddings")
+        if not embeddings:
+            return []
+        matrix = np.stack([parse_vector(e["embedding"]) for e in embeddings])
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        threshold = float(params.get("match_threshold", 0))
+        order = np.argsort(-scores)[: int(params.get("match_count", 10))]
+        recipes = {r["id"]: r for r in self.rows("recipes")}
+        results = []
+        for index in order:
+            if scores[index] < threshold:
+                break
+            recipe = recipes.get(embeddings[index]["recipe_id"])
+            if recipe:
+                results.append({**recipe, "similarity": float(scores[index])})
+        return results
+
+    def _rpc_toggle_grocery_item(self, params: Dict) -> List[Dict]:
+        for row in self.rows("grocery_items"):
+            if row["id"] == params["p_item_id"] and row["session_id"] == params["p_session_id"]:
+                row["purchased"] = not row["purchased"]
+                return [dict(row)]
+        return []
+
+    def _rpc_acquire_job_lease(self, params: Dict) -> bool:
+        leases = self.rows("job_leases")
+        now = datetime.now(timezone.utc)
+        lease = next((l for l in leases if l["job_name"] == params["p_job_name"]), None)
+        if lease and _normalize(lease["expires_at"]) >= now:
+            return False
+        expires_at = (now + timedelta(seconds=params["p_ttl_seconds"])).isoformat()
+        if lease:
+            lease.update(holder=params["p_holder"], expires_at=expires_at)
+        else:
+            leases.append({"job_name": params["p_job_name"], "holder": params["p_holder"], "expires_at": expires_at})
+        return True
+
+    def _rpc_record_query_stats(self, params: Dict) -> None:
+        rows = {(r["kind"], r["key"]): r for r in self.rows("query_stats")}
+        now = datetime.now(timezone.utc).isoformat()
+        for stat in params["stats"]:
+            row = rows.get((stat["kind"], stat["key"]))
+            if row is None:
+                self.rows("query_stats").append({**stat, "last_seen": now})
+            else:
+                row.update(hits=row["hits"] + stat["hits"], value=stat["value"], last_seen=now)
+
+
+# --- supabase-py compatible client --------------------------------------------
+
+@dataclass
+class FakeResponse:
+    data: Any
+    count: Optional[int] = None
+
+
+class FakeQuery:
+    def __init__(self, store: FakeStore, table: str):
+        self.store = store
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[Filter] = []
+        self.ordering: List[Tuple[str, bool]] = []
+        self.row_limit: Optional[int] = None
+        self.row_offset = 0
+        self.on_conflict = ""
+        self.ignore_duplicates = False
+        self.single_row = False
+        self.maybe = False
+        self.count = None
+        self._negate = False
+
+    # statements
+    def select(self, columns: str = "*", count=None, **_):
+        self.action, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, json, count=None, **_):
+        self.action, self.payload, self.count = "insert", json, count
+        return self
+
+    def upsert(self, json, on_conflict: str = "", ignore_duplicates: bool = False, count=None, **_):
+        self.action, self.payload, self.count = "upsert", json, count
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, json, count=None, **_):
+        self.action, self.payload, self.count = "update", json, count
+        return self
+
+    def delete(self, count=None, **_):
+        self.action, self.count = "delete", count
+        return self
+
+    # filters
+    def _add(self, predicate: Filter):
+        if self._negate:
+            self._negate = False
+            self.filters.append(lambda row, p=predicate: not p(row))
+        else:
+            self.filters.append(predicate)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, column, value): return self._add(compare("eq", column, value))
+    def neq(self, column, value): return self._add(compare("neq", column, value))
+    def gt(self, column, value): return self._add(compare("gt", column, value))
+    def gte(self, column, value): return self._add(compare("gte", column, value))
+    def lt(self, column, value): return self._add(compare("lt", column, value))
+    def lte(self, column, value): return self._add(compare("lte", column, value))
+    def in_(self, column, values): return self._add(compare("in", column, list(values)))
+    def is_(self, column, value): return self._add(compare("is", column, value))
+    def or_(self, filters: str, **_): return self._add(parse_logic_tree(filters))
+
+    def order(self, column: str, desc: bool = False, **_):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size: int, **_):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def maybe_single(self):
+        self.single_row = self.maybe = True
+        return self
+
+    def execute(self) -> Optional[FakeResponse]:
+        if self.action == "select":
+            data = self.store.select(
+                self.table, self.columns, self.filters, self.ordering, self.row_limit, self.row_offset
+            )
+        elif self.action in ("insert", "upsert"):
+            data = self.store.insert(
+                self.table, self.payload, self.on_conflict,
+                upsert=self.action == "upsert", ignore_duplicates=self.ignore_duplicates,
+            )
+        elif self.action == "update":
+            data = self.store.update(self.table, self.payload, self.filters)
+        else:
+            data = self.store.delete(self.table, self.filters)
+
+        count = len(data) if self.count else None
+        if self.single_row:
+            if not data:
+                if self.maybe:
+                    return None
+                raise ValueError("JSON object requested, multiple (or no) rows returned")
+            return FakeResponse(data=data[0], count=count)
+        return FakeResponse(data=data, count=count)
+
+
+class FakeRpc:
+    def __init__(self, store: FakeStore, name: str, params: Dict):
+        self.store, self.name, self.params = store, name, params
+
+    def execute(self) -> FakeResponse:
+        return FakeResponse(data=self.store.rpc(self.name, self.params))
+
+
+class FakeSupabase:
+    """Drop-in for `supabase.Client` as used by the app's services"""
+
+    def __init__(self, store: Optional[FakeStore] = None):
+        self.store = store or FakeStore()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.store, name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[Dict] = None, **_) -> FakeRpc:
+        return FakeRpc(self.store, fn, params or {})
@@ -0,0 +1,161 @@
+"""Shared plumbing for the offline benchmarks: fakes wiring, timing and reporting."""
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import uvicorn
+
+# The app reads these at import time; give it harmless values so importing
+# never needs a real project. Anything already set in the environment wins.
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("MAINTENANCE_ENABLED", "false")
+
+
+def install_fakes(supabase, openai_client) -> None:
+    """Make the app container hand out the in-memory stand-ins"""
+    from api.core.container import container
+
+    container.override(supabase=supabase, openai=openai_client)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(samples: List[float], ops_per_sample: int = 1) -> Dict[str, float]:
+    total = sum(samples)
+    ops = len(samples) * ops_per_sample
+    return {
+        "samples": len(samples),
+        "ops": ops,
+        "total_s": round(total, 6),
+        "ops_per_sec": round(ops / total, 2) if total else float("inf"),
+        "mean_us": round(total / ops * 1e6, 3),
+        "p50_us": round(_percentile(samples, 50) / ops_per_sample * 1e6, 3),
+        "p99_us": round(_percentile(samples, 99) / ops_per_sample * 1e6, 3),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 3, ops_per_call: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, ops_per_call)
+
+
+async def measure_async(
+    fn: Callable[[], Awaitable[Any]], repeat: int, warmup: int = 3, ops_per_call: int = 1
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, ops_per_call)
+
+
+def peak_memory(fn: Callable[[], Any]) -> Dict[str, float]:
+    """Peak traced Python allocation during one call (run separately from timing)"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": round(peak / 1024, 1)}
+
+
+def environment() -> Dict[str, Any]:
+    import numpy
+
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        revision = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report: Dict[str, Any], path: Optional[str]) -> None:
+    text = json.dumps(report, indent=2, default=str)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    print(text)
+
+
+def compare_reports(current: Dict[str, Any], baseline_path: str) -> None:
+    """Print throughput change per benchmark against an earlier JSON report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'benchmark':<40} {'baseline ops/s':>15} {'current ops/s':>15} {'change':>8}", file=sys.stderr)
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        old, new = before["ops_per_sec"], result["ops_per_sec"]
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{name:<40} {old:>15.1f} {new:>15.1f} {change:>+7.1f}%", file=sys.stderr)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app under uvicorn on a daemon thread"""
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=port, log_level="warning", lifespan="auto",
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + 15
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"server on port {self.port} failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
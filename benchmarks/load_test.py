@@ -0,0 +1,300 @@
+"""
+End-to-end load test against local Supabase (PostgREST) and OpenAI stand-ins.
+
+Starts the PostgREST stand-in over a seeded FakeStore and the fake OpenAI
+server on free local ports, boots the real app against them under uvicorn,
+then drives concurrent user flows over HTTP:
+
+    create session -> bulk add pantry -> list pantry -> recommend ->
+    list recipes -> grocery from recipes -> list grocery -> toggle item
+
+    python -m benchmarks.load_test --users 20 --duration 30 --db-latency-ms 2 \
+        --output load.json [--compare previous.json]
+
+Reports p50/p95/p99 latency, throughput and error rate per endpoint, plus the
+database round trips each step costs (from a sequential calibration pass).
+`--serve` only starts the stand-ins and prints the environment to point an
+externally started app at them; `--target URL` load-tests such an app.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks import fake_openai_server, postgrest_server
+from benchmarks.corpus import CorpusConfig, FakeEmbedder, generate_corpus, populate
+from benchmarks.fake_supabase import FakeStore
+from benchmarks.harness import BackgroundServer, environment, free_port, write_report
+
+STEPS = [
+    "create_session",
+    "pantry_bulk_add",
+    "pantry_list",
+    "recommend",
+    "recipes_list",
+    "grocery_from_recipes",
+    "grocery_list",
+    "grocery_toggle",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load after warmup")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of untimed load first")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between steps of a flow")
+    parser.add_argument("--recipes", type=int, default=1000, help="synthetic corpus size")
+    parser.add_argument("--vocabulary", type=int, default=300, help="distinct ingredient names")
+    parser.add_argument("--pantry", type=int, default=15, help="items each user adds")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="added per PostgREST request")
+    parser.add_argument("--embedding-ms", type=float, default=40.0, help="fake OpenAI embedding latency")
+    parser.add_argument("--chat-ms", type=float, default=400.0, help="fake OpenAI chat latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target", help="base URL of an already running app (skips starting one)")
+    parser.add_argument("--serve", action="store_true", help="only run the stand-ins until interrupted")
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    return parser.parse_args()
+
+
+def latency_summary(samples: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return round(ordered[min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)] * 1000, 2)
+
+    total = len(samples) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.flows = 0
+        self.enabled = False
+
+    def record(self, step: str, elapsed: float, status: int, ok: bool) -> None:
+        if not self.enabled:
+            return
+        self.statuses[step][status] += 1
+        if ok:
+            self.samples[step].append(elapsed)
+        else:
+            self.errors[step] += 1
+
+
+class UserFlow:
+    """One virtual user walking the pantry -> recommendation -> grocery journey"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, vocabulary: List[str],
+                 pantry_size: int, think_ms: float, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.vocabulary = vocabulary
+        self.pantry_size = pantry_size
+        self.think = think_ms / 1000
+        self.rng = rng
+
+    async def call(self, step: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(step, time.perf_counter() - start, 0, False)
+            return None
+        self.recorder.record(step, time.perf_counter() - start, response.status_code, response.status_code < 400)
+        if self.think:
+            await asyncio.sleep(self.think)
+        return response if response.status_code < 400 else None
+
+    async def run(self) -> None:
+        pantry = self.rng.sample(self.vocabulary, min(self.pantry_size, len(self.vocabulary)))
+
+        response = await self.call("create_session", "POST", "/api/sessions/", json=pantry[:3])
+        if response is None:
+            return
+        headers = {"X-Session-ID": response.json()["session_id"]}
+
+        await self.call("pantry_bulk_add", "POST", "/api/pantry/bulk", headers=headers, json=[
+            {"ingredient": {"name": name, "unit": "", "quantity": "1"}} for name in pantry
+        ])
+        await self.call("pantry_list", "GET", "/api/pantry/", headers=headers, params={"limit": 50})
+
+        recommended = await self.call("recommend", "POST", "/api/recipes/recommend", headers=headers,
+                                      params={"min_score": 0.0})
+        recipe_ids = [r["id"] for r in recommended.json()[:3]] if recommended is not None else []
+
+        listed = await self.call("recipes_list", "GET", "/api/recipes/", headers=headers)
+        if not recipe_ids and listed is not None:
+            recipe_ids = [r["id"] for r in listed.json()[:3] if r.get("id")]
+
+        if recipe_ids:
+            await self.call("grocery_from_recipes", "POST", "/api/pantry/grocery/from-recipes",
+                            headers=headers, json={"recipe_ids": recipe_ids})
+        grocery = await self.call("grocery_list", "GET", "/api/pantry/grocery", headers=headers,
+                                  params={"limit": 50})
+        items = grocery.json() if grocery is not None else []
+        if items:
+            item = self.rng.choice(items)
+            await self.call("grocery_toggle", "PATCH", f"/api/pantry/grocery/{item['id']}/toggle", headers=headers)
+
+        if self.recorder.enabled:
+            self.recorder.flows += 1
+
+
+async def run_load(base_url: str, args, vocabulary: List[str]) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def user(index: int):
+            flow = UserFlow(client, recorder, vocabulary, args.pantry, args.think_ms, random.Random(args.seed + index))
+            while not stop.is_set():
+                await flow.run()
+
+        tasks = [asyncio.create_task(user(i)) for i in range(args.users)]
+        await asyncio.sleep(args.warmup)
+        recorder.enabled = True
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        recorder.enabled = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    endpoints = {
+        step: {**latency_summary(recorder.samples[step], recorder.errors[step], elapsed),
+               "statuses": dict(recorder.statuses[step])}
+        for step in STEPS if recorder.samples[step] or recorder.errors[step]
+    }
+    all_samples = [s for samples in recorder.samples.values() for s in samples]
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "flows_completed": recorder.flows,
+        "flows_per_sec": round(recorder.flows / elapsed, 2),
+        "overall": latency_summary(all_samples, sum(recorder.errors.values()), elapsed),
+        "endpoints": endpoints,
+    }
+
+
+async def calibrate_round_trips(base_url: str, store: FakeStore, vocabulary: List[str], args) -> Dict[str, Any]:
+    """Walk one flow sequentially and attribute DB round trips to each step"""
+    per_step: Dict[str, int] = {}
+
+    class CountingRecorder(Recorder):
+        def record(self, step, elapsed, status, ok):
+            per_step[step] = store.round_trips - self.mark
+            self.mark = store.round_trips
+
+    recorder = CountingRecorder()
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        flow = UserFlow(client, recorder, vocabulary, args.pantry, 0, random.Random(args.seed))
+        await asyncio.sleep(0.5)  # let any queued background writes land first
+        recorder.mark = store.round_trips
+        await flow.run()
+    return {"per_step": per_step, "per_flow": sum(per_step.values())}
+
+
+def compare_load_reports(current: Dict[str, Any], baseline_path: str) -> None:
+    import json
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'endpoint':<24} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'rps':>16}", file=sys.stderr)
+    for step, result in current["load"]["endpoints"].items():
+        before = baseline.get("load", {}).get("endpoints", {}).get(step)
+        if not before:
+            continue
+        cells = [f"{before[k]:>7.1f}->{result[k]:<7.1f}" for k in ("p50_ms", "p95_ms", "p99_ms", "rps")]
+        print(f"{step:<24} " + " ".join(f"{c:>16}" for c in cells), file=sys.stderr)
+
+
+def main():
+    args = parse_args()
+    corpus = generate_corpus(CorpusConfig(recipes=args.recipes, vocabulary=args.vocabulary, seed=args.seed))
+    embedder = FakeEmbedder()
+    store = FakeStore()
+    populate(store, corpus, embedder)
+
+    latency = fake_openai_server.LatencyProfile(
+        embedding_ms=args.embedding_ms, chat_ms=args.chat_ms, seed=args.seed,
+    )
+    openai_app = fake_openai_server.create_app(embedder, latency)
+    db = BackgroundServer(postgrest_server.create_app(store, args.db_latency_ms), free_port()).start()
+    llm = BackgroundServer(openai_app, free_port()).start()
+
+    # The app reads these at import time, so they must be set before importing it
+    os.environ["SUPABASE_URL"] = db.url
+    os.environ["OPENAI_BASE_URL"] = f"{llm.url}/v1"
+
+    if args.serve:
+        print(f"export SUPABASE_URL={db.url} OPENAI_BASE_URL={llm.url}/v1 "
+              f"SUPABASE_KEY={os.environ['SUPABASE_KEY']} OPENAI_API_KEY={os.environ['OPENAI_API_KEY']}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    app_server = None
+    base_url = args.target
+    if not base_url:
+        from api.main import app
+
+        app_server = BackgroundServer(app, free_port()).start()
+        base_url = app_server.url
+
+    try:
+        calibration = asyncio.run(calibrate_round_trips(base_url, store, corpus.vocabulary, args))
+        store.round_trips = 0
+        load = asyncio.run(run_load(base_url, args, corpus.vocabulary))
+        load["db_round_trips_total"] = store.round_trips
+    finally:
+        if app_server:
+            app_server.stop()
+        llm.stop()
+        db.stop()
+
+    report = {
+        "meta": {
+            **environment(),
+            "users": args.users,
+            "duration_s": args.duration,
+            "db_latency_ms": args.db_latency_ms,
+            "openai_latency_ms": {"embedding": args.embedding_ms, "chat": args.chat_ms},
+            "corpus": {"recipes": args.recipes, "vocabulary": args.vocabulary, "pantry": args.pantry},
+            "target": args.target or "in-process uvicorn",
+            "fake_openai_calls": dict(openai_app.state.calls),
+        },
+        "db_round_trips": calibration,
+        "load": load,
+    }
+    write_report(report, args.output)
+    if args.compare:
+        compare_load_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+PostgREST-compatible HTTP stand-in backed by the in-memory FakeStore.
+
+Serves `/rest/v1/<table>` (GET/POST/PATCH/DELETE) and `/rest/v1/rpc/<fn>`
+with the query syntax supabase-py emits: `col=op.value` filters (including
+`not.` and `in.(...)`), `or=(...)` logic trees, `select`, `order`, `limit`,
+`offset`, `on_conflict`, the `Prefer` header (return/count/resolution) and
+`Accept: application/vnd.pgrst.object+json` for single rows. Point the app
+at it with SUPABASE_URL=http://host:port. `latency_ms` adds a fixed delay
+per request to model the network hop to a hosted database.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.fake_supabase import FakeStore, compare, parse_logic_tree
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns", "or", "and"}
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+
+def _parse_operand(op: str, raw: str) -> Any:
+    if op == "in":
+        inner = raw.strip()[1:-1]
+        values, current, quoted = [], "", False
+        for char in inner:
+            if char == '"':
+                quoted = not quoted
+                continue
+            if char == "," and not quoted:
+                values.append(current)
+                current = ""
+            else:
+                current += char
+        if current or inner:
+            values.append(current)
+        return values
+    if op == "is":
+        return {"null": None, "true": True, "false": False}.get(raw, raw)
+    if raw.startswith('"') and raw.endswith('"'):
+        return raw[1:-1]
+    return raw
+
+
+def parse_filters(request: Request) -> List:
+    filters = []
+    for key, value in request.query_params.multi_items():
+        if key in ("or", "and"):
+            filters.append(parse_logic_tree(value, key))
+            continue
+        if key in RESERVED_PARAMS:
+            continue
+        negate = value.startswith("not.")
+        if negate:
+            value = value[4:]
+        op, _, raw = value.partition(".")
+        predicate = compare(op, key, _parse_operand(op, raw))
+        filters.append((lambda row, p=predicate: not p(row)) if negate else predicate)
+    return filters
+
+
+def parse_order(value: Optional[str]) -> List[Tuple[str, bool]]:
+    ordering = []
+    for part in (value or "").split(","):
+        if not part:
+            continue
+        pieces = part.split(".")
+        ordering.append((pieces[0], "desc" in pieces[1:]))
+    return ordering
+
+
+def parse_prefer(request: Request) -> Dict[str, str]:
+    prefer = {}
+    for item in request.headers.get("prefer", "").split(","):
+        if "=" in item:
+            key, value = item.strip().split("=", 1)
+            prefer[key] = value
+    return prefer
+
+
+def _error(status: int, message: str, details: str = "", code: str = "PGRST000") -> JSONResponse:
+    return JSONResponse({"message": message, "code": code, "hint": None, "details": details}, status_code=status)
+
+
+def create_app(store: FakeStore, latency_ms: float = 0.0) -> Starlette:
+    def respond(request: Request, rows: Any, status: int = 200) -> Response:
+        prefer = parse_prefer(request)
+        headers = {}
+        if "count" in prefer and isinstance(rows, list):
+            headers["content-range"] = f"0-{max(len(rows) - 1, 0)}/{len(rows)}"
+
+        if request.headers.get("accept") == SINGLE_OBJECT and isinstance(rows, list):
+            if len(rows) != 1:
+                return _error(
+                    406,
+                    "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(rows)} rows",
+                    "PGRST116",
+                )
+            rows = rows[0]
+
+        if request.method != "GET" and prefer.get("return") == "minimal":
+            return Response(status_code=204 if request.method != "POST" else 201, headers=headers)
+        return Response(json.dumps(rows, default=str), status_code=status, headers=headers, media_type="application/json")
+
+    async def table(request: Request) -> Response:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        name = request.path_params["table"]
+        params = request.query_params
+        filters = parse_filters(request)
+        try:
+            if request.method == "GET":
+                rows = store.select(
+                    name,
+                    params.get("select", "*"),
+                    filters,
+                    parse_order(params.get("order")),
+                    int(params["limit"]) if "limit" in params else None,
+                    int(params.get("offset", 0)),
+                )
+                return respond(request, rows)
+
+            body = await request.json() if request.method in ("POST", "PATCH") else None
+            if request.method == "POST":
+                resolution = parse_prefer(request).get("resolution")
+                rows = store.insert(
+                    name,
+                    body,
+                    params.get("on_conflict", ""),
+                    upsert=resolution is not None,
+                    ignore_duplicates=resolution == "ignore-duplicates",
+                )
+                return respond(request, rows, status=201)
+            if request.method == "PATCH":
+                return respond(request, store.update(name, body, filters))
+            if request.method == "DELETE":
+                return respond(request, store.delete(name, filters))
+        except Exception as e:
+            return _error(400, str(e))
+        return _error(405, f"Method {request.method} not allowed")
+
+    async def rpc(request: Request) -> Response:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        try:
+            params = await request.json() if request.method == "POST" else dict(request.query_params)
+        except json.JSONDecodeError:
+            params = {}
+        try:
+            result = store.rpc(request.path_params["fn"], params)
+        except Exception as e:
+            return _error(400, str(e))
+        return Response(json.dumps(result, default=str), media_type="application/json")
+
+    return Starlette(routes=[
+        Route("/rest/v1/rpc/{fn}", rpc, methods=["GET", "POST"]),
+        Route("/rest/v1/{table}", table, methods=["GET", "POST", "PATCH", "DELETE"]),
+    ])
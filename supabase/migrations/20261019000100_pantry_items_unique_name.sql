@@ -0,0 +1,11 @@
+-- Bulk pantry inserts upsert on (session_id, normalized_name).
+-- Drop any duplicates that slipped in before the constraint existed, keeping the oldest row.
+delete from pantry_items a
+using pantry_items b
+where a.session_id = b.session_id
+  and a.normalized_name = b.normalized_name
+  and a.id > b.id;
+
+alter table pantry_items
+  add constraint pantry_items_session_id_normalized_name_key
+  unique (session_id, normalized_name);
@@ -0,0 +1,28 @@
+-- Grocery items are merged per canonical ingredient and unit dimension and
+-- written with an upsert on (session_id, normalized_name).
+-- Older rows used a quantity-prefixed normalized_name; keep the oldest row per key.
+delete from grocery_items a
+using grocery_items b
+where a.session_id = b.session_id
+  and a.normalized_name = b.normalized_name
+  and a.id > b.id;
+
+alter table grocery_items
+  add constraint grocery_items_session_id_normalized_name_key
+  unique (session_id, normalized_name);
+
+-- Flip the purchased flag in one conditional statement, returning the row
+-- only when it belongs to the calling session.
+create or replace function toggle_grocery_item(
+  p_item_id grocery_items.id%type,
+  p_session_id grocery_items.session_id%type
+)
+returns setof grocery_items
+language sql
+as $$
+  update grocery_items
+     set purchased = not purchased
+   where id = p_item_id
+     and session_id = p_session_id
+  returning *;
+$$;
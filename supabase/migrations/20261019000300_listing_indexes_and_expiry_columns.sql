@@ -0,0 +1,40 @@
+-- Keyset pagination and expiry filtering for pantry and grocery listings.
+
+-- Default pantry walk: (session_id, id); expiring-soon walk: (session_id, expiry_date, id)
+create index if not exists pantry_items_session_id_id_idx
+  on pantry_items (session_id, id);
+create index if not exists pantry_items_session_id_expiry_idx
+  on pantry_items (session_id, expiry_date, id)
+  where expiry_date is not null;
+
+-- Grocery walk is newest first, optionally filtered on purchased
+create index if not exists grocery_items_session_id_created_idx
+  on grocery_items (session_id, created_at desc, id desc);
+create index if not exists grocery_items_session_id_purchased_created_idx
+  on grocery_items (session_id, purchased, created_at desc, id desc);
+
+-- Computed columns, selectable through PostgREST as `days_remaining` and
+-- `expiry_status`. Whole days are floored, matching Python's timedelta.days.
+create or replace function days_remaining(item pantry_items)
+returns integer
+language sql
+stable
+as $$
+  select case
+    when item.expiry_date is null then null
+    else floor(extract(epoch from (item.expiry_date - now())) / 86400)::integer
+  end;
+$$;
+
+create or replace function expiry_status(item pantry_items)
+returns text
+language sql
+stable
+as $$
+  select case
+    when item.expiry_date is null then 'unknown'
+    when days_remaining(item) < 0 then 'expired'
+    when days_remaining(item) <= 3 then 'expiring_soon'
+    else 'fresh'
+  end;
+$$;
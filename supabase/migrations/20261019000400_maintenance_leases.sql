@@ -0,0 +1,48 @@
+-- Leases let exactly one app worker run each maintenance job per interval.
+create table if not exists job_leases (
+  job_name text primary key,
+  holder text not null,
+  expires_at timestamptz not null
+);
+
+-- Take the lease if it is free or expired. Returns true when the caller holds it.
+create or replace function acquire_job_lease(
+  p_job_name text,
+  p_holder text,
+  p_ttl_seconds integer
+)
+returns boolean
+language plpgsql
+as $$
+declare
+  acquired boolean;
+begin
+  insert into job_leases as l (job_name, holder, expires_at)
+  values (p_job_name, p_holder, now() + make_interval(secs => p_ttl_seconds))
+  on conflict (job_name) do update
+    set holder = excluded.holder,
+        expires_at = excluded.expires_at
+    where l.expires_at < now()
+  returning true into acquired;
+
+  return coalesce(acquired, false);
+end;
+$$;
+
+-- One row per executed job, for duration and rows-affected history.
+create table if not exists maintenance_runs (
+  id bigserial primary key,
+  job_name text not null,
+  holder text not null,
+  started_at timestamptz not null,
+  duration_ms double precision not null,
+  rows_affected integer not null default 0,
+  error text
+);
+
+create index if not exists maintenance_runs_job_started_idx
+  on maintenance_runs (job_name, started_at desc);
+
+-- The session purge selects expired ids in chunks
+create index if not exists sessions_expires_at_idx on sessions (expires_at);
+create index if not exists grocery_items_session_id_idx on grocery_items (session_id);
@@ -0,0 +1,4 @@
+-- Compact copy of each embedding: base64 of a float32 scale followed by int8
+-- codes (see api/core/quantization.py). About 2 KB per 1536-d row instead of
+-- ~30 KB of pgvector text, so snapshots and per-recipe reads transfer less.
+alter table recipe_embeddings add column if not exists embedding_q8 text;
@@ -0,0 +1,3 @@
+-- Embedding of each cached query (int8 packed, see api/core/quantization.py),
+-- so near-duplicate queries can reuse a cached result set.
+alter table recipe_cache add column if not exists query_embedding text;
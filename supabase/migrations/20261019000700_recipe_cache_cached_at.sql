@@ -0,0 +1,7 @@
+-- When each cached result set was written, so stale-while-revalidate
+-- responses can report their age. Older rows fall back to expires_at - TTL.
+alter table recipe_cache add column if not exists cached_at timestamptz;
+
+-- The cache purge deletes by expires_at (minus the grace window)
+create index if not exists recipe_cache_expires_at_idx
+  on recipe_cache (expires_at);
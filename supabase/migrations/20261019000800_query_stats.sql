@@ -0,0 +1,28 @@
+-- Request counts for search queries and pantry fingerprints, read by the
+-- cache-warming job (api/services/warmup.py). Kept apart from recipe_cache so
+-- the history survives cache purges.
+create table if not exists query_stats (
+  kind text not null check (kind in ('query', 'pantry')),
+  key text not null,  -- canonical query or pantry fingerprint
+  value text not null,  -- what to recompute: the query as typed, or the fingerprint
+  hits bigint not null default 0,
+  last_seen timestamptz not null default now(),
+  primary key (kind, key)
+);
+
+create index if not exists query_stats_kind_hits_idx
+  on query_stats (kind, hits desc);
+
+-- Workers flush their in-memory counts here; increments, never overwrites
+create or replace function record_query_stats(stats jsonb)
+returns void
+language sql
+as $$
+  insert into query_stats as s (key, kind, value, hits, last_seen)
+  select e->>'key', e->>'kind', e->>'value', (e->>'hits')::bigint, now()
+  from jsonb_array_elements(stats) as e
+  on conflict (kind, key) do update
+    set hits = s.hits + excluded.hits,
+        value = excluded.value,
+        last_seen = now();
+$$;
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from api.core.admission import AdmissionController, AdmissionRejected
+
+
+def controller(max_concurrent=2, per_session=1, max_queue=2, queue_timeout=1.0):
+    return AdmissionController(max_concurrent, per_session, max_queue, queue_timeout)
+
+
+def test_admits_up_to_the_limit_then_queues_in_order():
+    async def main():
+        admission = controller(max_concurrent=1, max_queue=5)
+        order = []
+
+        async def crawl(session_id):
+            async with admission.slot(session_id):
+                order.append(session_id)
+                await asyncio.sleep(0.01)
+
+        await admission.acquire("first")
+        tasks = [asyncio.create_task(crawl(session_id)) for session_id in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert admission.running == 1
+        assert admission.queued == 3
+
+        admission.release("first")
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert admission.stats()["running"] == 0
+        assert admission.stats()["sessions"] == 0
+
+    asyncio.run(main())
+
+
+def test_per_session_limit():
+    async def main():
+        admission = controller(per_session=1)
+        async with admission.slot("s1"):
+            with pytest.raises(AdmissionRejected) as rejected:
+                await admission.acquire("s1")
+            assert rejected.value.reason == "session_limit"
+            assert rejected.value.retry_after >= 1
+            # Other sessions are not affected
+            async with admission.slot("s2"):
+                pass
+        async with admission.slot("s1"):
+            pass
+
+    asyncio.run(main())
+
+
+def test_queue_full():
+    async def main():
+        admission = controller(max_concurrent=1, max_queue=1)
+        await admission.acquire("running")
+        waiting = asyncio.create_task(admission.acquire("waiting"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("late")
+        assert rejected.value.reason == "queue_full"
+
+        admission.release("running")
+        await waiting
+        admission.release("waiting")
+        assert (admission.running, admission.queued, admission.stats()["sessions"]) == (0, 0, 0)
+
+    asyncio.run(main())
+
+
+def test_queue_timeout():
+    async def main():
+        admission = controller(max_concurrent=1, queue_timeout=0.05)
+        await admission.acquire("running")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("waiting")
+        assert rejected.value.reason == "timeout"
+        assert admission.queued == 0
+
+        # The timed-out waiter does not take the slot freed afterwards
+        admission.release("running")
+        assert admission.running == 0
+        assert admission.stats()["sessions"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        admission = controller(max_concurrent=1)
+        await admission.acquire("running")
+        waiting = asyncio.create_task(admission.acquire("waiting"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+        assert admission.queued == 0
+        admission.release("running")
+        assert admission.running == 0
+        assert admission.stats()["sessions"] == 0
+
+    asyncio.run(main())
+
+
+def test_slot_is_released_when_the_work_fails():
+    async def main():
+        admission = controller()
+        with pytest.raises(RuntimeError):
+            async with admission.slot("s1"):
+                raise RuntimeError("crawl failed")
+        assert admission.running == 0
+        async with admission.slot("s1"):
+            assert admission.running == 1
+
+    asyncio.run(main())
+
+
+def test_anonymous_requests_share_a_session():
+    async def main():
+        admission = controller(per_session=1)
+        async with admission.slot(None):
+            with pytest.raises(AdmissionRejected):
+                await admission.acquire("anonymous")
+
+    asyncio.run(main())
@@ -1 +1,319 @@
+import asyncio
+import os
+import threading
+import time
 
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from tenacity import wait_fixed
+
+from api.core.deadline import deadline_scope
+from api.crawler.frontier import CrawlFrontier, CrawlPriority
+from api.crawler.page_cache import RECIPE, SEARCH, PageCache, PageEntry
+from api.crawler.politeness import HostThrottled
+from api.crawler.recipe import RecipeCrawler
+
+URL = "https://example.com/recipe/1"
+
+
+class Response:
+    def __init__(self, status, body="", headers=None):
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = headers or {}
+        self._body = body
+
+    async def text(self):
+        return self._body
+
+
+class Request:
+    """Stands in for a Playwright APIRequestContext; records the headers sent"""
+
+    def __init__(self, response):
+        self.response = response
+        self.sent = []
+
+    async def get(self, url, headers, timeout):
+        self.sent.append(headers)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path / "pages"), {SEARCH: 60, RECIPE: 3600}, max_age=86400)
+
+
+def entry(url=URL, body="<html>recipe</html>", validated_at=None, **fields):
+    return PageEntry(
+        url=url,
+        kind=RECIPE,
+        body=body,
+        size=len(body),
+        etag=fields.pop("etag", '"v1"'),
+        last_modified=fields.pop("last_modified", "Mon, 19 Oct 2026 08:00:00 GMT"),
+        validated_at=time.time() if validated_at is None else validated_at,
+        **fields,
+    )
+
+
+def revalidate(cache, request, url=URL):
+    return asyncio.run(cache.revalidate(request, url, RECIPE, timeout=1000))
+
+
+def test_page_cache_round_trip(cache):
+    assert cache.get(URL) is None
+    cache.put(entry(parsed={"title": "Soup"}))
+    stored = cache.get(URL)
+    assert stored.body == "<html>recipe</html>"
+    assert stored.parsed == {"title": "Soup"}
+    assert cache.get("https://example.com/recipe/2") is None
+
+
+def test_lookup_only_returns_fresh_entries(cache):
+    cache.put(entry())
+    assert cache.lookup(URL, RECIPE) is not None
+
+    cache.put(entry(validated_at=time.time() - 7200))
+    assert cache.lookup(URL, RECIPE) is None
+    # Search pages have their own, shorter TTL
+    cache.put(entry(validated_at=time.time() - 120)._replace(kind=SEARCH))
+    assert cache.lookup(URL, SEARCH) is None
+
+
+def test_corrupt_entries_are_misses(cache):
+    path = cache._path(URL)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"not gzip")
+    assert cache.get(URL) is None
+
+
+@pytest.mark.parametrize("stored, expected", [
+    (None, {}),
+    (entry(etag=None, last_modified=None), {}),
+    (entry(last_modified=None), {"If-None-Match": '"v1"'}),
+    (entry(), {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 19 Oct 2026 08:00:00 GMT"}),
+])
+def test_validators(stored, expected):
+    assert PageCache.validators(stored) == expected
+
+
+def test_not_modified_keeps_the_parse_and_renews(cache):
+    cache.put(entry(validated_at=time.time() - 7200, parsed={"title": "Soup"}))
+    request = Request(Response(304))
+
+    parsed, body = revalidate(cache, request)
+    assert parsed == {"title": "Soup"}
+    assert body == "<html>recipe</html>"
+    assert request.sent == [{"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 19 Oct 2026 08:00:00 GMT"}]
+    assert cache.fresh(cache.get(URL))
+
+
+def test_same_body_without_validators_keeps_the_parse(cache):
+    cache.put(entry(etag=None, last_modified=None, validated_at=0, parsed={"title": "Soup"}))
+
+    parsed, body = revalidate(cache, Request(Response(200, "<html>recipe</html>")))
+    assert parsed == {"title": "Soup"}
+    assert cache.fresh(cache.get(URL))
+
+
+def test_modified_page_replaces_the_entry_and_drops_the_parse(cache):
+    cache.put(entry(validated_at=0, parsed={"title": "Soup"}))
+    response = Response(200, "<html>new</html>", {"etag": '"v2"'})
+
+    parsed, body = revalidate(cache, Request(response))
+    assert (parsed, body) == (None, "<html>new</html>")
+    stored = cache.get(URL)
+    assert (stored.body, stored.etag, stored.last_modified, stored.parsed) == ("<html>new</html>", '"v2"', None, None)
+
+
+def test_first_fetch_is_cached(cache):
+    parsed, body = revalidate(cache, Request(Response(200, "<html>first</html>")))
+    assert (parsed, body) == (None, "<html>first</html>")
+    assert cache.get(URL).body == "<html>first</html>"
+
+
+@pytest.mark.parametrize("response", [Response(500), Response(404), Response(304), OSError("connection reset")])
+def test_errors_fall_back_to_navigation(cache, response):
+    # A 304 for a page we don't have is an error too
+    assert revalidate(cache, Request(response)) == (None, None)
+    assert cache.get(URL) is None
+
+
+def test_revalidate_does_disk_work_off_the_event_loop(cache, monkeypatch):
+    cache.put(entry(validated_at=0))
+    threads = []
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+
+        def recorded(*args, method=method):
+            threads.append(threading.current_thread())
+            return method(*args)
+        monkeypatch.setattr(cache, name, recorded)
+
+    revalidate(cache, Request(Response(304)))
+    revalidate(cache, Request(Response(200, "<html>new</html>")))
+    assert len(threads) == 4
+    assert threading.main_thread() not in threads
+
+
+def test_set_parsed_only_touches_existing_entries(cache):
+    cache.set_parsed(URL, {"title": "Soup"})
+    assert cache.get(URL) is None
+
+    cache.put(entry())
+    cache.set_parsed(URL, ["https://example.com/recipe/2"])
+    assert cache.get(URL).parsed == ["https://example.com/recipe/2"]
+
+
+def test_prune_removes_old_entries(cache):
+    cache.put(entry())
+    cache.put(entry(url="https://example.com/recipe/old"))
+    old = cache._path("https://example.com/recipe/old")
+    os.utime(old, (0, 0))
+
+    assert cache.prune() == 1
+    assert cache.get(URL) is not None
+    assert not os.path.exists(old)
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    return CrawlFrontier(str(tmp_path / "frontier.db"), lease=60, max_attempts=2)
+
+
+def urls(*numbers):
+    return [f"https://example.com/recipe/{n}" for n in numbers]
+
+
+def test_frontier_takes_best_priority_first(frontier):
+    frontier.add(urls(1, 2), CrawlPriority.DISCOVERY)
+    frontier.add(urls(3), CrawlPriority.REFRESH)
+    frontier.add(urls(2), CrawlPriority.USER)  # queuing again only raises the priority
+
+    taken = frontier.take(list(CrawlPriority), 10)
+    assert taken == [
+        (urls(2)[0], CrawlPriority.USER),
+        (urls(3)[0], CrawlPriority.REFRESH),
+        (urls(1)[0], CrawlPriority.DISCOVERY),
+    ]
+    assert frontier.take(list(CrawlPriority), 10) == []
+
+
+def test_frontier_settles_done_failed_and_unfinished(frontier):
+    frontier.claim(urls(1, 2, 3), CrawlPriority.USER)
+    frontier.settle(done=urls(1), failed=urls(2), unfinished=urls(3))
+    assert frontier.stats() == {"done": {"user": 1}, "pending": {"user": 2}}
+
+    # Finished URLs are not queued again unless refetched
+    frontier.add(urls(1), CrawlPriority.USER)
+    assert sorted(url for url, _ in frontier.take([CrawlPriority.USER], 10)) == urls(2, 3)
+
+
+def test_frontier_retires_urls_after_max_attempts(frontier):
+    frontier.claim(urls(1), CrawlPriority.USER)
+    frontier.settle(failed=urls(1))
+    frontier.claim(urls(1), CrawlPriority.USER)
+    frontier.settle(failed=urls(1))
+    assert frontier.stats() == {"failed": {"user": 1}}
+    assert frontier.take([CrawlPriority.USER], 10) == []
+
+
+def test_frontier_counts_consecutive_failures_only(frontier):
+    # The same page crawled directly for several searches, then failing once
+    for _ in range(3):
+        frontier.claim(urls(1), CrawlPriority.USER)
+        frontier.settle(done=urls(1))
+    frontier.claim(urls(1), CrawlPriority.USER)
+    frontier.settle(failed=urls(1))
+    assert frontier.stats() == {"pending": {"user": 1}}
+
+    frontier.claim(urls(1), CrawlPriority.USER)
+    frontier.settle(failed=urls(1))
+    assert frontier.stats() == {"failed": {"user": 1}}
+
+
+def test_frontier_refetch_requeues_done_urls(frontier):
+    frontier.claim(urls(1), CrawlPriority.USER)
+    frontier.settle(done=urls(1))
+
+    frontier.add(urls(1), CrawlPriority.REFRESH, refetch=True)
+    assert frontier.take([CrawlPriority.REFRESH], 10) == [(urls(1)[0], CrawlPriority.REFRESH)]
+
+
+def test_frontier_refetch_leaves_failed_urls_retired(frontier):
+    for _ in range(2):
+        frontier.claim(urls(1), CrawlPriority.REFRESH)
+        frontier.settle(failed=urls(1))
+
+    frontier.add(urls(1), CrawlPriority.REFRESH, refetch=True)
+    assert frontier.take([CrawlPriority.REFRESH], 10) == []
+    assert frontier.stats() == {"failed": {"refresh": 1}}
+    assert frontier.retired(urls(1, 2)) == set(urls(1))
+
+
+def test_frontier_expired_leases_are_taken_again(tmp_path):
+    frontier = CrawlFrontier(str(tmp_path / "frontier.db"), lease=-1, max_attempts=3)
+    frontier.add(urls(1), CrawlPriority.DISCOVERY)
+    assert len(frontier.take([CrawlPriority.DISCOVERY], 10)) == 1
+    # The worker holding it died: the lease has run out
+    assert len(frontier.take([CrawlPriority.DISCOVERY], 10)) == 1
+
+
+def test_frontier_prune(frontier):
+    frontier.claim(urls(1, 2), CrawlPriority.USER)
+    frontier.settle(done=urls(1))
+    assert frontier.prune(max_age=-1) == 1
+    assert frontier.stats() == {"running": {"user": 1}}
+
+
+class FlakyCrawler(RecipeCrawler):
+    """Fails its first `failures` page loads with `error`"""
+
+    def __init__(self, error, failures):
+        super().__init__(use_proxy=False, use_page_cache=False)
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+
+    async def _scrape_recipe(self, page, url):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "recipe"
+
+
+def scrape_with_retries(crawler):
+    scrape = RecipeCrawler._scrape_recipe_with_retries.retry_with(wait=wait_fixed(0))
+    return asyncio.run(scrape(crawler, None, URL))
+
+
+@pytest.mark.parametrize("error", [PlaywrightTimeoutError("timed out"), HostThrottled("example.com answered 429")])
+def test_timeouts_and_throttling_are_retried(error):
+    crawler = FlakyCrawler(error, failures=2)
+    assert scrape_with_retries(crawler) == "recipe"
+    assert crawler.calls == 3
+
+
+def test_last_retryable_error_is_raised_after_three_attempts():
+    crawler = FlakyCrawler(PlaywrightTimeoutError("timed out"), failures=5)
+    with pytest.raises(PlaywrightTimeoutError):
+        scrape_with_retries(crawler)
+    assert crawler.calls == 3
+
+
+def test_other_errors_are_not_retried():
+    crawler = FlakyCrawler(ValueError("bad page"), failures=5)
+    with pytest.raises(ValueError):
+        scrape_with_retries(crawler)
+    assert crawler.calls == 1
+
+
+def test_no_retry_when_the_deadline_is_near():
+    crawler = FlakyCrawler(PlaywrightTimeoutError("timed out"), failures=5)
+    with deadline_scope(1), pytest.raises(PlaywrightTimeoutError):
+        scrape_with_retries(crawler)
+    assert crawler.calls == 1
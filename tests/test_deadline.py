@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+
+from api.core.deadline import DeadlineExceeded, deadline_scope, expired, remaining, timeout_ms, with_deadline
+
+
+def test_no_deadline_by_default():
+    assert remaining() is None
+    assert not expired()
+    assert timeout_ms(60000) == 60000
+
+
+def test_scope_sets_and_restores_the_deadline():
+    with deadline_scope(10):
+        assert 9 < remaining() <= 10
+        with deadline_scope(None):
+            assert remaining() is None
+        with deadline_scope(1):
+            assert remaining() <= 1
+        assert remaining() > 9
+    assert remaining() is None
+
+
+def test_timeout_ms_shrinks_to_the_deadline():
+    with deadline_scope(2):
+        assert 1000 < timeout_ms(60000) <= 2000
+        assert timeout_ms(500) == 500
+    with deadline_scope(-1):
+        assert expired()
+        assert timeout_ms(60000) == 1
+
+
+def test_with_deadline_returns_in_time():
+    async def main():
+        with deadline_scope(1):
+            return await with_deadline(asyncio.sleep(0.01, result="done"))
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_with_deadline_gives_up_at_the_deadline():
+    async def main():
+        with deadline_scope(0.05):
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                await with_deadline(asyncio.sleep(5))
+            return time.monotonic() - started
+
+    assert asyncio.run(main()) < 1
+
+
+def test_with_deadline_keeps_the_reserve_back():
+    async def main():
+        with deadline_scope(0.2):
+            with pytest.raises(DeadlineExceeded):
+                await with_deadline(asyncio.sleep(0.15), reserve=0.1)
+            # Nothing left once the reserve is taken out: fails without awaiting
+            with pytest.raises(DeadlineExceeded):
+                await with_deadline(asyncio.sleep(5), reserve=1)
+
+    asyncio.run(main())
+
+
+def test_deadline_exceeded_is_a_timeout():
+    assert issubclass(DeadlineExceeded, TimeoutError)
+
+
+def test_tasks_inherit_the_deadline():
+    async def main():
+        with deadline_scope(5):
+            return await asyncio.create_task(asyncio.to_thread(remaining))
+
+    assert 4 < asyncio.run(main()) <= 5
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from api.models.schemas import Ingredient, PantryItem
+from api.services import pantry as pantry_service
+from api.services.pantry import PantryService
+from api.utils import encode_cursor
+from benchmarks.fake_supabase import FakeStore, FakeSupabase
+
+SESSION = "session-1"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(pantry_service, "supabase", FakeSupabase(store))
+    return store
+
+
+def items(*names):
+    return [PantryItem(ingredient=Ingredient(name=name)) for name in names]
+
+
+def test_bulk_add_and_remove_take_one_statement_each(store):
+    result = asyncio.run(PantryService.add_pantry_items(items("Onion", "garlic", "onion"), SESSION))
+    assert sorted(item.normalized_name for item in result.added) == ["garlic", "onion"]
+    assert result.duplicates == ["onion"]
+    assert store.round_trips == 1
+
+    ids = [item.id for item in result.added]
+    assert sorted(asyncio.run(PantryService.remove_pantry_items(ids + [999], SESSION))) == sorted(ids)
+    assert store.round_trips == 2
+
+
+@pytest.mark.parametrize("expiring_soon", [False, True])
+@pytest.mark.parametrize("keys", [[], ["2026-10-19T08:30:00+00:00", 1, 2]])
+def test_cursors_with_the_wrong_number_of_keys_are_rejected(store, expiring_soon, keys):
+    with pytest.raises(ValueError):
+        asyncio.run(PantryService.list_pantry_items(SESSION, cursor=encode_cursor(keys), expiring_soon=expiring_soon))
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from api.core.quantization import (
+    INT8_MAX,
+    dequantize_int8,
+    pack_int8,
+    quantize_int8,
+    to_pgvector_literal,
+    unpack_int8,
+)
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(200, 1536)).astype(np.float32)
+
+
+def test_round_trip_error_is_within_half_a_step(vectors):
+    codes, scales = quantize_int8(vectors)
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    assert np.abs(codes).max() <= INT8_MAX
+
+    error = np.abs(dequantize_int8(codes, scales) - vectors)
+    assert (error <= scales[:, None] / 2 + 1e-6).all()
+
+
+def test_round_trip_keeps_cosine_similarity(vectors):
+    restored = dequantize_int8(*quantize_int8(vectors))
+    cosine = (restored * vectors).sum(axis=1) / (
+        np.linalg.norm(restored, axis=1) * np.linalg.norm(vectors, axis=1)
+    )
+    assert cosine.min() > 0.999
+
+
+def test_largest_component_is_exact(vectors):
+    codes, scales = quantize_int8(vectors)
+    peaks = np.abs(vectors).argmax(axis=1)
+    assert (np.abs(codes[np.arange(len(codes)), peaks]) == INT8_MAX).all()
+
+
+def test_zero_vector():
+    codes, scales = quantize_int8(np.zeros((1, 8)))
+    assert not codes.any()
+    assert scales[0] == 1.0
+    assert not dequantize_int8(codes, scales).any()
+
+
+def test_pack_unpack_round_trip(vectors):
+    vector = vectors[0]
+    packed = pack_int8(vector.tolist())
+    assert isinstance(packed, str)
+    # 4-byte scale plus one byte per dimension, base64 encoded
+    assert len(packed) == 4 * -(-(4 + len(vector)) // 3)
+
+    codes, scales = quantize_int8(vector[None, :])
+    restored = unpack_int8(packed)
+    assert restored.dtype == np.float32
+    np.testing.assert_array_equal(restored, dequantize_int8(codes, scales)[0])
+    assert np.abs(restored - vector).max() <= scales[0] / 2 + 1e-6
+
+
+def test_pgvector_literal_round_trips_float32():
+    vector = np.random.default_rng(1).normal(size=16).astype(np.float32)
+    literal = to_pgvector_literal(vector)
+    assert literal.startswith("[") and literal.endswith("]")
+    parsed = np.array([float(x) for x in literal[1:-1].split(",")], dtype=np.float32)
+    np.testing.assert_array_equal(parsed, vector)
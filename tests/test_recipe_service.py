@@ -0,0 +1,73 @@
+import pytest
+
+from api.core.row_cache import recipe_rows
+from api.models.schemas import RecipeDB
+from api.services.recipe import RecipeService
+
+
+@pytest.fixture
+def cached_recipe():
+    row = {
+        "id": "test-recipe-1",
+        "title": "Tomato Soup",
+        "ingredients": [{"name": "tomato", "quantity": "4", "unit": ""}],
+        "prep_time": "10 mins",
+        "cook_time": "20 mins",
+        "image_url": "",
+        "source_url": "https://example.com/tomato-soup",
+        "source": "allrecipes",
+        "cuisine": "Italian",
+    }
+    recipe_rows.put_many([row])
+    yield row
+    recipe_rows.invalidate([row["id"]])
+
+
+def test_get_recipe_from_db_returns_a_model(cached_recipe):
+    recipe = RecipeService.get_recipe_from_db(cached_recipe["id"])
+    assert isinstance(recipe, RecipeDB)
+    assert recipe.title == "Tomato Soup"
+    assert recipe.ingredients[0].name == "tomato"
+
+
+def test_callers_cannot_corrupt_the_row_cache(cached_recipe):
+    recipe = RecipeService.get_recipe_from_db(cached_recipe["id"])
+    recipe.title = "Changed"
+    recipe.ingredients.append(recipe.ingredients[0])
+
+    rows = RecipeService.get_recipes_from_db([cached_recipe["id"]])
+    rows[0]["title"] = "Changed"
+    rows[0]["ingredients"][0]["quantity"] = "400"
+    rows[0]["ingredients"].append({"name": "basil"})
+
+    again = RecipeService.get_recipes_from_db([cached_recipe["id"]])[0]
+    assert again["title"] == "Tomato Soup"
+    assert again["ingredients"] == [{"name": "tomato", "quantity": "4", "unit": ""}]
+
+
+def test_recipe_embeddings_are_fetched_in_one_query(monkeypatch):
+    import numpy as np
+
+    from api.core.quantization import pack_int8
+    from api.services import recipe as recipe_service
+    from benchmarks.fake_supabase import FakeStore, FakeSupabase
+
+    store = FakeStore()
+    store.insert("recipe_embeddings", [
+        {"recipe_id": "q8", "embedding": [1.0, 0.0], "embedding_q8": pack_int8([1.0, 0.0])},
+        {"recipe_id": "legacy", "embedding": "[0.0,1.0]", "embedding_q8": None},
+        {"recipe_id": "q8-2", "embedding": [0.6, 0.8], "embedding_q8": pack_int8([0.6, 0.8])},
+    ])
+    store.round_trips = 0
+    monkeypatch.setattr(recipe_service, "supabase", FakeSupabase(store))
+    monkeypatch.setattr(recipe_service.settings, "LOCAL_VECTOR_SEARCH", False)
+
+    embeddings = RecipeService.get_recipe_embeddings(["q8", "q8-2", "unknown"])
+    assert store.round_trips == 1
+    assert set(embeddings) == {"q8", "q8-2"}
+    assert np.allclose(embeddings["q8-2"], [0.6, 0.8], atol=0.01)
+
+    # Rows without the int8 column cost one more query, whatever their number
+    embeddings = RecipeService.get_recipe_embeddings(["q8", "legacy"])
+    assert store.round_trips == 3
+    assert np.allclose(embeddings["legacy"], [0.0, 1.0])
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from api.core import cache
+from api.core.cache import generate_query_hash
+from api.services.recipe import RecipeService
+from api.services.recommendation import RecommendationService
+from benchmarks.fake_supabase import FakeStore, FakeSupabase
+
+RECIPE = {
+    "id": "recipe-1",
+    "title": "Tomato Soup",
+    "ingredients": [{"name": "tomato", "quantity": "4", "unit": ""}],
+    "prep_time": "10 mins",
+    "cook_time": "20 mins",
+    "image_url": "",
+    "source_url": "https://example.com/tomato-soup",
+    "source": "allrecipes",
+}
+
+
+def test_stale_recommendations_are_served_and_refreshed(monkeypatch):
+    store = FakeStore()
+    cached_at = datetime.now() - timedelta(days=2)
+    store.insert("recipe_cache", {
+        "query_hash": generate_query_hash("tomato soup"),
+        "query": "tomato soup",
+        "results": [RECIPE],
+        "cached_at": cached_at.isoformat(),
+        "expires_at": (datetime.now() - timedelta(minutes=1)).isoformat(),
+    })
+    monkeypatch.setattr(cache, "supabase", FakeSupabase(store))
+    refreshed = []
+
+    async def revalidate_query(query):
+        refreshed.append(query)
+
+    monkeypatch.setattr(RecipeService, "revalidate_query", revalidate_query)
+
+    async def recommend():
+        results = await RecommendationService.get_recommendations(["tomato"], {}, "tomato soup")
+        await asyncio.sleep(0)  # let the background refresh start
+        return results
+
+    results = asyncio.run(recommend())
+    assert [recipe.id for recipe in results] == ["recipe-1"]
+    assert refreshed == ["tomato soup"]
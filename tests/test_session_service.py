@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.services import session as session_service
+from api.services.session import SessionService
+from benchmarks.fake_supabase import FakeStore, FakeSupabase
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    expired = (datetime.now() - timedelta(days=1)).isoformat()
+    store.insert("sessions", [{"id": f"s{i}", "session_data": {}, "expires_at": expired} for i in range(10)])
+    store.insert("pantry_items", [{"session_id": "s0", "normalized_name": "rice", "ingredient": {"name": "rice"}}])
+    monkeypatch.setattr(session_service, "supabase", FakeSupabase(store))
+    return store
+
+
+def test_purge_deletes_expired_sessions_in_chunks(store):
+    assert asyncio.run(SessionService.cleanup_expired_sessions(chunk_size=3)) == 11
+    assert store.rows("sessions") == [] and store.rows("pantry_items") == []
+
+
+def test_purge_stops_after_max_chunks(store):
+    assert asyncio.run(SessionService.cleanup_expired_sessions(chunk_size=3, max_chunks=2)) == 7
+    assert len(store.rows("sessions")) == 4
+
+
+def test_purge_stops_when_a_chunk_deletes_nothing(store, monkeypatch):
+    # e.g. row-level security hiding the rows from the delete but not the select
+    monkeypatch.setattr(store, "delete", lambda table, filters=(): [])
+    selects = []
+    select = store.select
+    monkeypatch.setattr(store, "select", lambda table, *args, **kwargs: selects.append(table) or select(table, *args, **kwargs))
+
+    assert asyncio.run(SessionService.cleanup_expired_sessions(chunk_size=3)) == 0
+    assert selects == ["sessions"]
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from api.core.text import canonical_query, tokenize
+from api.core.text_index import RecipeTextIndex, document_terms
+
+
+def recipe(recipe_id, title, *ingredients):
+    return {"id": recipe_id, "title": title, "ingredients": [{"name": name} for name in ingredients]}
+
+
+@pytest.fixture
+def index(tmp_path):
+    # check_interval=0 so every search looks for a new snapshot
+    return RecipeTextIndex(str(tmp_path / "text_index.json"), check_interval=0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Chicken Soup", ["chicken", "soup"]),
+    ("Easy Chicken-and-Rice Recipe!", ["chicken", "rice"]),
+    ("tomatoes potatoes", ["tomato", "potato"]),
+    ("berries cherries", ["berry", "cherry"]),
+    ("peaches dishes boxes", ["peach", "dish", "box"]),
+    ("eggs grass", ["egg", "grass"]),
+    ("gas", ["gas"]),
+    ("the best of the quick", []),
+])
+def test_tokenize(text, expected):
+    assert tokenize(text) == expected
+
+
+def test_canonical_query_ignores_order_case_and_punctuation():
+    assert canonical_query("Rice, Chicken!") == canonical_query("chicken rice") == "chicken rice"
+    # Nothing but stop words: fall back to the whitespace-normalized text
+    assert canonical_query("  The   Best ") == "the best"
+
+
+def test_document_terms_weight_the_title():
+    terms = document_terms(recipe("1", "Chicken Curry", "Fresh Chicken", "onions"))
+    assert terms.count("chicken") == 3
+    assert terms.count("curry") == 2
+    assert terms.count("onion") == 1
+
+
+def test_search_ranks_by_bm25(index):
+    index.add_recipes([
+        recipe("title", "Chicken Curry", "chicken", "onion", "curry paste"),
+        recipe("ingredient", "Weeknight Stew", "chicken", "carrot", "potato", "onion", "stock", "thyme"),
+        recipe("other", "Lentil Soup", "lentil", "carrot", "onion"),
+    ])
+
+    results = index.search("chicken curry")
+    assert [recipe_id for recipe_id, _, _ in results] == ["title", "ingredient"]
+    scores = [score for _, score, _ in results]
+    assert scores == sorted(scores, reverse=True)
+    coverage = {recipe_id: share for recipe_id, _, share in results}
+    assert coverage["title"] == pytest.approx(1.0)
+    assert 0 < coverage["ingredient"] < 1
+
+
+def test_rare_terms_outweigh_common_ones(index):
+    index.add_recipes([recipe(str(i), "Onion Dish", "onion") for i in range(10)])
+    index.add_recipes([recipe("saffron", "Saffron Rice", "saffron", "rice")])
+    index.add_recipes([recipe("onion-rice", "Onion Rice", "onion", "rice")])
+
+    top, _, _ = index.search("onion saffron", limit=1)[0]
+    assert top == "saffron"
+
+
+def test_shorter_documents_rank_higher_for_equal_matches(index):
+    index.add_recipes([
+        recipe("short", "Tomato Salad", "tomato"),
+        recipe("long", "Tomato Salad", "tomato", "cucumber", "feta", "olive", "red onion", "oregano", "mint"),
+    ])
+    assert [recipe_id for recipe_id, _, _ in index.search("cucumber salad")][-1] == "short"
+    assert [recipe_id for recipe_id, _, _ in index.search("tomato salad")][0] == "short"
+
+
+def test_search_without_matches_or_terms(index):
+    assert index.search("chicken") == []
+    index.add_recipes([recipe("1", "Chicken Soup", "chicken")])
+    assert index.search("the best") == []
+    assert index.search("tofu") == []
+
+
+def test_add_replaces_a_recipe(index):
+    index.add_recipes([recipe("1", "Chicken Soup", "chicken")])
+    index.add_recipes([recipe("1", "Tofu Soup", "tofu")])
+
+    assert len(index) == 1
+    assert index.search("chicken") == []
+    assert [recipe_id for recipe_id, _, _ in index.search("tofu")] == ["1"]
+
+
+def test_recipes_added_locally_survive_a_snapshot_reload(index):
+    snapshot = RecipeTextIndex(index.path)
+    snapshot.add_recipes([recipe("1", "Chicken Soup", "chicken"), recipe("2", "Beef Stew", "beef")])
+    snapshot.save()
+
+    index.add_recipes([recipe("3", "Chicken Pie", "chicken", "pastry")])
+    assert {recipe_id for recipe_id, _, _ in index.search("chicken")} == {"1", "3"}
+
+    # A newer snapshot that does not know recipe 3 yet
+    snapshot.add_recipes([recipe("4", "Chicken Salad", "chicken")])
+    snapshot.save()
+    os.utime(index.path, ns=(1, os.stat(index.path).st_mtime_ns + 1_000_000))
+    assert {recipe_id for recipe_id, _, _ in index.search("chicken")} == {"1", "3", "4"}
+    assert len(index) == 4
+
+
+def test_index_recipes_feeds_the_text_index(index, monkeypatch):
+    from api.services import recipe as recipe_service
+
+    monkeypatch.setattr(recipe_service, "text_index", index)
+    monkeypatch.setattr(recipe_service.settings, "LOCAL_TEXT_SEARCH", True)
+    recipe_service.RecipeService.index_recipes([recipe("7", "Garlic Bread", "garlic", "bread"), {"title": "No id"}])
+
+    assert [recipe_id for recipe_id, _, _ in index.search("garlic bread")] == ["7"]
+    assert len(index) == 1
+
@@ -0,0 +1,90 @@
+import pytest
+
+from api.core.units import grocery_key, merge_ingredients, merge_quantities, parse_quantity
+from api.models.schemas import Ingredient
+
+
+@pytest.mark.parametrize("quantity, expected", [
+    ("2", 2.0),
+    ("1.5", 1.5),
+    ("1/2", 0.5),
+    ("1 1/2", 1.5),
+    ("½", 0.5),
+    ("1½", 1.5),
+    ("1 ¾", 1.75),
+    ("1-2", 2.0),
+    ("1 – 2", 2.0),
+    ("2 to 3", 3.0),
+    ("3 large", 3.0),
+    ("1/0", None),
+    ("a pinch", None),
+    ("to taste", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_quantity(quantity, expected):
+    assert parse_quantity(quantity) == (expected if expected is None else pytest.approx(expected))
+
+
+@pytest.mark.parametrize("first, second, expected", [
+    # Same unit, and spellings of the same unit
+    (("2", "cup"), ("1", "cup"), ("3", "cup")),
+    (("1", "Tablespoons"), ("2", "tbsp"), ("3", "Tablespoons")),
+    # Converted into the first ingredient's unit
+    (("1", "cup"), ("8", "tbsp"), ("1.5", "cup")),
+    (("1", "kg"), ("500", "g"), ("1.5", "kg")),
+    (("1", "lb"), ("8", "oz"), ("1.5", "lb")),
+    # Fractions and ranges
+    (("1/2", "cup"), ("1 1/2", "cup"), ("2", "cup")),
+    (("½", ""), ("1-2", ""), ("2.5", "")),
+    # Units that don't convert are summed as they are
+    (("2", "cloves"), ("1", "cloves"), ("3", "cloves")),
+    # Unparseable terms are kept next to the sum, never dropped
+    (("2", ""), ("a pinch", ""), ("2 + a pinch", "")),
+    (("2 + a pinch", ""), ("1", ""), ("3 + a pinch", "")),
+    (("a pinch", ""), ("to taste", ""), ("a pinch + to taste", "")),
+    (("a pinch", ""), ("2", "tbsp"), ("2 + a pinch", "tbsp")),
+    (("", ""), ("1", ""), ("1", "")),
+])
+def test_merge_quantities(first, second, expected):
+    merged = merge_quantities(
+        Ingredient(name="flour", quantity=first[0], unit=first[1]),
+        Ingredient(name="flour", quantity=second[0], unit=second[1]),
+    )
+    assert (merged.quantity, merged.unit) == expected
+    assert merged.name == "flour"
+
+
+def test_merge_quantities_survives_repeated_merges():
+    merged = Ingredient(name="salt", quantity="1")
+    for quantity in ["a pinch", "2", "1/2", "to taste"]:
+        merged = merge_quantities(merged, Ingredient(name="salt", quantity=quantity))
+    assert merged.quantity == "3.5 + a pinch + to taste"
+
+
+@pytest.mark.parametrize("name, unit, expected", [
+    ("flour", "cup", "flour_volume"),
+    ("flour", "Tablespoons", "flour_volume"),
+    ("flour", "g", "flour_mass"),
+    ("flour", "lbs", "flour_mass"),
+    ("egg", "", "egg"),
+    ("egg", None, "egg"),
+    ("garlic", "cloves", "garlic_cloves"),
+])
+def test_grocery_key(name, unit, expected):
+    assert grocery_key(name, unit) == expected
+
+
+def test_merge_ingredients_groups_by_key():
+    merged = merge_ingredients([
+        ("flour", Ingredient(name="flour", quantity="1", unit="cup")),
+        ("flour", Ingredient(name="Flour", quantity="8", unit="tbsp")),
+        ("flour", Ingredient(name="flour", quantity="100", unit="g")),
+        ("egg", Ingredient(name="eggs", quantity="2")),
+        ("egg", Ingredient(name="egg", quantity="1")),
+    ])
+    assert {key: (i.quantity, i.unit) for key, i in merged.items()} == {
+        "flour_volume": ("1.5", "cup"),
+        "flour_mass": ("100", "g"),
+        "egg": ("3", ""),
+    }
@@ -0,0 +1,54 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+
+from api.utils import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("values", [
+    [42],
+    [0],
+    ["2026-10-19T08:30:00.123456+00:00", 17],
+    ["2026-10-19", 3],
+    [None, 5],
+    ["quote \" and, comma", "ünïcødé"],
+    [],
+])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+    assert decode_cursor(cursor) == values
+
+
+@pytest.mark.parametrize("values", [[1], [12, 345], ["2026-10-19T08:30:00+00:00", 99999]])
+def test_cursor_is_url_safe(values):
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert not set(cursor) & set("+/&?# ")
+
+
+def test_timestamps_round_trip_through_the_cursor():
+    created_at = datetime(2026, 10, 19, 8, 30, 0, 123456, tzinfo=timezone.utc)
+    created, item_id = decode_cursor(encode_cursor([created_at, 7]))
+    # What the keyset filter re-parses before comparing
+    assert datetime.fromisoformat(created) == created_at
+    assert item_id == 7
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "e30",  # {} is valid JSON but not a list
+    base64.urlsafe_b64encode(b"42").decode(),
+    base64.urlsafe_b64encode(b"[1,").decode(),
+    "",
+])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("values, keys", [([], 1), ([], 2), ([7], 2), (["2026-10-19", 3, 4], 2)])
+def test_cursors_with_the_wrong_number_of_keys_raise_value_error(values, keys):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(values), keys=keys)
+
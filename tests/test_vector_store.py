@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from api.core.ann_index import build_ivf, probe_ranges
+from api.core.vector_store import SharedEmbeddingMatrix, normalize_rows, publish_generation
+
+DIM = 32
+
+
+def clustered(rng, count, clusters=64):
+    """Vectors around random centres, the shape IVF is built for"""
+    centres = rng.normal(size=(clusters, DIM))
+    return (centres[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, DIM))).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = clustered(rng, 6000)
+    queries = clustered(np.random.default_rng(1), 50)
+    return [f"r{i}" for i in range(len(vectors))], vectors, queries
+
+
+def brute_force(vectors, query, k):
+    scores = normalize_rows(vectors) @ (query / np.linalg.norm(query))
+    return set(np.argsort(-scores)[:k])
+
+
+def recall(matrix, ids, vectors, queries, k=10, **search):
+    found = 0
+    for query in queries:
+        expected = {ids[row] for row in brute_force(vectors, query, k)}
+        found += len(expected & {recipe_id for recipe_id, _ in matrix.search(query, k=k, **search)})
+    return found / (k * len(queries))
+
+
+@pytest.fixture(scope="module")
+def ivf_matrix(corpus, tmp_path_factory):
+    ids, vectors, _ = corpus
+    root = str(tmp_path_factory.mktemp("embeddings"))
+    publish_generation(root, ids, vectors, ivf_lists=64)
+    return SharedEmbeddingMatrix(root)
+
+
+def test_build_ivf_partitions_every_row(corpus):
+    _, vectors, _ = corpus
+    order, offsets, centroids = build_ivf(normalize_rows(vectors), 32)
+    assert sorted(order.tolist()) == list(range(len(vectors)))
+    assert offsets[0] == 0 and offsets[-1] == len(vectors)
+    assert (np.diff(offsets) >= 0).all()
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+
+
+def test_probe_ranges_are_the_nearest_non_empty_lists():
+    centroids = np.eye(4, dtype=np.float32)
+    offsets = np.array([0, 5, 5, 12, 20])
+    query = np.array([0.1, 1.0, 0.6, 0.0], dtype=np.float32)
+    # List 1 is the nearest but empty, so it contributes no range
+    assert probe_ranges(centroids, offsets, query, 2) == [(5, 12)]
+    assert probe_ranges(centroids, offsets, query, 3) == [(0, 5), (5, 12)]
+
+
+def test_exhaustive_search_matches_brute_force(ivf_matrix, corpus):
+    ids, vectors, queries = corpus
+    assert recall(ivf_matrix, ids, vectors, queries, probes=0) == 1.0
+
+
+@pytest.mark.parametrize("probes, minimum", [(4, 0.8), (8, 0.9), (16, 0.95), (64, 1.0)])
+def test_ivf_recall_against_brute_force(ivf_matrix, corpus, probes, minimum):
+    ids, vectors, queries = corpus
+    assert recall(ivf_matrix, ids, vectors, queries, probes=probes) >= minimum
+
+
+def test_recall_rises_with_probes(ivf_matrix, corpus):
+    ids, vectors, queries = corpus
+    recalls = [recall(ivf_matrix, ids, vectors, queries, probes=probes) for probes in (1, 2, 4, 8)]
+    assert recalls == sorted(recalls)
+    assert recalls[0] < 1.0
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_compact_scans_rescore_exactly(ivf_matrix, corpus, precision):
+    ids, vectors, queries = corpus
+    assert recall(ivf_matrix, ids, vectors, queries, probes=0, precision=precision) >= 0.99
+
+    query = queries[0]
+    exact = dict(ivf_matrix.search(query, k=10, probes=0))
+    for recipe_id, score in ivf_matrix.search(query, k=10, probes=0, precision=precision):
+        if recipe_id in exact:
+            assert score == pytest.approx(exact[recipe_id], abs=1e-6)
+
+
+def test_deltas_are_searched_exhaustively(corpus, tmp_path):
+    ids, vectors, _ = corpus
+    matrix = SharedEmbeddingMatrix(str(tmp_path), check_interval=0)
+    publish_generation(str(tmp_path), ids[:1000], vectors[:1000], ivf_lists=16)
+
+    new = np.random.default_rng(2).normal(size=(1, DIM)).astype(np.float32)
+    matrix.add(["new"], new)
+    assert matrix.search(new[0], k=1, probes=1) == [("new", pytest.approx(1.0))]
+    assert matrix.stats()["delta_vectors"] == 1
+
+
+def test_rebuild_keeps_full_precision_rows(corpus, tmp_path, monkeypatch):
+    from api.core import vector_store
+    from api.core.quantization import pack_int8
+    from benchmarks.fake_supabase import FakeStore, FakeSupabase
+
+    ids, vectors, queries = corpus
+    store = FakeStore()
+    store.insert("recipe_embeddings", [
+        {"recipe_id": recipe_id, "embedding": vector.tolist(), "embedding_q8": pack_int8(vector)}
+        for recipe_id, vector in zip(ids[:50], vectors[:50])
+    ])
+    monkeypatch.setattr(vector_store, "supabase", FakeSupabase(store))
+
+    assert vector_store.rebuild_embedding_matrix(str(tmp_path), page_size=20) == 50
+    matrix = SharedEmbeddingMatrix(str(tmp_path))
+    expected = normalize_rows(vectors[:50])
+    for row, recipe_id in enumerate(ids[:50]):
+        assert np.array_equal(matrix.vector(recipe_id), expected[row])
+    query = queries[0] / np.linalg.norm(queries[0])
+    for recipe_id, score in matrix.search(query, k=5, precision="int8"):
+        assert score == pytest.approx(float(expected[ids.index(recipe_id)] @ query), abs=1e-6)
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+from api.core.write_behind import WriteBehindQueue
+
+
+class RecordingQueue(WriteBehindQueue):
+    """Writes to a list instead of the database, slowly enough to be caught mid-flush"""
+
+    def __init__(self, write_seconds=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.write_seconds = write_seconds
+        self.writing = threading.Event()
+        self.written = []
+
+    def _write_upserts(self, group, rows):
+        self.writing.set()
+        time.sleep(self.write_seconds)
+        self.written.extend(row["id"] for row in rows)
+
+
+async def until_writing(queue):
+    while not queue.writing.is_set():
+        await asyncio.sleep(0.005)
+
+
+def test_writes_go_straight_through_when_not_running():
+    queue = RecordingQueue()
+    queue.enqueue_upsert("t", {"id": 1}, on_conflict="id")
+    assert queue.written == [1]
+
+
+def test_upserts_are_coalesced_by_key():
+    async def main():
+        queue = RecordingQueue(flush_interval=60)
+        await queue.start()
+        queue.enqueue_upsert("t", {"id": 1, "v": "old"}, on_conflict="id")
+        queue.enqueue_upsert("t", {"id": 1, "v": "new"}, on_conflict="id")
+        assert queue.pending_upsert("t", "id", (1,))["v"] == "new"
+        assert queue.depth == 1
+        await queue.stop()
+        return queue.written
+
+    assert asyncio.run(main()) == [1]
+
+
+def test_shutdown_during_a_flush_loses_nothing():
+    async def main():
+        queue = RecordingQueue(write_seconds=0.2, max_batch=2, flush_interval=60)
+        await queue.start()
+        # Two tables in one batch: shutdown arrives while the first is written
+        queue.enqueue_upsert("a", {"id": 1}, on_conflict="id")
+        queue.enqueue_upsert("b", {"id": 2}, on_conflict="id")
+        await until_writing(queue)
+        queue.enqueue_upsert("a", {"id": 3}, on_conflict="id")
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(main())
+    assert sorted(queue.written) == [1, 2, 3]
+    assert queue.depth == 0
+
+
+def test_cancelled_flush_requeues_unwritten_rows():
+    async def main():
+        queue = RecordingQueue(write_seconds=0.1, flush_interval=60)
+        await queue.start()
+        queue.enqueue_upsert("a", {"id": 1}, on_conflict="id")
+        queue.enqueue_upsert("b", {"id": 2}, on_conflict="id")
+        flush = asyncio.create_task(queue.flush())
+        await until_writing(queue)
+        # Still visible while being written
+        assert queue.pending_upsert("a", "id", (1,)) is not None
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+
+        # Neither group is lost: both are queued again
+        assert queue.pending_upsert("a", "id", (1,)) is not None
+        assert queue.pending_upsert("b", "id", (2,)) is not None
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(main())
+    assert {1, 2} <= set(queue.written)
+    assert queue.depth == 0
+
+
+def test_discarded_rows_are_not_written():
+    async def main():
+        queue = RecordingQueue(flush_interval=60)
+        await queue.start()
+        queue.enqueue_upsert("t", {"id": 1}, on_conflict="id")
+        queue.enqueue_upsert("t", {"id": 2}, on_conflict="id")
+        await queue.discard_upserts("t", "id", [(1,)])
+        assert queue.pending_upsert("t", "id", (1,)) is None
+        await queue.stop()
+        return queue.written
+
+    assert asyncio.run(main()) == [2]